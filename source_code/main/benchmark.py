@@ -0,0 +1,576 @@
+"""
+LOLCODE Benchmark Suite
+Times lexing, parsing, semantic analysis and execution separately and end to
+end over the test corpora and the compute-heavy workloads in
+Test_Cases/benchmarks. Results are plain dicts that serialize to JSON, and
+compare() flags phases that got slower than a stored baseline.
+
+GIMMEH never waits on the terminal: each run gets an InputFeeder that
+answers from NAME.in next to the script when it exists, otherwise from
+DEFAULT_INPUTS, cycling when the values run out.
+"""
+import io
+import math
+import os
+import platform
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+
+from instrument import PHASES, PipelineStats
+from pipeline import run_pipeline
+
+TEST_CASES_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                               '..', '..', 'Test_Cases'))
+
+# Suite name -> directory of .lol files
+SUITES = {
+    'project': os.path.join(TEST_CASES_DIR, 'project-testcases-fixed'),
+    'other': os.path.join(TEST_CASES_DIR, 'other-testcases'),
+    'workloads': os.path.join(TEST_CASES_DIR, 'benchmarks'),
+}
+
+# GIMMEH answers for scripts without a NAME.in file
+DEFAULT_INPUTS = ['5', '3', '7', '2', '1', '0']
+
+# Seconds one run of a script may take before it is reported as a timeout
+DEFAULT_TIMEOUT = 10.0
+
+# Regressions smaller than this many milliseconds are treated as noise
+NOISE_FLOOR_MS = 0.5
+
+# Scaling exponents above this are reported as worse than linear
+SUPERLINEAR_EXPONENT = 1.3
+
+
+class BenchmarkTimeout(BaseException):
+    """Raised by the timer; BaseException so the interpreter cannot swallow it"""
+
+
+class InputFeeder:
+    """Instrument that answers GIMMEH from a list of values instead of stdin"""
+
+    def __init__(self, values):
+        """================ __init__ ================"""
+        self.values = list(values) or ['']
+        self.index = 0
+
+    def attach(self, executor):
+        """================ attach ================"""
+        executor.read_input = self.read_input
+
+    def detach(self, executor):
+        """================ detach ================"""
+        executor.__dict__.pop('read_input', None)
+
+    def read_input(self, var_name):
+        """================ read_input ================"""
+        value = self.values[self.index % len(self.values)]
+        self.index += 1
+        return value
+
+
+def inputs_for(path):
+    """GIMMEH values for a script: NAME.in lines, or DEFAULT_INPUTS"""
+    input_path = os.path.splitext(path)[0] + '.in'
+    if os.path.exists(input_path):
+        with open(input_path, 'r') as file:
+            return file.read().splitlines()
+    return DEFAULT_INPUTS
+
+
+def discover(suites=None):
+    """[(name, path)] for every .lol file in the chosen suites"""
+    scripts = []
+    for suite in suites or SUITES:
+        directory = SUITES[suite]
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith('.lol'):
+                scripts.append((f"{suite}/{filename[:-4]}", os.path.join(directory, filename)))
+    return scripts
+
+
+# ================================================================
+# ======================= RUNNING ================================
+# ================================================================
+@contextmanager
+def time_limit(timeout):
+    """
+    Raise BenchmarkTimeout in the block after `timeout` seconds of wall time.
+    Uses SIGALRM, so it only limits anything on the main thread of a Unix
+    process; elsewhere (or with a falsy timeout) the block runs unbounded.
+    """
+    use_timer = timeout and hasattr(signal, 'setitimer') and \
+        threading.current_thread() is threading.main_thread()
+    if not use_timer:
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        raise BenchmarkTimeout()
+    old_handler = signal.signal(signal.SIGALRM, on_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, old_handler)
+
+
+def run_once(text, inputs, timeout, memory=False):
+    """One timed pipeline run. Returns (status, PipelineStats, tokens)"""
+    stats = PipelineStats(memory=memory)
+    tokens = []
+    try:
+        with time_limit(timeout), redirect_stdout(io.StringIO()):
+            failed_stage, errors, tokens = run_pipeline(text, stats, instruments=[InputFeeder(inputs)])[:3]
+        status = "ok" if failed_stage is None else f"{failed_stage.lower()} errors"
+    except BenchmarkTimeout:
+        status = "timeout"
+    except Exception as error:
+        status = f"crash: {type(error).__name__}"
+    return status, stats, tokens
+
+
+def bench_script(path, repeat=5, timeout=DEFAULT_TIMEOUT, inputs=None):
+    """
+    Time every phase of one script `repeat` times. Returns a result dict with
+    min/mean milliseconds per completed phase and end to end. A run that does
+    not finish cleanly stops the repeats and is reported in "status".
+    """
+    with open(path, 'r') as file:
+        text = file.read()
+    inputs = inputs if inputs is not None else inputs_for(path)
+
+    samples = {phase: [] for phase in PHASES}
+    totals = []
+    status, tokens, statements = "ok", 0, 0
+    for _ in range(repeat):
+        status, stats, token_list = run_once(text, inputs, timeout)
+        completed = stats.phases
+        if status == "timeout" or status.startswith("crash"):
+            completed = completed[:-1]  # the interrupted phase has no meaningful time
+        for record in completed:
+            samples[record.name].append(record.wall)
+        tokens = len(token_list)
+        executed = stats.get("execute")
+        statements = executed.statements if executed is not None else 0
+        if status != "ok":
+            break
+        totals.append(stats.total_wall())
+
+    phases = {}
+    for phase, times in samples.items():
+        if times:
+            phases[phase] = summarize(times)
+    if totals:
+        phases["total"] = summarize(totals)
+    return {"path": path, "status": status, "runs": len(totals), "tokens": tokens,
+            "statements": statements, "phases": phases}
+
+
+def summarize(times):
+    """================ summarize ================"""
+    return {"min_ms": min(times) * 1000, "mean_ms": sum(times) / len(times) * 1000}
+
+
+def run_suite(scripts, repeat=5, timeout=DEFAULT_TIMEOUT, inputs=None, progress=None):
+    """Benchmark [(name, path)]; returns the JSON-ready results document"""
+    results = {}
+    for name, path in scripts:
+        results[name] = bench_script(path, repeat, timeout, inputs)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def run_scaling(sizes, seed=0, repeat=3, timeout=DEFAULT_TIMEOUT, progress=None, **knobs):
+    """
+    Time and trace memory for generated programs of each size (statement
+    count, see generator.ProgramGenerator for the other knobs). Returns the
+    JSON-ready document with one point per size and each phase's growth
+    exponent.
+    """
+    from generator import generate_program
+
+    points = []
+    for size in sizes:
+        text = generate_program(seed, statements=size, **knobs)
+        point = {"statements": size, "lines": text.count("\n"), **measure_program(text, repeat, timeout)}
+        points.append(point)
+        if progress is not None:
+            progress(point)
+
+    return {
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "knobs": knobs,
+        "points": points,
+        "growth": {phase: growth_exponent(points, phase) for phase in PHASES},
+    }
+
+
+def run_nesting(depths, repeat=3, timeout=DEFAULT_TIMEOUT, progress=None):
+    """
+    run_scaling for expression nesting: times generator.nested_program at
+    each depth. Every phase keeps nested operators on explicit stacks, so
+    10k-deep expressions should finish and grow about linearly.
+    """
+    from generator import nested_program
+
+    points = []
+    for depth in depths:
+        point = {"depth": depth, **measure_program(nested_program(depth), repeat, timeout)}
+        points.append(point)
+        if progress is not None:
+            progress(point)
+
+    return {
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "points": points,
+        "growth": {phase: growth_exponent(points, phase) for phase in PHASES},
+        "memory_growth": {phase: growth_exponent(points, phase, "peak_kib") for phase in PHASES},
+    }
+
+
+def run_streaming(sizes, seed=0, repeat=3, progress=None, **knobs):
+    """
+    Lex and parse generated programs of each size in the STREAM_MODES
+    ways. Returns the JSON-ready document with the best time and the peak
+    memory of each mode per size, and each mode's growth exponents for time
+    and memory against the token count. A streamed parse keeps only its
+    lookahead, so its memory should hardly grow.
+    """
+    from generator import generate_program
+    from lexer import Lexer
+
+    points = []
+    for size in sizes:
+        text = generate_program(seed, statements=size, **knobs)
+        modes = {}
+        for mode, run in STREAM_MODES.items():
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run(text)
+                times.append(time.perf_counter() - start)
+            # Memory is traced in a separate run so it does not skew the times
+            tracemalloc.start()
+            run(text)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            modes[mode] = {"min_ms": min(times) * 1000, "peak_kib": peak / 1024}
+        point = {"statements": size, "tokens": len(Lexer().tokenize(text)), "status": "ok", "phases": modes}
+        points.append(point)
+        if progress is not None:
+            progress(point)
+
+    return {
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "knobs": knobs,
+        "points": points,
+        "growth": {mode: growth_exponent(points, mode) for mode in STREAM_MODES},
+        "memory_growth": {mode: growth_exponent(points, mode, "peak_kib") for mode in STREAM_MODES},
+    }
+
+
+def run_parallel_lex(sizes, jobs, seed=0, repeat=3, progress=None, **knobs):
+    """
+    Lex generated programs of each size serially and with a ParallelLexer
+    of each worker count in `jobs`. Returns the JSON-ready document with
+    the best time of each, its speedup over serial lexing and that speedup
+    per worker, and whether tokens, errors and counters matched the serial
+    lexer exactly. Pool start-up is part of every parallel time.
+    """
+    from generator import generate_program
+    from lexer import Lexer
+    from parallel_lexer import COUNTERS, ParallelLexer
+
+    def lex(make_lexer, text):
+        times = []
+        for _ in range(repeat):
+            lexer = make_lexer()
+            start = time.perf_counter()
+            tokens = lexer.tokenize(text)
+            times.append(time.perf_counter() - start)
+        return min(times) * 1000, (tokens, lexer.errors, [getattr(lexer, name) for name in COUNTERS])
+
+    points = []
+    for size in sizes:
+        text = generate_program(seed, statements=size, **knobs)
+        serial_ms, serial = lex(Lexer, text)
+        runs = []
+        for count in jobs:
+            min_ms, result = lex(lambda: ParallelLexer(count, min_chars=0), text)
+            runs.append({"jobs": count, "min_ms": min_ms, "speedup": serial_ms / min_ms,
+                         "efficiency": serial_ms / min_ms / count, "matches": result == serial})
+        point = {"statements": size, "mib": len(text) / 2 ** 20, "tokens": len(serial[0]),
+                 "serial_ms": serial_ms, "runs": runs}
+        points.append(point)
+        if progress is not None:
+            progress(point)
+
+    return {
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "knobs": knobs,
+        "points": points,
+    }
+
+
+def lex_then_parse(text):
+    """Token list first, then the parser over it"""
+    from lexer import Lexer
+    from parser import parse_lolcode
+
+    return parse_lolcode(Lexer().tokenize(text))
+
+
+def lex_and_parse(text):
+    """run_pipeline's fused pass: the parser pulls from the lexer and the tokens are kept"""
+    from lexer import Lexer
+    from parser import parse_lolcode
+
+    result = parse_lolcode(Lexer().iter_tokens(text), [])
+    result[1].stream.drain()
+    return result
+
+
+def stream_parse(text):
+    """The fused pass keeping no tokens, as a checker that only needs the parse would"""
+    from lexer import Lexer
+    from parser import parse_lolcode
+
+    return parse_lolcode(Lexer().iter_tokens(text))
+
+
+# run_streaming's ways of lexing and parsing a source text
+STREAM_MODES = {"separate": lex_then_parse, "fused": lex_and_parse, "streamed": stream_parse}
+
+
+def measure_program(text, repeat, timeout):
+    """
+    Best time and peak memory of each phase for one source text:
+    {"tokens", "status", "memory_status", "phases"}. A phase's "peak_kib"
+    is None when the memory-traced run did not finish.
+    """
+    times = {phase: [] for phase in PHASES}
+    status, tokens = "ok", []
+    for _ in range(repeat):
+        status, stats, tokens = run_once(text, [], timeout)
+        if status != "ok":
+            break
+        for record in stats.phases:
+            times[record.name].append(record.wall)
+    # Memory is traced in a separate run so it does not skew the times.
+    # tracemalloc slows it several times over, so having finished in time
+    # once, the program is traced without the time limit
+    memory_status, memory_stats = run_once(text, [], None, memory=True)[:2] if status == "ok" else (None, None)
+
+    phases = {}
+    for phase, samples in times.items():
+        if samples:
+            # A run cut short leaves a partial record for the phase it stopped in
+            record = memory_stats.get(phase) if memory_status == "ok" else None
+            phases[phase] = {"min_ms": min(samples) * 1000,
+                             "peak_kib": record.peak_memory / 1024 if record else None}
+    return {"tokens": len(tokens), "status": status, "memory_status": memory_status, "phases": phases}
+
+
+def growth_exponent(points, phase, key="min_ms"):
+    """
+    Least-squares slope of log(time) (or another `key` of the phase)
+    against log(tokens): about 1 for linear phases, about 2 for quadratic
+    ones. None with fewer than two points.
+    """
+    pairs = [(math.log(point["tokens"]), math.log(point["phases"][phase][key]))
+             for point in points
+             if point["status"] == "ok" and point["tokens"] and point["phases"].get(phase, {}).get(key)]
+    if len(pairs) < 2:
+        return None
+    mean_x = sum(x for x, _ in pairs) / len(pairs)
+    mean_y = sum(y for _, y in pairs) / len(pairs)
+    spread = sum((x - mean_x) ** 2 for x, _ in pairs)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in pairs) / spread
+
+
+def api_overhead(path, runs=100, timeout=DEFAULT_TIMEOUT, inputs=None):
+    """
+    Per-run cost of the full pipeline against interpreter.CompiledProgram.run
+    for one script, in milliseconds per run (best of three batches of
+    `runs`). Returns a result dict whose "status" says why a script was
+    skipped; only the first, untimed run is held to `timeout`.
+    """
+    from interpreter import compile_program
+
+    with open(path, 'r') as file:
+        text = file.read()
+    inputs = inputs if inputs is not None else inputs_for(path)
+    program = compile_program(text)
+    if not program.ok:
+        return {"path": path, "status": f"{program.failed_stage.lower()} errors"}
+
+    def pipeline_run():
+        run_pipeline(text, instruments=[InputFeeder(inputs)])
+
+    def compiled_run():
+        program.run(instruments=[InputFeeder(inputs)])
+
+    # One bounded run first; the timed batches then run without the timer
+    status = run_once(text, inputs, timeout)[0]
+    if status != "ok":
+        return {"path": path, "status": status}
+    with redirect_stdout(io.StringIO()):
+        pipeline_ms = best_batch(pipeline_run, runs)
+        compiled_ms = best_batch(compiled_run, runs)
+        compile_ms = best_batch(lambda: compile_program(text), max(1, runs // 10))
+    return {"path": path, "status": "ok", "pipeline_ms": pipeline_ms, "compiled_ms": compiled_ms,
+            "compile_ms": compile_ms}
+
+
+def best_batch(function, runs, batches=3):
+    """Best mean milliseconds per call of `function` over `batches` batches of `runs` calls"""
+    best = None
+    for _ in range(batches):
+        start = time.perf_counter()
+        for _ in range(runs):
+            function()
+        elapsed = (time.perf_counter() - start) / runs * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# ================================================================
+# ======================= REPORTING ==============================
+# ================================================================
+def format_result(name, result):
+    """One table row: min ms per phase and end to end"""
+    cells = []
+    for phase in PHASES + ["total"]:
+        timing = result["phases"].get(phase)
+        cells.append(f"{timing['min_ms']:>10.3f}" if timing else f"{'-':>10}")
+    status = "" if result["status"] == "ok" else f"  [{result['status']}]"
+    return f"{name:<34}" + " ".join(cells) + f" {result['statements']:>8}{status}"
+
+
+def format_header():
+    """================ format_header ================"""
+    return f"{'script (min ms)':<34}" + " ".join(f"{phase:>10}" for phase in PHASES + ["total"]) + \
+           f" {'stmts':>8}"
+
+
+def compare(current, baseline, threshold=0.10, floor_ms=NOISE_FLOOR_MS):
+    """
+    Phases whose min time grew by more than `threshold` (a fraction) and by
+    more than `floor_ms` against the baseline document. Returns
+    [(name, phase, baseline ms, current ms)].
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or result["status"] != "ok" or base["status"] != "ok":
+            continue
+        for phase, timing in result["phases"].items():
+            base_timing = base["phases"].get(phase)
+            if base_timing is None:
+                continue
+            old, new = base_timing["min_ms"], timing["min_ms"]
+            if new > old * (1 + threshold) and new - old > floor_ms:
+                regressions.append((name, phase, old, new))
+    return regressions
+
+
+def format_regressions(regressions):
+    """================ format_regressions ================"""
+    if not regressions:
+        return "No regressions against the baseline."
+    lines = [f"{len(regressions)} regression(s):"]
+    for name, phase, old, new in regressions:
+        lines.append(f"  {name:<34} {phase:<9} {old:>10.3f} -> {new:>10.3f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return "\n".join(lines)
+
+
+def print_progress(name, result):
+    """progress callback for run_suite that prints table rows"""
+    print(format_result(name, result), flush=True)
+
+
+def format_scaling_point(point, phases=PHASES):
+    """One scaling table row: time and peak memory per phase"""
+    size = point["depth"] if "depth" in point else point["statements"]
+    cells = []
+    for phase in phases:
+        timing = point["phases"].get(phase)
+        if timing:
+            peak = timing["peak_kib"]
+            # Memory that was not measured is shown like a missing phase
+            peak = f"{peak:>9.0f}" if peak is not None else f"{'-':>9}"
+            cells.append(f"{timing['min_ms']:>10.2f} {peak}")
+        else:
+            cells.append(f"{'-':>10} {'-':>9}")
+    status = "" if point["status"] == "ok" else f"  [{point['status']}]"
+    if point.get("memory_status") not in (None, "ok"):
+        status += f"  [memory: {point['memory_status']}]"
+    return f"{size:>8} {point['tokens']:>9} " + " ".join(cells) + status
+
+
+def format_scaling_header(label='stmts', phases=PHASES):
+    """================ format_scaling_header ================"""
+    return f"{label:>8} {'tokens':>9} " + " ".join(f"{phase + ' ms':>10} {'KiB':>9}" for phase in phases)
+
+
+def format_growth(growth, phases=PHASES, label="growth exponent vs tokens"):
+    """Growth exponents, marking phases that look worse than linear"""
+    cells = []
+    for phase in phases:
+        exponent = growth.get(phase)
+        if exponent is None:
+            cells.append(f"{phase} -")
+        else:
+            flag = " (superlinear)" if exponent > SUPERLINEAR_EXPONENT else ""
+            cells.append(f"{phase} {exponent:.2f}{flag}")
+    return f"{label}: " + ", ".join(cells)
+
+
+def format_parallel_header(jobs):
+    """================ format_parallel_header ================"""
+    return (f"{'stmts':>8} {'MiB':>6} {'tokens':>9} {'serial ms':>10} "
+            + " ".join(f"{f'{count} jobs ms':>11} {'speedup':>7}" for count in jobs))
+
+
+def format_parallel_point(point):
+    """One parallel lexing row; a run whose result differs from serial lexing is marked with '!'"""
+    cells = [f"{run['min_ms']:>11.2f} {run['speedup']:>6.2f}{'x' if run['matches'] else '!'}"
+             for run in point["runs"]]
+    return (f"{point['statements']:>8} {point['mib']:>6.2f} {point['tokens']:>9} {point['serial_ms']:>10.2f} "
+            + " ".join(cells))
+
+
+def format_api_header():
+    """================ format_api_header ================"""
+    return f"{'script (ms per run)':<34}{'pipeline':>10} {'compiled':>10} {'speedup':>8} {'compile':>10}"
+
+
+def format_api_result(name, result):
+    """One row of the compile-once comparison"""
+    if result["status"] != "ok":
+        return f"{name:<34}{'-':>10} {'-':>10} {'-':>8} {'-':>10}  [{result['status']}]"
+    speedup = result["pipeline_ms"] / result["compiled_ms"] if result["compiled_ms"] else 0.0
+    return (f"{name:<34}{result['pipeline_ms']:>10.3f} {result['compiled_ms']:>10.3f} "
+            f"{speedup:>7.1f}x {result['compile_ms']:>10.3f}")
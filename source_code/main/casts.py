@@ -0,0 +1,201 @@
+"""
+LOLCODE Type Casts
+Every conversion between the five value types lives in one matrix of
+converter functions, indexed by type code:
+
+    CASTS[TYPE_CODES['YARN']][TYPE_CODES['NUMBR']]('42')    # 42
+    cast('42', 'YARN', 'NUMBR')                             # the same, by name
+
+Explicit casts (IS NOW A, R MAEK, MAEK) call the converter for the
+variable's type and the named type; a cast that is not allowed raises
+CastError with the message Execute reports. The implicit coercions read
+the same entries for the context they are in:
+
+    to_number         literal operands of arithmetic and comparisons
+    variable_number   variables read by Execute.get_value
+    to_troof          boolean operands (Execute.get_bool_value)
+
+and SemanticAnalyzer asks the same questions before the program runs.
+The numeric reading of a YARN is parsed once per distinct text and cached,
+because loops coerce the same few strings over and over.
+"""
+import re
+from functools import lru_cache
+
+TYPES = ('NOOB', 'TROOF', 'NUMBR', 'NUMBAR', 'YARN')
+TYPE_CODES = {name: code for code, name in enumerate(TYPES)}
+NOOB, TROOF, NUMBR, NUMBAR, YARN = range(len(TYPES))
+
+NUMBR_TEXT = re.compile(r'^-?[0-9]+$')
+NUMBAR_TEXT = re.compile(r'^-?[0-9]+\.[0-9]+$')
+
+# First characters of every YARN with a numeric reading (numbers, WIN, FAIL)
+NUMBER_STARTS = frozenset('-0123456789WF')
+
+# YARNs that read as FAIL; every other YARN is WIN
+FAIL_YARNS = frozenset(('', '0', '0.0', 'FAIL', 'NOOB'))
+
+# Distinct YARN texts whose numeric readings are kept
+YARN_CACHE_SIZE = 4096
+
+
+class CastError(Exception):
+    """A cast the language does not allow; str() is the runtime error message"""
+
+
+def yarn_number(text):
+    """(value, dtype) of a YARN in arithmetic: a NUMBR or NUMBAR when it reads as one, else (text, 'YARN')"""
+    # Most YARNs that are not numbers are turned away by their first
+    # character, without hashing them into the cache
+    if text[:1] not in NUMBER_STARTS:
+        return text, 'YARN'
+    return parse_yarn_number(text)
+
+
+@lru_cache(maxsize=YARN_CACHE_SIZE)
+def parse_yarn_number(text):
+    """yarn_number's parse, cached per text"""
+    if NUMBR_TEXT.match(text):
+        return int(text), 'NUMBR'
+    if NUMBAR_TEXT.match(text):
+        return float(text), 'NUMBAR'
+    if text == 'WIN':
+        return 1.0, 'NUMBAR'
+    if text == 'FAIL':
+        return 0.0, 'NUMBAR'
+    return text, 'YARN'
+
+
+@lru_cache(maxsize=YARN_CACHE_SIZE)
+def yarn_to_numbar(text):
+    """Explicit YARN -> NUMBAR: only digits, '.' and '-' are allowed"""
+    if not all(c.isdigit() or c in '.-' for c in text):
+        raise CastError(f"Error: Cannot cast YARN '{text}' to NUMBAR - contains non-numerical characters")
+    try:
+        return float(text)
+    except ValueError:
+        raise CastError(f"Error: Cannot cast YARN '{text}' to NUMBAR") from None
+
+
+@lru_cache(maxsize=YARN_CACHE_SIZE)
+def yarn_to_numbr(text):
+    """Explicit YARN -> NUMBR: only digits and '-' are allowed"""
+    if not all(c.isdigit() or c == '-' for c in text):
+        raise CastError(f"Error: Cannot cast YARN '{text}' to NUMBR - contains non-numerical characters")
+    try:
+        return int(float(text))
+    except ValueError:
+        raise CastError(f"Error: Cannot cast YARN '{text}' to NUMBR") from None
+
+
+def refuse(source, target):
+    """Converter for a cast that is not allowed"""
+    def converter(value):
+        raise CastError(f"Error: Cannot cast {source} to {target}")
+    return converter
+
+
+def same(value):
+    """Converter for a cast to the type a value already has"""
+    return value
+
+
+# CASTS[source][target]: converter from a `source` value to `target`.
+# Numeric values may still be the text they were declared with, so the
+# numeric rows convert before they compare or format.
+CASTS = (
+    # NOOB
+    (refuse('NOOB', 'NOOB'),
+     lambda value: 'FAIL',
+     lambda value: 0,
+     lambda value: 0.0,
+     lambda value: ''),
+    # TROOF
+    (refuse('TROOF', 'NOOB'),
+     same,
+     lambda value: 1 if value == 'WIN' else 0,
+     lambda value: 1.0 if value == 'WIN' else 0.0,
+     str),
+    # NUMBR
+    (refuse('NUMBR', 'NOOB'),
+     lambda value: 'FAIL' if int(value) == 0 else 'WIN',
+     int,
+     float,
+     lambda value: str(int(value))),
+    # NUMBAR: a YARN keeps two decimal places
+    (refuse('NUMBAR', 'NOOB'),
+     lambda value: 'FAIL' if float(value) == 0.0 else 'WIN',
+     lambda value: int(float(value)),
+     float,
+     lambda value: f"{float(value):.2f}"),
+    # YARN
+    (refuse('YARN', 'NOOB'),
+     lambda value: 'FAIL' if value in FAIL_YARNS else 'WIN',
+     lambda value: yarn_to_numbr(str(value)),
+     lambda value: yarn_to_numbar(str(value)),
+     same),
+)
+
+
+def cast(value, source, target):
+    """Explicit cast of a `source` value to the type named `target`; raises CastError"""
+    source_code = TYPE_CODES.get(source)
+    if source_code is None:
+        raise CastError(f"Error: Unknown source type {source}")
+    target_code = TYPE_CODES.get(target)
+    if target_code is None:
+        raise CastError(f"Error: Cannot cast {source} to {target}")
+    return CASTS[source_code][target_code](value)
+
+
+# ----------------- Implicit coercions -----------------
+# to_number: NUMBRs and NUMBARs keep their type, a TROOF counts as a NUMBAR
+NUMERIC_CASTS = {
+    'NUMBR': lambda value, convert=CASTS[NUMBR][NUMBR]: (convert(value), 'NUMBR'),
+    'NUMBAR': lambda value, convert=CASTS[NUMBAR][NUMBAR]: (convert(value), 'NUMBAR'),
+    'TROOF': lambda value, convert=CASTS[TROOF][NUMBAR]: (convert(value), 'NUMBAR'),
+    'YARN': lambda value: yarn_number(str(value)),
+}
+
+# Types every value of which has a numeric reading
+NUMERIC_SOURCES = ('NUMBR', 'NUMBAR', 'TROOF')
+
+
+def to_number(value, dtype):
+    """(value, dtype) a literal or a TROOF takes part in arithmetic with"""
+    convert = NUMERIC_CASTS.get(dtype)
+    if convert is None:
+        return value, dtype
+    return convert(value)
+
+
+def variable_number(value, dtype):
+    """
+    (value, dtype) a variable is read as by get_value. A YARN that reads
+    as a number is always a NUMBAR here, unlike a YARN literal. Every
+    other type is left as it is held, for perform_operation to convert:
+    function parameters are bound as NOOB but hold their argument.
+    """
+    if dtype != 'YARN':
+        return value, dtype
+    number, number_type = yarn_number(str(value))
+    if number_type == 'NUMBR':
+        return float(number), 'NUMBAR'
+    return number, number_type
+
+
+# to_troof: the TROOF column of CASTS by type name
+TROOF_CASTS = {name: CASTS[code][TROOF] for name, code in TYPE_CODES.items()}
+
+
+def to_troof(value, dtype):
+    """'WIN' or 'FAIL' for an operand of a boolean operator; unknown types are FAIL"""
+    convert = TROOF_CASTS.get(dtype)
+    if convert is None:
+        return 'FAIL'
+    return convert(value)
+
+
+def reads_as_number(text):
+    """Whether a YARN has a numeric reading in arithmetic"""
+    return yarn_number(text)[1] != 'YARN'
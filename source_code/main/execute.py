@@ -1,10 +1,48 @@
 from parser import Parser
-import re
+from typeinfer import infer_types
+from inline import inline_bodies
+from casts import NUMERIC_CASTS, CastError, cast, to_number, to_troof, variable_number
+from slots import PARAMETER, UNDECLARED, SymbolView, lay_out, program_names, resolve_slots
+
+ARITHMETIC_OPERATORS = ('SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF')
+BOOLEAN_OPERATORS = ('BOTH OF', 'EITHER OF', 'WON OF', 'NOT')
+COMPARISON_OPERATORS = ('BOTH SAEM', 'DIFFRINT')
+LITERAL_TYPES = ('NUMBR', 'NUMBAR', 'YARN', 'TROOF')
+
+# Operand kinds manage_stack can reduce without get_value: 'typed' operands
+# were resolved when pushed (see push_operand), 'result' ones are truncated
+# to NUMBR the way get_value's generic path treats them
+RESOLVED_KINDS = ('typed', 'result')
+
+ARITHMETIC = {
+    'SUM OF': lambda left, right: left + right,
+    'DIFF OF': lambda left, right: left - right,
+    'PRODUKT OF': lambda left, right: left * right,
+    'QUOSHUNT OF': lambda left, right: left / right,
+    'MOD OF': lambda left, right: left % right,
+    'BIGGR OF': lambda left, right: left if left > right else right,
+    'SMALLR OF': lambda left, right: left if left < right else right,
+}
 
 class Execute(Parser):
-    def __init__(self, tokens, symbol_table, function_dictionary):
-        super().__init__(tokens)
+    def __init__(self, tokens, symbol_table, function_dictionary, gui_input=True):
+        # Only Parser's token cursor: running needs none of its parse state,
+        # and CPython keeps attribute lookups on its fast path only while an
+        # instance has at most 30 attributes
+        self.tokens = tokens
+        self.position = 0
+        self.gui_input = gui_input  # False: GIMMEH reads stdin, never opens a Tk dialog
+        self.output = None          # VISIBLE's file; None means sys.stdout
+        self.resumable = False      # True: steps() yields output and input requests instead
         self.errors = []
+        self.statement_count = 0
+        # Cheap position fields for samplers (profiler.SamplingProfiler)
+        self.current_line = 0
+        self.call_stack = []
+        # hooks.HookRegistry while one is attached
+        self.hooks = None
+        # Frames of the functions that called the running one (see slots)
+        self.callers = []
         self.symbol_table = symbol_table
         self.function_dictionary = function_dictionary
         self.op_stack = []
@@ -12,116 +50,112 @@ class Execute(Parser):
         self.outputs = []
 
         self.function_bodies = {}
+        # inline.inline_bodies: functions whose calls skip the frame switch
+        self.inline_bodies = {}
+        # typeinfer annotations for self.tokens (None: everything is dynamic);
+        # the token at position p has annotation types[p - type_base]
+        self.types = None
+        self.type_base = 0
+        # the annotations a function body without its own specialisation runs with
+        self.program_types = None
+        # end of the tokens being run: len(tokens), or the end of a function body
+        self.limit = len(tokens)
+
+    def current_token(self):
+        """Parser.current_token, ending at self.limit"""
+        if self.position < self.limit:
+            return self.tokens[self.position]
+        return None
 
-    def get_value(self, token):
-        """Extract value and datatype from a token"""
-        if token[2] == 'IDENTIFIER':
-            value = self.symbol_table[token[1]][0]
-            dtype = self.symbol_table[token[1]][3]
-            
-            # If the identifier holds a YARN, try to convert it to numeric
-            if dtype == 'YARN':
-                # Try to cast YARN to NUMBR or NUMBAR
-                if re.match(r'^-?[0-9]+$', str(value)):
-                    value = float(value)
-                    dtype = 'NUMBAR'
-                elif re.match(r'^-?[0-9]+\.[0-9]+$', str(value)):
-                    value = float(value)
-                    dtype = 'NUMBAR'
-                elif value == 'WIN':
-                    value = 1.0
-                    dtype = 'NUMBAR'
-                elif value == 'FAIL':
-                    value = 0.0
-                    dtype = 'NUMBAR'
-                    
-        elif token[2] == 'NUMBR':
-            value = int(token[1])
-            dtype = 'NUMBR'
-        elif token[2] == 'NUMBAR':
-            value = float(token[1])
-            dtype = 'NUMBAR'
-        elif token[2] == 'YARN':
-            # Implicit typecasting for YARN literals
-            yarn_val = token[1]
-            if re.match(r'^-?[0-9]+$', yarn_val):
-                value = int(yarn_val)
-                dtype = 'NUMBR'
-            elif re.match(r'^-?[0-9]+\.[0-9]+$', yarn_val):
-                value = float(yarn_val)
-                dtype = 'NUMBAR'
-            elif yarn_val == 'WIN':
-                value = 1.0
-                dtype = 'NUMBAR'
-            elif yarn_val == 'FAIL':
-                value = 0.0
-                dtype = 'NUMBAR'
-            else:
-                value = yarn_val
-                dtype = 'YARN'
-        elif token[2] == 'TROOF':
-            # Convert TROOF to numeric for arithmetic
-            if token[1] == 'WIN':
-                value = 1.0
-                dtype = 'NUMBAR'
-            else:  # FAIL
-                value = 0.0
-                dtype = 'NUMBAR'
-        else:
-            value = token[1]
-            dtype = token[2]
-        
-        return value, dtype
+    def peek(self, offset=1):
+        """Parser.peek, ending at self.limit"""
+        pos = self.position + offset
+        if pos < self.limit:
+            return self.tokens[pos]
+        return None
 
-    def get_bool_value(self, token):
-        """Extract boolean value from a token"""
-        if token[2] == 'IDENTIFIER':
-            val, _, _, dtype = self.symbol_table[token[1]]
+    @property
+    def symbol_table(self):
+        """The current frame as {name: (value, kind, line, type)} (slots.SymbolView)"""
+        return SymbolView(self)
+
+    @symbol_table.setter
+    def symbol_table(self, symbol_table):
+        """Lay a {name: entry} table out in slots as the current frame"""
+        self.slots = {}
+        resolve_slots(self.slots, symbol_table)
+        self.values, self.dtypes, self.decls = lay_out(symbol_table, self.slots)
+
+    def declare_slots(self, names):
+        """Slots for the names that have none, UNDECLARED in the current frame and every caller's"""
+        added = resolve_slots(self.slots, names)
+        if added:
+            for values, dtypes, decls in self.callers + [(self.values, self.dtypes, self.decls)]:
+                values.extend([UNDECLARED] * added)
+                dtypes.extend([None] * added)
+                decls.extend([None] * added)
+
+    def slot_for(self, name):
+        """The slot of `name`, which is given one if it has none"""
+        slot = self.slots.get(name)
+        if slot is None:
+            self.declare_slots((name,))
+            slot = self.slots[name]
+        return slot
+
+    def variable(self, name):
+        """(value, type) of a variable; KeyError, as from the symbol table, when it is not declared"""
+        slot = self.slots[name]
+        value = self.values[slot]
+        if value is UNDECLARED:
+            raise KeyError(name)
+        return value, self.dtypes[slot]
+
+    def assign(self, name, value, dtype):
+        """Store into a declared variable, which keeps the kind and line it was declared with"""
+        slot = self.slots[name]
+        if self.values[slot] is UNDECLARED:
+            raise KeyError(name)
+        self.values[slot] = value
+        self.dtypes[slot] = dtype
 
+    def get_value(self, token):
+        """Extract value and datatype from a token (casts.variable_number, casts.to_number)"""
+        kind = token[2]
+        if kind == 'IDENTIFIER':
+            slot = self.slots[token[1]]
+            value = self.values[slot]
+            if value is UNDECLARED:
+                raise KeyError(token[1])
+            dtype = self.dtypes[slot]
             if dtype == 'YARN':
-                if val in ['0', '0.0', 'FAIL', 'NOOB', '']:
-                    return 'FAIL'
-                elif val in ['1', '1.0', 'WIN']:
-                    return 'WIN'
-                else:
-                    # Non-empty string that's not explicitly false
-                    return 'WIN'
-
-            elif dtype == 'TROOF':
-                return 'FAIL' if val == 'FAIL' else 'WIN'
-
-            elif dtype == 'NUMBR':
-                return 'FAIL' if val in ['0', 0] else 'WIN'
-
-            elif dtype == 'NUMBAR':
-                return 'FAIL' if val in ['0.0', 0.0] else 'WIN'
-            
-            elif dtype == 'NOOB':
-                return 'FAIL'
-
-        elif token[2] == 'TROOF':
-            return token[1]  # Already 'WIN' or 'FAIL'
-
-        elif token[2] == 'YARN':
-            if token[1] in ['0', '0.0', 'FAIL', 'NOOB', '']:
-                return 'FAIL'
-            else:
-                return 'WIN'
+                return variable_number(value, 'YARN')
+            return value, dtype
+        if kind == 'typed':
+            # Resolved by push_operand
+            return token[1], token[3]
+        convert = NUMERIC_CASTS.get(kind)
+        if convert is not None:
+            return convert(token[1])
+        return token[1], kind
 
-        elif token[2] == 'NUMBR':
-            return 'FAIL' if token[1] in [0, '0'] else 'WIN'
-
-        elif token[2] == 'NUMBAR':
-            return 'FAIL' if token[1] in [0.0, '0.0'] else 'WIN'
-
-        elif token[2] == 'NOOB':
-            return 'FAIL'
-        
-        # Default to FAIL for unknown types
-        return 'FAIL'
+    def get_bool_value(self, token):
+        """Extract boolean value from a token (casts.to_troof)"""
+        kind = token[2]
+        if kind == 'IDENTIFIER':
+            return to_troof(*self.variable(token[1]))
+        if kind == 'result' or kind == 'typed':
+            return to_troof(token[1], token[3])
+        return to_troof(token[1], kind)
 
     def perform_operation(self, operator, left_val, left_dtype, right_val, right_dtype):
         """Perform the arithmetic operation and determine result type"""
+        # get_value leaves TROOF variables as they are held
+        if left_dtype == 'TROOF':
+            left_val, left_dtype = to_number(left_val, left_dtype)
+        if right_dtype == 'TROOF':
+            right_val, right_dtype = to_number(right_val, right_dtype)
+
         # Determine result datatype
         if left_dtype == 'NUMBAR' or right_dtype == 'NUMBAR':
             result_dtype = 'NUMBAR'
@@ -165,6 +199,20 @@ class Execute(Parser):
         
         return result, result_dtype
 
+    def perform_typed_operation(self, operator, left, right):
+        """
+        perform_operation for two resolved operands: their types are already
+        known, so only the conversion and the operator itself are left
+        """
+        left_dtype = left[3] if left[2] == 'typed' else 'result'
+        right_dtype = right[3] if right[2] == 'typed' else 'result'
+        left_val = float(left[1]) if left_dtype == 'NUMBAR' else int(left[1])
+        right_val = float(right[1]) if right_dtype == 'NUMBAR' else int(right[1])
+        result = ARITHMETIC[operator](left_val, right_val)
+        if operator == 'QUOSHUNT OF' or left_dtype == 'NUMBAR' or right_dtype == 'NUMBAR':
+            return result, 'NUMBAR'
+        return result, 'NUMBR'
+
     def perform_bool_operation(self, operator, left_val, right_val=None):
         """Perform boolean operation and return result"""
         result_dtype = 'TROOF'
@@ -199,6 +247,10 @@ class Execute(Parser):
 
     def perform_comparison_operation(self, operator, left_val, left_dtype, right_val, right_dtype):
         """Perform comparison operation and return TROOF result"""
+        if left_dtype == 'TROOF':
+            left_val, left_dtype = to_number(left_val, left_dtype)
+        if right_dtype == 'TROOF':
+            right_val, right_dtype = to_number(right_val, right_dtype)
         
         # Convert values to proper numeric types for comparison
         left = float(left_val) if left_dtype == 'NUMBAR' else int(left_val)
@@ -251,27 +303,13 @@ class Execute(Parser):
     def perform_concat_operation(self, operands):
         """Perform string concatenation on all operands"""
         result_parts = []
-        
         for operand in operands:
-            # Get the string value of each operand
-            if operand[2] == 'YARN':
-                result_parts.append(operand[1])
-            elif operand[2] == 'result':
-                # Already evaluated result
-                result_parts.append(str(operand[1]))
-            elif operand[2] == 'IDENTIFIER':
+            if operand[2] == 'IDENTIFIER':
                 value, dtype = self.get_value(operand)
                 result_parts.append(str(value))
-            elif operand[2] in ['NUMBR', 'NUMBAR', 'TROOF']:
-                result_parts.append(str(operand[1]))
             else:
                 result_parts.append(str(operand[1]))
-        
-        # Concatenate all parts
-        result = ''.join(result_parts)
-        result_dtype = 'YARN'
-        
-        return result, result_dtype
+        return ''.join(result_parts), 'YARN'
 
     def manage_stack(self):
         """Process stack when we have operator and operands"""
@@ -312,14 +350,18 @@ class Execute(Parser):
         # Check if tos2 is an operator and tos/tos1 are values
         if (isinstance(tos2, tuple) and tos2[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF'] and isinstance(tos, tuple) and isinstance(tos1, tuple)):
             
-            # Get values and datatypes using get_value for proper conversion
-            right_val, right_dtype = self.get_value(tos)
-            left_val, left_dtype = self.get_value(tos1)
-            
-            # Perform the operation
-            result, result_dtype = self.perform_operation(
-                tos2[1], left_val, left_dtype, right_val, right_dtype
-            )
+            if tos[2] in RESOLVED_KINDS and tos1[2] in RESOLVED_KINDS:
+                # Both types known: no coercion checks
+                result, result_dtype = self.perform_typed_operation(tos2[1], tos1, tos)
+            else:
+                # Get values and datatypes using get_value for proper conversion
+                right_val, right_dtype = self.get_value(tos)
+                left_val, left_dtype = self.get_value(tos1)
+
+                # Perform the operation
+                result, result_dtype = self.perform_operation(
+                    tos2[1], left_val, left_dtype, right_val, right_dtype
+                )
             
             # Pop the three items
             self.op_stack.pop()
@@ -371,14 +413,22 @@ class Execute(Parser):
 
         elif (isinstance(tos2, tuple) and tos2[1] in ['BOTH SAEM', 'DIFFRINT', 'BIGGR OF', 'SMALLR OF'] and isinstance(tos, tuple) and isinstance(tos1, tuple)):
 
-            # Use get_value to extract both operands
-            right_val, right_dtype = self.get_value(tos)
-            left_val, left_dtype = self.get_value(tos1)
-            
-            # Perform the operation
-            result, result_dtype = self.perform_comparison_operation(
-                tos2[1], left_val, left_dtype, right_val, right_dtype
-            )
+            if tos[2] in RESOLVED_KINDS and tos1[2] in RESOLVED_KINDS:
+                # Both types known: compare the converted values directly
+                left = float(tos1[1]) if tos1[2] == 'typed' and tos1[3] == 'NUMBAR' else int(tos1[1])
+                right = float(tos[1]) if tos[2] == 'typed' and tos[3] == 'NUMBAR' else int(tos[1])
+                equal = left == right
+                result = 'WIN' if equal == (tos2[1] == 'BOTH SAEM') else 'FAIL'
+                result_dtype = 'TROOF'
+            else:
+                # Use get_value to extract both operands
+                right_val, right_dtype = self.get_value(tos)
+                left_val, left_dtype = self.get_value(tos1)
+
+                # Perform the operation
+                result, result_dtype = self.perform_comparison_operation(
+                    tos2[1], left_val, left_dtype, right_val, right_dtype
+                )
             
             # Pop the three items
             self.op_stack.pop()
@@ -392,59 +442,139 @@ class Execute(Parser):
             return True
         return False
 
-    def execute_arithmetic_expr(self):
-        """Execute arithmetic expression"""
-        # Push the operator first
-        operator_token = self.consume()
-        self.op_stack.append(operator_token)
-        
-        # Process first operand
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        if self.current_token()[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']:
-            # Nested expression
-            self.execute_arithmetic_expr()
+    def push_operand(self):
+        """
+        Push the simple operand at the current position for an arithmetic or
+        comparison operator. Where type inference knows it is a NUMBR or
+        NUMBAR it goes on as ('NONE', value, 'typed', dtype), which
+        manage_stack reduces without get_value's coercions.
+        """
+        token = self.consume()
+        dtype = self.types[self.position - 1 - self.type_base] if self.types is not None else None
+        if dtype == 'NUMBR' or dtype == 'NUMBAR':
+            if token[2] == 'IDENTIFIER':
+                value = self.values[self.slots[token[1]]]
+                if value is UNDECLARED:
+                    raise KeyError(token[1])
+                self.op_stack.append(('NONE', value, 'typed', dtype))
+            else:
+                value, dtype = self.get_value(token)
+                self.op_stack.append(('NONE', value, 'typed', dtype))
         else:
-            # Simple operand
-            self.op_stack.append(self.current_token())
-            self.consume()
-        
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        # Consume 'AN'
-        if self.current_token()[1] == 'AN':
-            self.consume()
-        
-        # Process second operand
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        if self.current_token()[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']:
-            # Nested expression
-            self.execute_arithmetic_expr()
+            self.op_stack.append(token)
+
+    def push_bool_operand(self):
+        """Push a boolean operator's simple operand; a variable known to be a TROOF goes on as a result"""
+        token = self.consume()
+        if self.types is not None and self.types[self.position - 1 - self.type_base] == 'TROOF' and token[2] == 'IDENTIFIER':
+            value = self.values[self.slots[token[1]]]
+            if value is UNDECLARED:
+                raise KeyError(token[1])
+            self.op_stack.append(('NONE', 'FAIL' if value == 'FAIL' else 'WIN', 'result', 'TROOF'))
         else:
-            # Simple operand
-            self.op_stack.append(self.current_token())
-            self.consume()
-        
-        if self.current_token()[1] == '"':
-            self.consume()
+            self.op_stack.append(token)
+
+    def execute_arithmetic_expr(self):
+        """Execute arithmetic expression"""
+        self.execute_prefix_expr('arithmetic')
 
-        # Try to reduce the stack
-        self.manage_stack()
+    def execute_prefix_expr(self, kind):
+        """
+        Execute the arithmetic, boolean or comparison expression starting
+        here, leaving its result on op_stack. Each operator pushes itself and
+        its operands and manage_stack reduces it once the last one is in, as
+        before; an operator with a nested operator still to come waits on
+        `pending` instead of in a Python call, so nesting depth is bounded
+        only by memory.
+        """
+        current_token = self.current_token
+        pending = []  # (kind, operands still missing) of the enclosing operators
+        while True:
+            # Push the operator first
+            operator_token = self.consume()
+            self.op_stack.append(operator_token)
+            missing = 1 if kind == 'boolean' and operator_token[1] == 'NOT' else 2
+
+            while True:
+                if current_token()[1] == '"':
+                    self.consume()
+
+                current = current_token()[1]
+                if kind == 'boolean':
+                    nested = 'boolean' if current in BOOLEAN_OPERATORS else None
+                elif kind == 'comparison' and current in COMPARISON_OPERATORS:
+                    nested = 'comparison'
+                else:
+                    nested = 'arithmetic' if current in ARITHMETIC_OPERATORS else None
+                if nested is not None:
+                    # Nested expression
+                    pending.append((kind, missing))
+                    kind = nested
+                    break
+
+                # Simple operand
+                if kind == 'boolean':
+                    self.push_bool_operand()
+                else:
+                    self.push_operand()
+                if current_token()[1] == '"':
+                    self.consume()
+                missing -= 1
+
+                # Reduce every operator whose last operand is now in
+                while missing == 0:
+                    self.manage_stack()
+                    if not pending:
+                        return
+                    kind, missing = pending.pop()
+                    if current_token()[1] == '"':
+                        self.consume()
+                    missing -= 1
+
+                # Consume 'AN'
+                if current_token()[1] == 'AN':
+                    self.consume()
 
     def execute(self):
-        """Main execute entry point"""
+        """Main execute entry point: run the whole program synchronously"""
+        for _ in self.steps():
+            pass  # without resumable set, steps() never yields
 
+    def steps(self):
+        """
+        The program as a generator. With `resumable` set it yields
+        ('output', text) for every VISIBLE and ('input', var_name) at every
+        GIMMEH, where the value for the variable is passed back with send().
+        Otherwise it runs straight through, printing to self.output and
+        reading with read_input().
+        """
         while self.current_token()[1] != 'KTHXBYE':
-            self.execute_statement()
+            yield from self.execute_statement()
+
+    def request_input(self, var_name):
+        """================ request_input ================"""
+        if self.resumable:
+            return (yield ('input', var_name))
+        return self.read_input(var_name)
+
+    def write_output(self, text):
+        """================ write_output ================"""
+        if self.resumable:
+            yield ('output', text)
+        else:
+            print(text, end='', file=self.output)
 
 
     def execute_statement(self):
-        """Execute a single statement and advance tokens"""
+        """
+        Execute a single statement and advance tokens. Statements that can
+        reach VISIBLE or GIMMEH are generators (see steps()), so callers
+        run this with `yield from`.
+        """
         token = self.current_token()
+        if token[2] != 'NEWLINE':
+            self.statement_count += 1
+            self.current_line = token[3]
         if token[1] == 'VISIBLE':
             # Handle output statement
             self.consume()  # Consume VISIBLE
@@ -526,10 +656,10 @@ class Execute(Parser):
                 self.consume()  # Consume '!'
 
             # Output logic
-            if no_newline:
-                print(f"{''.join(self.outputs)}", end='')
-            else:
-                print(f"{''.join(self.outputs)}")
+            text = ''.join(self.outputs) + ('' if no_newline else '\n')
+            yield from self.write_output(text)
+            if self.hooks is not None:
+                self.hooks.emit('on_output', text)
         elif token[2] == 'IDENTIFIER' and self.peek()[1] == 'R' and self.peek(2)[1] != 'MAEK':
             self.execute_reassignment()
 
@@ -546,22 +676,22 @@ class Execute(Parser):
             self.execute_recast(3)
 
         elif token[1] == 'GIMMEH':
-            self.execute_input()
+            yield from self.execute_input()
 
         elif token[1] == 'O RLY?':
-            self.execute_conditional()
+            yield from self.execute_conditional()
 
         elif token[1] == 'WTF?':
-            self.execute_switch()
+            yield from self.execute_switch()
 
         elif token[1] == 'IM IN YR':
-            self.execute_loop()
+            yield from self.execute_loop()
 
         elif token[1] == 'HOW IZ I':
             self.execute_function_definition()
 
         elif token[1] == 'I IZ':
-            self.execute_function()
+            yield from self.execute_function()
 
               
         elif token[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']:
@@ -621,8 +751,9 @@ class Execute(Parser):
 
         elif token[2] == 'IDENTIFIER' and self.peek() and self.peek()[2] == 'NEWLINE':
             var_name = token[1]
-            if var_name in self.symbol_table:
-                value, _, _, dtype = self.symbol_table[var_name]
+            slot = self.slots.get(var_name)
+            if slot is not None and self.values[slot] is not UNDECLARED:
+                value, dtype = self.values[slot], self.dtypes[slot]
                 # Store in IT variable
                 self.it_var.append((value, token[0], token[2], dtype))
                 self.consume()  # Consume the identifier
@@ -640,148 +771,72 @@ class Execute(Parser):
 
     def execute_boolean_expr(self):
         """Execute boolean expression"""
-        operator_token = self.consume()
-        self.op_stack.append(operator_token)
-
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT']:
-            # Nested expression
-            self.execute_boolean_expr()
-        else:
-            # Simple operand
-            self.op_stack.append(self.current_token())
-            self.consume()
-        
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        # For NOT, we don't need a second operand
-        if operator_token[1] == 'NOT':
-            self.manage_stack()
-            return
-        
-        # Consume 'AN' for binary operators
-        if self.current_token()[1] == 'AN':
-            self.consume()
-        
-        # Process second operand
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT']:
-            # Nested expression
-            self.execute_boolean_expr()
-        else:
-            self.op_stack.append(self.current_token())
-            self.consume()
-        
-        if self.current_token()[1] == '"':
-            self.consume()
-        
-        self.manage_stack()
+        self.execute_prefix_expr('boolean')
 
     def execute_comparison_expr(self):
         """Execute comparison expression"""
-        
-        operator_token = self.consume()
-        self.op_stack.append(operator_token)
+        self.execute_prefix_expr('comparison')
 
-        # Handle first operand (left side)
-        if self.current_token()[1] == '"':
-            self.consume()
+    def execute_infinite_arity_expr(self):
+        """
+        Execute infinite arity boolean expression (ALL OF, ANY OF). An ALL OF
+        or ANY OF among the operands gets a frame on `pending` rather than a
+        recursive call.
+        """
+        pending = [(self.consume()[1], [])]  # (operator, operands so far)
 
-        # Check if first operand is a nested expression
-        if self.current_token()[1] in ['BOTH SAEM', 'DIFFRINT']:
-            self.execute_comparison_expr()
-        elif self.current_token()[1] in ['BIGGR OF', 'SMALLR OF', 'SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF']:
-            self.execute_arithmetic_expr()
-        else:
-            self.op_stack.append(self.current_token())
-            self.consume()
+        while pending:
+            operator, operands = pending[-1]
 
-        if self.current_token()[1] == '"':
-            self.consume()
+            # Collect operands until MKAY
+            if self.current_token()[1] == 'MKAY':
+                self.consume()
 
-        # Consume 'AN' separator
-        if self.current_token()[1] == 'AN':
-            self.consume()
+                # Perform the infinite arity operation
+                result, result_dtype = self.perform_infinite_arity_operation(operator, operands)
+                new_token = ('NONE', result, 'result', result_dtype)
+                pending.pop()
+                if not pending:
+                    # Push result to stack
+                    self.op_stack.append(new_token)
+                    continue
+                pending[-1][1].append(new_token)
 
-        # Handle second operand (right side)
-        if self.current_token()[1] == '"':
-            self.consume()
+            else:
+                # Skip quotes if present
+                if self.current_token()[1] == '"':
+                    self.consume()
 
-        # Check if second operand is a nested expression
-        if self.current_token()[1] in ['BOTH SAEM', 'DIFFRINT']:
-            self.execute_comparison_expr()
-        elif self.current_token()[1] in ['BIGGR OF', 'SMALLR OF', 'SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF']:
-            self.execute_arithmetic_expr()
-        else:
-            self.op_stack.append(self.current_token())
-            self.consume()
+                # Skip AN separator
+                if self.current_token()[1] == 'AN':
+                    self.consume()
+                    continue
 
-        if self.current_token()[1] == '"':
-            self.consume()
+                # Check for nested boolean expressions
+                if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT']:
+                    self.execute_boolean_expr()
 
-        self.manage_stack()
+                    # Reduce the stack to get the result
+                    while len(self.op_stack) > 1:
+                        if not self.manage_stack():
+                            break
+
+                    if len(self.op_stack) >= 1:
+                        operands.append(self.op_stack.pop())
+
+                # Nested infinite arity expressions get their own frame
+                elif self.current_token()[1] in ['ALL OF', 'ANY OF']:
+                    pending.append((self.consume()[1], []))
+                    continue
+
+                # Simple operand
+                else:
+                    operands.append(self.current_token())
+                    self.consume()
 
-    def execute_infinite_arity_expr(self):
-        """Execute infinite arity boolean expression (ALL OF, ANY OF)"""
-        operator_token = self.consume()
-        operator = operator_token[1]
-        
-        operands = []
-        
-        # Collect all operands until MKAY
-        while self.current_token()[1] != 'MKAY':
-            # Skip quotes if present
-            if self.current_token()[1] == '"':
-                self.consume()
-            
-            # Skip AN separator
-            if self.current_token()[1] == 'AN':
-                self.consume()
-                continue
-            
-            # Check for nested boolean expressions
-            if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT']:
-                self.execute_boolean_expr()
-                
-                # Reduce the stack to get the result
-                while len(self.op_stack) > 1:
-                    if not self.manage_stack():
-                        break
-                
-                if len(self.op_stack) >= 1:
-                    operands.append(self.op_stack.pop())
-            
-            # Check for nested infinite arity expressions
-            elif self.current_token()[1] in ['ALL OF', 'ANY OF']:
-                self.execute_infinite_arity_expr()
-                
-                if len(self.op_stack) >= 1:
-                    operands.append(self.op_stack.pop())
-            
-            # Simple operand
-            else:
-                operands.append(self.current_token())
-                self.consume()
-            
             # Skip quotes if present
             if self.current_token()[1] == '"':
                 self.consume()
-        
-        # Consume MKAY
-        if self.current_token()[1] == 'MKAY':
-            self.consume()
-        
-        # Perform the infinite arity operation
-        result, result_dtype = self.perform_infinite_arity_operation(operator, operands)
-        
-        # Push result to stack
-        new_token = ('NONE', result, 'result', result_dtype)
-        self.op_stack.append(new_token)
 
 
     def execute_concat_expr(self):
@@ -954,8 +1009,7 @@ class Execute(Parser):
             
             if len(self.op_stack) == 1:
                 result = self.op_stack.pop()  # ('NONE', value, 'result', dtype)
-                old_entry = self.symbol_table[var_token[1]]
-                self.symbol_table[var_token[1]] = (result[1], old_entry[1], old_entry[2], result[3])
+                self.assign(var_token[1], result[1], result[3])
         
         # Handle boolean expressions
         elif current[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT']:
@@ -967,8 +1021,7 @@ class Execute(Parser):
             
             if len(self.op_stack) == 1:
                 result = self.op_stack.pop()
-                old_entry = self.symbol_table[var_token[1]]
-                self.symbol_table[var_token[1]] = (result[1], old_entry[1], old_entry[2], result[3])
+                self.assign(var_token[1], result[1], result[3])
         
         # Handle infinite arity boolean expressions
         elif current[1] in ['ALL OF', 'ANY OF']:
@@ -976,8 +1029,7 @@ class Execute(Parser):
             
             if len(self.op_stack) == 1:
                 result = self.op_stack.pop()
-                old_entry = self.symbol_table[var_token[1]]
-                self.symbol_table[var_token[1]] = (result[1], old_entry[1], old_entry[2], result[3])
+                self.assign(var_token[1], result[1], result[3])
         
         # Handle comparison expressions
         elif current[1] in ['BOTH SAEM', 'DIFFRINT']:
@@ -989,8 +1041,7 @@ class Execute(Parser):
             
             if len(self.op_stack) == 1:
                 result = self.op_stack.pop()
-                old_entry = self.symbol_table[var_token[1]]
-                self.symbol_table[var_token[1]] = (result[1], old_entry[1], old_entry[2], result[3])
+                self.assign(var_token[1], result[1], result[3])
         
         # Handle string concatenation
         elif current[1] == 'SMOOSH':
@@ -998,33 +1049,22 @@ class Execute(Parser):
             
             if len(self.op_stack) == 1:
                 result = self.op_stack.pop()
-                old_entry = self.symbol_table[var_token[1]]
-                self.symbol_table[var_token[1]] = (result[1], old_entry[1], old_entry[2], result[3])
+                self.assign(var_token[1], result[1], result[3])
         
         # Handle variable assignment: <variable> R <variable>
         elif current[2] == 'IDENTIFIER':
-            if current[1] in self.symbol_table:
+            slot = self.slots.get(current[1])
+            if slot is not None and self.values[slot] is not UNDECLARED:
                 # Get value from the source variable
-                source_value = self.symbol_table[current[1]][0]
-                source_dtype = self.symbol_table[current[1]][3]
-                
-                old_entry = self.symbol_table[var_token[1]]
-                self.symbol_table[var_token[1]] = (source_value, old_entry[1], old_entry[2], source_dtype)
+                self.assign(var_token[1], self.values[slot], self.dtypes[slot])
                 self.consume()
         
         # Handle literal assignment: <variable> R <literal>
-        elif current[2] in ['NUMBR', 'NUMBAR', 'YARN', 'TROOF']:
-            value = current[1]
+        elif current[2] in LITERAL_TYPES:
             dtype = current[2]
+            value = cast(current[1], dtype, dtype)  # Convert to proper type
             
-            # Convert to proper type
-            if dtype == 'NUMBR':
-                value = int(value)
-            elif dtype == 'NUMBAR':
-                value = float(value)
-            
-            old_entry = self.symbol_table[var_token[1]]
-            self.symbol_table[var_token[1]] = (value, old_entry[1], old_entry[2], dtype)
+            self.assign(var_token[1], value, dtype)
             self.consume()
         
         else:
@@ -1079,124 +1119,12 @@ class Execute(Parser):
         new_type = new_type_token[1]
         self.consume()
         
-        new_value = None
-        
-        # ============= NOOB TYPE CASTING =============
-        if current_type == 'NOOB':
-            if new_type == 'TROOF':
-                new_value = 'FAIL'
-            elif new_type == 'NUMBR':
-                new_value = 0
-            elif new_type == 'NUMBAR':
-                new_value = 0.0
-            elif new_type == 'YARN':
-                new_value = ''
-            else:
-                self.errors.append(f"Error: Cannot cast NOOB to {new_type}")
-                return
-        
-        # ============= TROOF TYPE CASTING =============
-        elif current_type == 'TROOF':
-            if new_type == 'NUMBR':
-                # WIN -> 1, FAIL -> 0
-                new_value = 1 if current_value == 'WIN' else 0
-            elif new_type == 'NUMBAR':
-                # WIN -> 1.0, FAIL -> 0.0
-                new_value = 1.0 if current_value == 'WIN' else 0.0
-            elif new_type == 'YARN':
-                # Convert to string
-                new_value = str(current_value)
-            elif new_type == 'TROOF':
-                # Same type, no change
-                new_value = current_value
-            else:
-                self.errors.append(f"Error: Cannot cast TROOF to {new_type}")
-                return
-        
-        # ============= NUMBAR TYPE CASTING =============
-        elif current_type == 'NUMBAR':
-            if new_type == 'NUMBR':
-                # Truncate decimal portion
-                new_value = int(current_value)
-            elif new_type == 'YARN':
-                # Truncate to 2 decimal places
-                new_value = f"{current_value:.2f}"
-            elif new_type == 'TROOF':
-                # 0.0 -> FAIL, others -> WIN
-                new_value = 'FAIL' if current_value == 0.0 else 'WIN'
-            elif new_type == 'NUMBAR':
-                # Same type, no change
-                new_value = current_value
-            else:
-                self.errors.append(f"Error: Cannot cast NUMBAR to {new_type}")
-                return
-        
-        # ============= NUMBR TYPE CASTING =============
-        elif current_type == 'NUMBR':
-            if new_type == 'NUMBAR':
-                # Convert to floating point
-                new_value = float(current_value)
-            elif new_type == 'YARN':
-                # Convert to string
-                new_value = str(current_value)
-            elif new_type == 'TROOF':
-                # 0 -> FAIL, others -> WIN
-                new_value = 'FAIL' if current_value == 0 else 'WIN'
-            elif new_type == 'NUMBR':
-                # Same type, no change
-                new_value = current_value
-            else:
-                self.errors.append(f"Error: Cannot cast NUMBR to {new_type}")
-                return
-        
-        # ============= YARN TYPE CASTING =============
-        elif current_type == 'YARN':
-            if new_type == 'NUMBAR':
-                # Try to convert to float
-                try:
-                    # Check if string contains only valid characters (digits, hyphen, period)
-                    if all(c.isdigit() or c in '.-' for c in str(current_value)):
-                        new_value = float(current_value)
-                    else:
-                        self.errors.append(f"Error: Cannot cast YARN '{current_value}' to NUMBAR - contains non-numerical characters")
-                        return
-                except ValueError:
-                    self.errors.append(f"Error: Cannot cast YARN '{current_value}' to NUMBAR")
-                    return
-            
-            elif new_type == 'NUMBR':
-                # Try to convert to int
-                try:
-                    # Check if string contains only valid characters (digits, hyphen)
-                    if all(c.isdigit() or c == '-' for c in str(current_value)):
-                        new_value = int(float(current_value))  # Convert via float to handle "5.0" -> 5
-                    else:
-                        self.errors.append(f"Error: Cannot cast YARN '{current_value}' to NUMBR - contains non-numerical characters")
-                        return
-                except ValueError:
-                    self.errors.append(f"Error: Cannot cast YARN '{current_value}' to NUMBR")
-                    return
-            
-            elif new_type == 'TROOF':
-                # Empty string or "0" or "0.0" -> FAIL, others -> WIN
-                if current_value in ['', '0', '0.0', 'FAIL', 'NOOB']:
-                    new_value = 'FAIL'
-                else:
-                    new_value = 'WIN'
-            
-            elif new_type == 'YARN':
-                # Same type, no change
-                new_value = current_value
-            
-            else:
-                self.errors.append(f"Error: Cannot cast YARN to {new_type}")
-                return
-        
-        else:
-            self.errors.append(f"Error: Unknown source type {current_type}")
-            return 
+        try:
+            new_value = cast(current_value, current_type, new_type)
+        except CastError as error:
+            self.errors.append(str(error))
+            return
 
-        
         if type == 1:
             # Update symbol table with new value and type
             self.symbol_table[var_name] = (new_value, old1, old2, new_type)
@@ -1221,22 +1149,30 @@ class Execute(Parser):
 
         current_value, old1, old2, current_type = self.symbol_table[var_name]
 
-        try:
-            import tkinter as tk
-            from tkinter import simpledialog
-            # GUI mode
-            root = tk.Tk()
-            root.withdraw()  # Hide the main window
-            new_value = simpledialog.askstring("Input", f"Enter value for {var_name}:")
-            if new_value is None:  # User cancelled
-                new_value = ""
-        except:
-        # CLI mode
-            new_value = input()
-    
+        if self.hooks is not None:
+            self.hooks.emit('on_input', var_name)
+        new_value = yield from self.request_input(var_name)
 
         self.symbol_table[var_name] = (new_value, old1, old2, 'YARN')
 
+    def read_input(self, var_name):
+        """Value for GIMMEH: a Tk dialog in GUI mode, otherwise a line from stdin"""
+        if self.gui_input:
+            try:
+                import tkinter as tk
+                from tkinter import simpledialog
+                # GUI mode
+                root = tk.Tk()
+                root.withdraw()  # Hide the main window
+                new_value = simpledialog.askstring("Input", f"Enter value for {var_name}:")
+                if new_value is None:  # User cancelled
+                    new_value = ""
+                return new_value
+            except:
+                pass
+        # CLI mode
+        return input()
+
     def execute_conditional(self):
         # Consume 'O RLY?'
         self.consume()
@@ -1266,7 +1202,7 @@ class Execute(Parser):
         if is_truthy:
             # Execute YA RLY block
             while self.current_token() and self.current_token()[1] not in ['MEBBE', 'NO WAI', 'OIC']:
-                self.execute_statement()
+                yield from self.execute_statement()
             executed = True
         else:
             # Skip YA RLY block
@@ -1303,7 +1239,7 @@ class Execute(Parser):
                     if mebbe_is_true:
                         # Execute this MEBBE block
                         while self.current_token() and self.current_token()[1] not in ['MEBBE', 'NO WAI', 'OIC']:
-                            self.execute_statement()
+                            yield from self.execute_statement()
                         executed = True
                     else:
                         # Skip this MEBBE block
@@ -1336,7 +1272,7 @@ class Execute(Parser):
             if not executed:
                 # Execute NO WAI block (only if no previous branch executed)
                 while self.current_token() and self.current_token()[1] != 'OIC':
-                    self.execute_statement()
+                    yield from self.execute_statement()
             else:
                 # Skip NO WAI block
                 while self.current_token() and self.current_token()[1] != 'OIC':
@@ -1373,16 +1309,8 @@ class Execute(Parser):
             token = self.current_token()
             
             # Extract case value based on token type
-            if token[2] == 'NUMBR':  # Integer literal
-                case_value = int(token[1])
-            elif token[2] == 'NUMBAR':  # Float literal
-                case_value = float(token[1])
-            elif token[2] == 'YARN':  # String literal
-                case_value = token[1]
-            elif token[2] == 'TROOF':  # Boolean literal (WIN/FAIL)
-                case_value = token[1]
-            elif token[1] in ['WIN', 'FAIL']:  # Explicit boolean check
-                case_value = token[1]
+            if token[2] in LITERAL_TYPES:
+                case_value = cast(token[1], token[2], token[2])
             else:
                 case_value = token[1]
             
@@ -1412,7 +1340,7 @@ class Execute(Parser):
                             self.consume()
                         break
                     
-                    self.execute_statement()
+                    yield from self.execute_statement()
                 
                 # If we finished the case without GTFO, enable fall-through
                 if self.current_token() and self.current_token()[1] in ['OMG', 'OMGWTF']:
@@ -1443,7 +1371,7 @@ class Execute(Parser):
                         while self.current_token() and self.current_token()[2] == 'NEWLINE':
                             self.position += 1
                         break
-                    self.execute_statement()
+                    yield from self.execute_statement()
             else:
                 # Skip default case
                 while self.current_token() and self.current_token()[1] != 'OIC':
@@ -1511,6 +1439,7 @@ class Execute(Parser):
 
          
             self.position = condition_start_pos
+            self.current_line = label_token[3]  # condition and UPPIN/NERFIN belong to the loop line
             condition_result = self.evaluate_loop_condition()
 
             if condition_type == 'WILE':
@@ -1521,6 +1450,9 @@ class Execute(Parser):
             if not should_continue:
                 break
 
+            if self.hooks is not None:
+                self.hooks.emit('on_loop_iteration', label)
+
          
             self.position = body_start_pos
             broke_out = False
@@ -1540,38 +1472,32 @@ class Execute(Parser):
                     broke_out = True
                     break
 
-                self.execute_statement()
+                yield from self.execute_statement()
 
             if broke_out:
                 break
 
            
             
-            dtype = self.symbol_table[loop_var][3]
-            old_entry = self.symbol_table[loop_var]
+            current_val, dtype = self.variable(loop_var)
+            slot = self.slots[loop_var]
 
             if dtype == 'NUMBR':
-                current_val = int(self.symbol_table[loop_var][0])
+                current_val = int(current_val)
                 if operation == 'UPPIN':
                     new_val = current_val + 1
                 else:
                     new_val = current_val - 1
                 # Store as integer, not string
-                self.symbol_table[loop_var] = (new_val,
-                                               old_entry[1],
-                                               old_entry[2],
-                                               dtype)
+                self.values[slot] = new_val
             else:  # NUMBAR
-                current_val = float(self.symbol_table[loop_var][0])
+                current_val = float(current_val)
                 if operation == 'UPPIN':
                     new_val = current_val + 1
                 else:
                     new_val = current_val - 1
                 # Store as float
-                self.symbol_table[loop_var] = (new_val,
-                                               old_entry[1],
-                                               old_entry[2],
-                                               dtype)
+                self.values[slot] = new_val
 
             iteration += 1
 
@@ -1621,7 +1547,7 @@ class Execute(Parser):
         saved = self.position
         depth = 1
 
-        while self.position < len(self.tokens):
+        while self.position < self.limit:
             tok = self.tokens[self.position][1]
 
             # merged start
@@ -1638,7 +1564,7 @@ class Execute(Parser):
 
             # split version
             elif tok == "IM":
-                if self.position + 2 < len(self.tokens):
+                if self.position + 2 < self.limit:
                     n1 = self.tokens[self.position + 1][1]
                     n2 = self.tokens[self.position + 2][1]
 
@@ -1697,46 +1623,14 @@ class Execute(Parser):
 
     def store_function_bodies(self):
         """
-        Scan through all tokens and store complete function definitions.
-        Stores tokens from 'HOW IZ I' to 'IF U SAY SO' (inclusive) for each function.
-        Key: function name
-        Value: list of tokens for that function
+        Parser.store_function_bodies, then the bodies small enough to
+        inline; every name the program can use is given its slot here
         """
-        pos = 0
-        
-        while pos < len(self.tokens):
-            token = self.tokens[pos]
-            
-            # Check if we found a function definition
-            if token[1] == 'HOW IZ I':
-                # Get function name (next token after HOW IZ I)
-                if pos + 1 < len(self.tokens):
-                    func_name = self.tokens[pos + 1][1]
-                    
-                    # Find the end of this function (IF U SAY SO)
-                    start_pos = pos
-                    end_pos = pos
-                    
-                    # Search for IF U SAY SO
-                    while end_pos < len(self.tokens):
-                        if self.tokens[end_pos][1] == 'IF U SAY SO':
-                            # Include IF U SAY SO in the stored tokens
-                            end_pos += 1
-                            break
-                        end_pos += 1
-                    
-                    # Store the complete function (from HOW IZ I to IF U SAY SO inclusive)
-                    self.function_bodies[func_name] = self.tokens[start_pos:end_pos]
-                    
-                    
-                    # Move position past this function
-                    pos = end_pos
-                    continue
-            
-            pos += 1
-        
+        super().store_function_bodies()
+        self.program_types = self.types
+        self.inline_bodies = inline_bodies(self.function_bodies, self.function_dictionary)
+        self.declare_slots(program_names(self.tokens, self.inline_bodies))
 
-                    
     def execute_function_definition(self):
         """Skip function definition during normal execution"""
         token = self.consume('HOW IZ I')
@@ -1748,6 +1642,9 @@ class Execute(Parser):
         """
         Executes: I IZ <func_name> [YR <arg1> [AN YR <arg2> ...]] MKAY
         """
+        # Type inference annotates the I IZ token with the body specialised
+        # for this call's argument types
+        call_types = self.types[self.position - self.type_base] if self.types is not None else None
         if self.current_token()[1] == 'I':
             self.consume(); self.consume() # I, IZ
         else:
@@ -1782,24 +1679,43 @@ class Execute(Parser):
         if len(args_values) != len(expected_params):
             raise Exception(f"Function '{func_name}' expects {len(expected_params)} args, got {len(args_values)}")
 
+        # Traced runs keep the real call so on_call/on_return still fire
+        inline = self.inline_bodies.get(func_name) if self.hooks is None else None
+        if inline is not None:
+            return self.execute_inline(func_name, inline, args_values, call_types)
+
         old_tokens = self.tokens
+        old_limit = self.limit
+        old_types = self.types
+        old_type_base = self.type_base
         old_position = self.position
-        old_symbol_table = self.symbol_table
-        
+
         # Copy global scope so we don't pollute it, but can still read globals if needed
-        local_symbol_table = old_symbol_table.copy()
-        
+        self.callers.append((self.values, self.dtypes, self.decls))
+        self.values, self.dtypes, self.decls = self.values[:], self.dtypes[:], self.decls[:]
+
         # Bind arguments
         for i, (param_name, _) in enumerate(expected_params):
-            # Storing as (value, type, subtype, internal_type)
-            local_symbol_table[param_name] = (args_values[i], None, None, 'NOOB')
-
-        self.tokens = self.function_bodies[func_name]
-        self.position = 0
-        self.symbol_table = local_symbol_table
+            slot = self.slot_for(param_name)
+            self.values[slot] = args_values[i]
+            self.dtypes[slot] = 'NOOB'
+            self.decls[slot] = PARAMETER
+
+        # The body runs where it lies in the program's tokens, up to its end
+        body = self.function_bodies[func_name]
+        self.tokens = body.tokens
+        self.limit = body.stop
+        self.position = body.start
+        if call_types is not None:
+            self.types, self.type_base = call_types, body.start
+        else:
+            self.types, self.type_base = self.program_types, 0
+        self.call_stack.append(func_name)
+        if self.hooks is not None:
+            self.hooks.emit('on_call', func_name, args_values)
         
         # Skip the definition line (HOW IZ I ...)
-        while self.position < len(self.tokens):
+        while self.position < self.limit:
             if self.current_token()[2] == 'NEWLINE':
                 self.consume()
                 break
@@ -1808,14 +1724,15 @@ class Execute(Parser):
         
         # Default return is NOOB (represented as None in Python)
         return_value = None 
+        return_type = 'NOOB'
 
-        while self.position < len(self.tokens):
+        while self.position < self.limit:
             current = self.current_token()
             token_type = current[1]
 
             if token_type == 'FOUND YR':
                 self.consume()
-                return_value = self.evaluate_expression()
+                return_value, return_type = self.evaluate_typed_expression()
                 break 
             
             elif token_type == 'GTFO':
@@ -1828,17 +1745,71 @@ class Execute(Parser):
 
             # CASE D: Execute Statement
             else:
-                self.execute_statement()
+                yield from self.execute_statement()
 
         self.tokens = old_tokens
+        self.limit = old_limit
+        self.types = old_types
+        self.type_base = old_type_base
         self.position = old_position
-        self.symbol_table = old_symbol_table
+        self.values, self.dtypes, self.decls = self.callers.pop()
+        self.call_stack.pop()
+        if self.hooks is not None:
+            self.hooks.emit('on_return', func_name, return_value)
         
-        # Update IT variable
-        self.it_var = return_value
+        # Update IT variable (same (value, desc, kind, type) shape as expression results)
+        self.it_var.append((return_value, 'Function Return', 'IDENTIFIER', return_type))
         
         # Return for nested calls
         return return_value
+
+    def execute_inline(self, func_name, inline, args_values, call_types):
+        """
+        execute_function for a body from inline.inline_bodies: its FOUND YR
+        expression is evaluated against the caller's symbol table, with the
+        renamed parameters bound only while it runs
+        """
+        names, tokens, start = inline
+        old_tokens = self.tokens
+        old_limit = self.limit
+        old_types = self.types
+        old_type_base = self.type_base
+        old_position = self.position
+
+        for name, value in zip(names, args_values):
+            slot = self.slot_for(name)
+            self.values[slot] = value
+            self.dtypes[slot] = 'NOOB'
+            self.decls[slot] = PARAMETER
+        # `tokens` is a copy of the body, so the program's annotations are
+        # offset by where the body starts
+        self.tokens = tokens
+        self.limit = len(tokens)
+        if call_types is not None:
+            self.types, self.type_base = call_types, 0
+        else:
+            self.types, self.type_base = self.program_types, -self.function_bodies[func_name].start
+        self.position = start
+        self.call_stack.append(func_name)
+        try:
+            return_value, return_type = self.evaluate_typed_expression()
+        finally:
+            # A raising body must not leave the caller reading the copy
+            for name in names:
+                slot = self.slots[name]
+                self.values[slot] = UNDECLARED
+                self.dtypes[slot] = None
+                self.decls[slot] = None
+            self.tokens = old_tokens
+            self.limit = old_limit
+            self.types = old_types
+            self.type_base = old_type_base
+            self.position = old_position
+            self.call_stack.pop()
+
+        self.it_var.append((return_value, 'Function Return', 'IDENTIFIER', return_type))
+        return return_value
+
     def evaluate_expression(self):
         """Helper to evaluate literal, variable, or arithmetic expression"""
         # You likely already have this logic. 
@@ -1859,21 +1830,60 @@ class Execute(Parser):
         elif current[2] == 'IDENTIFIER':
             var_name = current[1]
             self.consume()
-            return self.symbol_table[var_name][0]
+            return self.variable(var_name)[0]
             
         return None
 
+    def evaluate_typed_expression(self):
+        """
+        evaluate_expression for a FOUND YR: (value, type), the type being
+        the one an assignment of the value would store, so IT is tagged
+        with what the function really returned
+        """
+        current = self.current_token()
+
+        if current[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'BOTH SAEM']:
+            self.execute_arithmetic_expr()
+            result = self.op_stack.pop()
+            return result[1], result[3]
+
+        elif current[2] in ['NUMBR', 'NUMBAR', 'YARN', 'TROOF']:
+            self.consume()
+            return current[1], current[2]
+
+        elif current[2] == 'IDENTIFIER':
+            self.consume()
+            return self.variable(current[1])
+
+        return None, 'NOOB'
+
    
-def execute_lolcode(tokens, symbol_table, function_dictionary):
-    """Entry point for code execution"""
-    executor = Execute(tokens, symbol_table, function_dictionary)
+def execute_lolcode(tokens, symbol_table, function_dictionary, gui_input=True, phase_stats=None,
+                    instruments=()):
+    """
+    Entry point for code execution. Operand types are inferred first (see
+    typeinfer) so the executor can skip coercion checks where they are
+    known. Fills phase_stats (instrument.PhaseStats) when given; each of
+    `instruments` (e.g. profiler.LineProfiler) is attached to the executor
+    before it runs and detached when it stops.
+    """
+    executor = Execute(tokens, symbol_table, function_dictionary, gui_input)
+    executor.types, _ = infer_types(tokens, symbol_table)
     executor.store_function_bodies()
-    executor.execute()
-    new_symbol_table = executor.symbol_table
+    for instrument in instruments:
+        instrument.attach(executor)
+    try:
+        executor.execute()
+    finally:
+        for instrument in instruments:
+            instrument.detach(executor)
+        if phase_stats is not None:
+            phase_stats.tokens = len(tokens)
+            phase_stats.statements = executor.statement_count
+    new_symbol_table = dict(executor.symbol_table)
     new_function_dictionary = executor.function_dictionary
     new_errors = executor.errors
     new_outputs = executor.outputs
-    print(executor.it_var)
     if len(executor.it_var) != 0:
         it_var = executor.it_var[-1][0]
         new_symbol_table['IT'] = it_var
@@ -0,0 +1,212 @@
+"""
+LOLCODE Program Generator
+Emits valid LOLCODE of a chosen size and shape for scaling tests. The same
+seed and knobs always give the same program.
+
+Knobs:
+    variables        WAZZUP variables (all NUMBRs)
+    statements       statements in the main program (nested ones included)
+    expr_depth       nesting depth of arithmetic expressions
+    loop_depth       deepest IM IN YR nesting
+    branch_density   chance that a statement opens an O RLY? or WTF? block
+    functions        HOW IZ I functions
+    fan_out          calls each function makes to earlier functions
+    loop_iterations  iterations of every generated loop
+
+Call arguments are single NUMBR tokens so every call agrees on parameter
+types. Values are kept small with MOD OF so long runs never build huge numbers,
+divisions are avoided, and functions only call functions defined before
+them, so generated programs always terminate.
+"""
+import random
+
+ARITHMETIC_OPERATORS = ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'BIGGR OF', 'SMALLR OF']
+
+# Kept small so nested loops stay cheap to execute
+DEFAULT_LOOP_ITERATIONS = 3
+
+# Deepest nesting of O RLY?/WTF? blocks inside each other
+MAX_BRANCH_DEPTH = 2
+
+INDENT = "    "
+
+
+class ProgramGenerator:
+    """Builds one random program; call generate() for its source text"""
+
+    def __init__(self, seed=0, variables=10, statements=100, expr_depth=2, loop_depth=1,
+                 branch_density=0.1, functions=2, fan_out=1, loop_iterations=DEFAULT_LOOP_ITERATIONS):
+        """================ __init__ ================"""
+        self.random = random.Random(seed)
+        self.variables = [f"v{i}" for i in range(max(1, variables))]
+        self.statements = statements
+        self.expr_depth = expr_depth
+        self.loop_depth = loop_depth
+        self.branch_density = branch_density
+        self.functions = functions
+        self.fan_out = fan_out
+        self.loop_iterations = loop_iterations
+
+        self.lines = []
+        self.remaining = 0
+        self.loop_count = 0
+        self.defined_functions = []
+
+    def generate(self):
+        """================ generate ================"""
+        self.lines = ["HAI"]
+        self.emit(1, "WAZZUP")
+        for name in self.variables:
+            self.emit(2, f"I HAS A {name} ITZ {self.random.randint(0, 99)}")
+        for depth in range(self.loop_depth):
+            self.emit(2, f"I HAS A l{depth} ITZ 0")
+        self.emit(1, "BUHBYE")
+        self.lines.append("")
+
+        # After WAZZUP, since the parser wants globals declared before any use
+        for index in range(self.functions):
+            self.function(f"f{index}")
+
+        self.remaining = self.statements
+        while self.remaining > 0:
+            self.statement(1, 0, 0)
+
+        self.emit(1, "VISIBLE " + ' " " '.join(self.variables[:3]))
+        self.lines.append("KTHXBYE")
+        return "\n".join(self.lines) + "\n"
+
+    def emit(self, indent, text):
+        """================ emit ================"""
+        self.lines.append(INDENT * indent + text)
+
+    # ----------------- Functions -----------------
+    def function(self, name):
+        """A function that computes from its parameter and calls earlier functions"""
+        self.emit(1, f"HOW IZ I {name} YR p")
+        self.emit(2, f"VISIBLE {self.expression(self.expr_depth, ['p'])}")
+        callees = self.random.sample(self.defined_functions, min(self.fan_out, len(self.defined_functions)))
+        for callee in callees:
+            self.emit(2, f"I IZ {callee} YR {self.argument()} MKAY")
+        self.emit(2, f"FOUND YR {self.expression(1, ['p'])}")
+        self.emit(1, "IF U SAY SO")
+        self.lines.append("")
+        self.defined_functions.append(name)
+
+    # ----------------- Statements -----------------
+    def statement(self, indent, loop_level, branch_level):
+        """One statement (or block) at `indent`, consuming the statement budget"""
+        self.remaining -= 1
+        roll = self.random.random()
+        can_branch = branch_level < MAX_BRANCH_DEPTH and self.remaining > 0
+        if can_branch and roll < self.branch_density / 2:
+            self.conditional(indent, loop_level, branch_level + 1)
+        elif can_branch and roll < self.branch_density:
+            self.switch(indent, loop_level, branch_level + 1)
+        elif loop_level < self.loop_depth and self.remaining > 0 and roll < self.branch_density + 0.1:
+            self.loop(indent, loop_level, branch_level)
+        elif self.defined_functions and roll < self.branch_density + 0.2:
+            callee = self.random.choice(self.defined_functions)
+            self.emit(indent, f"I IZ {callee} YR {self.argument()} MKAY")
+        elif roll < self.branch_density + 0.25:
+            self.emit(indent, f"VISIBLE {self.expression(self.expr_depth)}")
+        else:
+            target = self.random.choice(self.variables)
+            self.emit(indent, f"{target} R MOD OF {self.expression(self.expr_depth)} AN 1000")
+
+    def block(self, indent, loop_level, branch_level):
+        """Body of a loop or branch: one statement, plus up to two more while the budget lasts"""
+        self.statement(indent, loop_level, branch_level)
+        for _ in range(self.random.randint(0, 2)):
+            if self.remaining <= 0:
+                break
+            self.statement(indent, loop_level, branch_level)
+
+    def conditional(self, indent, loop_level, branch_level):
+        """================ conditional ================"""
+        self.emit(indent, f"BOTH SAEM {self.random.choice(self.variables)} AN {self.random.randint(0, 9)}")
+        self.emit(indent, "O RLY?")
+        self.emit(indent + 1, "YA RLY")
+        self.block(indent + 2, loop_level, branch_level)
+        self.emit(indent + 1, "NO WAI")
+        self.block(indent + 2, loop_level, branch_level)
+        self.emit(indent, "OIC")
+
+    def switch(self, indent, loop_level, branch_level):
+        """================ switch ================"""
+        self.emit(indent, f"MOD OF {self.random.choice(self.variables)} AN 3")
+        self.emit(indent, "WTF?")
+        for case in range(2):
+            self.emit(indent + 1, f"OMG {case}")
+            self.block(indent + 2, loop_level, branch_level)
+            self.emit(indent + 2, "GTFO")
+        self.emit(indent + 1, "OMGWTF")
+        self.block(indent + 2, loop_level, branch_level)
+        self.emit(indent, "OIC")
+
+    def loop(self, indent, loop_level, branch_level):
+        """A counted loop over this nesting level's loop variable"""
+        counter = f"l{loop_level}"
+        label = f"loop{self.loop_count}"
+        self.loop_count += 1
+        self.emit(indent, f"{counter} R 0")
+        self.emit(indent, f"IM IN YR {label} UPPIN YR {counter} TIL BOTH SAEM {counter} AN {self.loop_iterations}")
+        self.block(indent + 1, loop_level + 1, branch_level)
+        self.emit(indent, f"IM OUTTA YR {label}")
+
+    # ----------------- Expressions -----------------
+    def argument(self):
+        """
+        Call argument: a single NUMBR variable or literal, since the semantic
+        analyzer types arguments from one token and fixes a parameter's type
+        at its first call
+        """
+        if self.random.random() < 0.7:
+            return self.random.choice(self.variables)
+        return str(self.random.randint(0, 9))
+
+    def expression(self, depth, operands=None):
+        """Arithmetic expression nested up to `depth` operators deep"""
+        operands = operands or self.variables
+        if depth <= 0 or self.random.random() < 0.2:
+            if self.random.random() < 0.6:
+                return self.random.choice(operands)
+            return str(self.random.randint(0, 9))
+        operator = self.random.choice(ARITHMETIC_OPERATORS)
+        left = self.expression(depth - 1, operands)
+        right = self.expression(depth - 1, operands)
+        return f"{operator} {left} AN {right}"
+
+
+def generate_program(seed=0, **knobs):
+    """Source text of a generated program; see ProgramGenerator for the knobs"""
+    return ProgramGenerator(seed, **knobs).generate()
+
+
+def nested_program(depth):
+    """
+    A program of four expressions each nested `depth` operators deep:
+    left-nested arithmetic, right-nested BOTH OF, a NOT chain and a
+    comparison over nested arithmetic. Every phase has to get through all
+    of them, so it exercises nesting without recursion limits in the way.
+    """
+    arithmetic = "SUM OF " * depth + "1" + " AN 1" * depth
+    boolean = "BOTH OF WIN AN " * depth + "WIN"
+    negation = "NOT " * depth + "FAIL"
+    comparison = "BOTH SAEM " + "DIFF OF " * depth + str(depth) + " AN 1" * depth + " AN 0"
+    lines = [
+        "HAI",
+        INDENT + "WAZZUP",
+        INDENT * 2 + "I HAS A total ITZ 0",
+        INDENT * 2 + "I HAS A flag ITZ FAIL",
+        INDENT + "BUHBYE",
+        INDENT + f"total R {arithmetic}",
+        INDENT + f"flag R {boolean}",
+        INDENT + f"flag R {negation}",
+        INDENT + comparison,
+        INDENT + "O RLY?",
+        INDENT * 2 + "YA RLY",
+        INDENT * 3 + 'VISIBLE total " " flag',
+        INDENT + "OIC",
+        "KTHXBYE",
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,253 @@
+"""
+LOLCODE Golden-Output Runner
+Runs every script in a directory and compares what it printed, its final
+symbol table and IT against golden files stored in DIR/golden/NAME.json.
+Scripts run in a ProcessPoolExecutor, one per worker at a time, with the
+longest scripts submitted first so a big corpus keeps every core busy to the
+end. Each run gets a per-script timeout and the wall time it took. A
+headless `main.py check` is also started in a fresh process, and fails the
+run if it imports tkinter or starts more than STARTUP_BUDGET slower than a
+bare interpreter.
+
+GIMMEH is answered the same way as in the benchmark suite: from NAME.in next
+to the script when it exists, otherwise from benchmark.DEFAULT_INPUTS.
+
+A golden file records:
+    status    "ok", "<stage> errors", "timeout" or "crash: <Exception>"
+    errors    the stage's error messages
+    stdout    everything VISIBLE printed (not compared after a timeout,
+              since how far a script gets is timing dependent)
+    symbols   {name: [value, type]} for every variable after the run
+    it        the final value of IT
+"""
+import difflib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+from benchmark import BenchmarkTimeout, DEFAULT_TIMEOUT, InputFeeder, inputs_for, time_limit
+
+GOLDEN_DIRNAME = 'golden'
+
+# Snapshot fields in the order differences are reported
+FIELDS = ('status', 'errors', 'stdout', 'symbols', 'it')
+
+# Lines of stdout diff shown per mismatching script
+DIFF_CONTEXT_LINES = 20
+
+# Start-up a headless `main.py check` may add to a bare interpreter (s),
+# and the fresh processes timed for it
+STARTUP_BUDGET = 0.5
+STARTUP_REPEAT = 3
+
+# Run in a fresh process: a check, then whether it pulled in tkinter
+STARTUP_PROBE = ("import sys; sys.path.insert(0, {directory!r}); import main; "
+                 "main.main(['check', {path!r}]); print('tkinter' in sys.modules)")
+
+
+def golden_path(path):
+    """DIR/golden/NAME.json for the script DIR/NAME.lol"""
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, GOLDEN_DIRNAME, os.path.splitext(filename)[0] + '.json')
+
+
+def collect(paths):
+    """.lol files among `paths`, expanding directories (not recursively)"""
+    scripts = []
+    for path in paths:
+        if os.path.isdir(path):
+            scripts.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                           if name.endswith('.lol'))
+        else:
+            scripts.append(path)
+    return scripts
+
+
+# ================================================================
+# ======================= RUNNING ================================
+# ================================================================
+def plain_value(value):
+    """A JSON-friendly form of an interpreter value"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return repr(value)
+
+
+def snapshot(path, inputs=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Run one script and return (snapshot dict, wall seconds). Runs in the
+    worker processes, so it must stay a module-level function.
+    """
+    from pipeline import run_pipeline
+
+    with open(path, 'r') as file:
+        text = file.read()
+    inputs = inputs if inputs is not None else inputs_for(path)
+
+    stdout = io.StringIO()
+    errors, symbol_table = [], {}
+    start = time.perf_counter()
+    try:
+        with time_limit(timeout), redirect_stdout(stdout):
+            failed_stage, errors, _, symbol_table = run_pipeline(
+                text, instruments=[InputFeeder(inputs)])[:4]
+        status = "ok" if failed_stage is None else f"{failed_stage.lower()} errors"
+    except BenchmarkTimeout:
+        status = "timeout"
+    except Exception as error:
+        status = f"crash: {type(error).__name__}"
+        errors = [str(error)]
+    elapsed = time.perf_counter() - start
+
+    symbols = {}
+    for name, entry in symbol_table.items():
+        if name != 'IT' and isinstance(entry, tuple):
+            symbols[name] = [plain_value(entry[0]), entry[3]]
+    result = {
+        "status": status,
+        "errors": [str(error) for error in errors],
+        "stdout": stdout.getvalue() if status != "timeout" else None,
+        "symbols": symbols,
+        "it": plain_value(symbol_table.get('IT')),
+    }
+    return result, elapsed
+
+
+def measure_startup(command, repeat):
+    """(best wall seconds, stdout of the last run) of a command in a fresh process"""
+    best, output = None, ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output
+
+
+def startup(path, repeat=STARTUP_REPEAT):
+    """
+    (bare interpreter seconds, headless `main.py check` seconds, whether the
+    check imported tkinter). The check process reports its own sys.modules
+    after main.main(['check', path]) returns.
+    """
+    python, _ = measure_startup([sys.executable, "-c", "pass"], repeat)
+    probe = STARTUP_PROBE.format(directory=os.path.dirname(os.path.abspath(__file__)), path=path)
+    check, output = measure_startup([sys.executable, "-c", probe], repeat)
+    lines = output.splitlines()
+    return python, check, bool(lines) and lines[-1] == 'True'
+
+
+def startup_verdict(python, check, tkinter, budget=STARTUP_BUDGET):
+    """"pass", or the ways a headless check started too heavily"""
+    problems = []
+    if tkinter:
+        problems.append("check imported tkinter")
+    if check - python > budget:
+        problems.append(f"check took {(check - python) * 1000:.1f} ms over a bare interpreter "
+                        f"(budget {budget * 1000:.0f} ms)")
+    return problems or "pass"
+
+
+def format_startup(python, check, tkinter, outcome):
+    """The startup result line, in format_verdict's layout"""
+    label = outcome.upper() if isinstance(outcome, str) else "FAIL"
+    lines = [f"{label:<8} {check * 1000:>9.1f} ms  startup: python {python * 1000:.1f} ms, "
+             f"check +{(check - python) * 1000:.1f} ms, tkinter {'imported' if tkinter else 'not imported'}"]
+    if not isinstance(outcome, str):
+        lines.extend("    " + line for line in outcome)
+    return "\n".join(lines)
+
+
+def run_corpus(scripts, jobs=None, timeout=DEFAULT_TIMEOUT, inputs=None, progress=None):
+    """
+    Snapshot every script in a process pool of `jobs` workers (default: one
+    per CPU). Returns {path: (snapshot, wall seconds)}; `progress(path,
+    snapshot, seconds)` is called as each one finishes.
+    """
+    # Longest first, so a slow script does not start last and leave the other
+    # workers idle while it finishes
+    ordered = sorted(scripts, key=os.path.getsize, reverse=True)
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(snapshot, path, inputs, timeout): path for path in ordered}
+        for future in as_completed(futures):
+            path = futures[future]
+            results[path] = future.result()
+            if progress is not None:
+                progress(path, *results[path])
+    return results
+
+
+# ================================================================
+# ======================= GOLDENS ================================
+# ================================================================
+def load_golden(path):
+    """Stored snapshot for a script, or None when it has no golden file"""
+    try:
+        with open(golden_path(path), 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_golden(path, result):
+    """================ write_golden ================"""
+    target = golden_path(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'w') as file:
+        json.dump(result, file, indent=1, sort_keys=True)
+        file.write("\n")
+
+
+def compare(result, golden):
+    """Fields of `result` that differ from `golden`, as readable lines"""
+    differences = []
+    for field in FIELDS:
+        expected, actual = golden.get(field), result.get(field)
+        if field == 'stdout' and None in (expected, actual):
+            continue  # a timeout leaves no reliable output to compare
+        if expected == actual:
+            continue
+        if field == 'stdout':
+            diff = list(difflib.unified_diff(expected.splitlines(), actual.splitlines(),
+                                             'golden', 'actual', lineterm=''))
+            differences.append("stdout differs:")
+            differences.extend("    " + line for line in diff[:DIFF_CONTEXT_LINES])
+            if len(diff) > DIFF_CONTEXT_LINES:
+                differences.append(f"    ... {len(diff) - DIFF_CONTEXT_LINES} more diff lines")
+        elif field == 'symbols':
+            for name in sorted(set(expected) | set(actual)):
+                if expected.get(name) != actual.get(name):
+                    differences.append(f"symbol {name}: expected {expected.get(name)}, got {actual.get(name)}")
+        else:
+            differences.append(f"{field}: expected {expected!r}, got {actual!r}")
+    return differences
+
+
+def verdict(path, result, update=False):
+    """
+    Compare a snapshot with its golden file, or rewrite the golden file when
+    `update` is set. Returns "pass", "updated", "missing" or the list of
+    differences.
+    """
+    if update:
+        write_golden(path, result)
+        return "updated"
+    golden = load_golden(path)
+    if golden is None:
+        return "missing"
+    return compare(result, golden) or "pass"
+
+
+def format_verdict(path, outcome, elapsed):
+    """One result line with its wall time, followed by any differences"""
+    label = outcome.upper() if isinstance(outcome, str) else "FAIL"
+    lines = [f"{label:<8} {elapsed * 1000:>9.1f} ms  {path}"]
+    if not isinstance(outcome, str):
+        lines.extend("    " + line for line in outcome)
+    return "\n".join(lines)
@@ -7,13 +7,20 @@ import sys
 # IMPORTS & BACKEND LOADING
 # =================================================================
 try:
-    from lexer import Lexer
-    from parser import parse_lolcode
-    from semantic import analyze_lolcode
     from execute import execute_lolcode
+    from incremental import IncrementalAnalyzer
+    from unitcache import UnitCache
+    from highlight import SyntaxHighlighter, HIGHLIGHT_KINDS
+    from instrument import PipelineStats
 except ImportError:
     pass 
 
+# Delay before the live analysis runs after the last keystroke (ms)
+LIVE_ANALYSIS_DELAY = 300
+
+# Extra lines highlighted above and below the visible part of the editor
+HIGHLIGHT_MARGIN = 30
+
 # --- CLASS TO REDIRECT PRINT() TO GUI CONSOLE ---
 class IORedirector(object):
     """Redirects print() statements to the GUI console."""
@@ -47,9 +54,38 @@ class LOLGui(tk.Tk):
             "terminal_fg": "#00ff00",    # Terminal Text (Matrix Green)
             "panel_bg":    "#ffffff",    # Panels Background
         }
+
+        # --- SYNTAX COLORS (by Lexer token kind) ---
+        self.syntax_colors = {
+            "KEYWORD":    "#8e44ad",
+            "TYPE":       "#16a085",
+            "TROOF":      "#d35400",
+            "YARN":       "#27ae60",
+            "NUMBR":      "#2980b9",
+            "NUMBAR":     "#2980b9",
+            "IDENTIFIER": "#2c3e50",
+            "OPERATOR":   "#7f8c8d",
+            "COMMENT":    "#95a5a6",
+            "INVALID":    "#e74c3c",
+        }
         
         self.configure(bg=self.colors["bg_main"])
         self.current_file = None
+
+        # --- LIVE ANALYSIS STATE ---
+        self.analyzer = IncrementalAnalyzer()
+        self.pending_edit = None      # (first_line, last_line, line_delta) since last analysis
+        self.analysis_job = None
+        self.needs_full_analysis = True
+
+        # --- ANALYZE BUTTON STATE ---
+        # Front-end results per function and region, kept between runs
+        self.unit_cache = UnitCache()
+
+        # --- HIGHLIGHT / GUTTER STATE ---
+        self.highlighter = SyntaxHighlighter()
+        self.highlight_job = None
+        self.gutter_count = 0
         
         self.setup_styles()
         self.create_widgets()
@@ -108,6 +144,12 @@ class LOLGui(tk.Tk):
         ttk.Button(toolbar, text="Analyze", style="Success.TButton", command=self.run_execution).pack(side=tk.LEFT, padx=10, pady=8)
         ttk.Button(toolbar, text="Clear All", style="Danger.TButton", command=self.clear_all).pack(side=tk.RIGHT, padx=20, pady=8)
 
+        # ================== STATUS BAR ==================
+        # Packed before the main split so it keeps its place at the bottom
+        self.status_bar = tk.Label(self, text="", anchor="w", bg="white", fg=self.colors["text_dark"],
+                                   font=("Segoe UI", 9), bd=1, relief="solid", padx=10)
+        self.status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+
         # ================== MAIN SPLIT (Vertical PanedWindow) ==================
         # This splits the window into TOP (Editors/Tables) and BOTTOM (Terminal)
         # Allows dragging up/down to resize terminal
@@ -145,6 +187,21 @@ class LOLGui(tk.Tk):
         self.source_text.bind("<KeyRelease>", self.update_line_numbers)
         self.update_line_numbers()
 
+        # Syntax highlighting (only the visible region is tagged)
+        for kind in HIGHLIGHT_KINDS:
+            self.source_text.tag_configure(f"syn_{kind}", foreground=self.syntax_colors[kind])
+        self.source_text.tag_configure("syn_KEYWORD", font=("Consolas", 11, "bold"))
+        self.source_text.tag_configure("syn_COMMENT", font=("Consolas", 11, "italic"))
+
+        # Inline diagnostics from the live analysis
+        self.source_text.tag_configure("lexer_error", underline=True, foreground=self.colors["danger"])
+        self.source_text.tag_configure("parser_error", background="#fdecea")
+        self.diagnostics_label = tk.Label(left_frame, text="", anchor="w", bg=self.colors["bg_main"],
+                                          fg=self.colors["danger"], font=("Segoe UI", 9))
+        self.diagnostics_label.pack(fill=tk.X, pady=(3, 0))
+        self.source_text.tag_raise("lexer_error")
+        self.track_edits()
+
         # ----------------- MIDDLE PANEL: Lexemes -----------------
         mid_frame = tk.Frame(self.editor_pane, bg=self.colors["bg_main"])
         self.editor_pane.add(mid_frame, minsize=250)
@@ -224,14 +281,148 @@ class LOLGui(tk.Tk):
     def on_text_scroll(self, *args):
         self.yscroll.set(*args)
         self.line_numbers.yview_moveto(args[0])
+        self.schedule_highlight()
+
+    # ---------- Live Analysis ----------
+    def track_edits(self):
+        """Route the editor's Tcl command through text_proxy to see every insert/delete."""
+        widget = self.source_text
+        self.source_text_orig = widget._w + "_orig"
+        widget.tk.call("rename", widget._w, self.source_text_orig)
+        widget.tk.createcommand(widget._w, self.text_proxy)
+
+    def text_proxy(self, command, *args):
+        if command not in ("insert", "delete", "replace"):
+            if command == "edit" and args and args[0] in ("undo", "redo"):
+                self.needs_full_analysis = True
+                self.schedule_analysis()
+            return self.tk.call((self.source_text_orig, command) + args)
+
+        original = self.source_text_orig
+        lines_before = int(self.tk.call(original, "index", "end-1c").split('.')[0])
+        first = int(self.tk.call(original, "index", args[0]).split('.')[0])
+        if command == "insert":
+            old_last = first
+        elif command == "replace" or len(args) > 1:
+            old_last = int(self.tk.call(original, "index", args[1]).split('.')[0])
+        else:
+            old_last = int(self.tk.call(original, "index", f"{args[0]} +1c").split('.')[0])
+
+        result = self.tk.call((original, command) + args)
+
+        lines_after = int(self.tk.call(original, "index", "end-1c").split('.')[0])
+        self.record_edit(first, old_last, lines_after - lines_before)
+        self.schedule_analysis()
+        self.schedule_highlight()
+        if lines_after != lines_before:
+            self.update_line_numbers()
+        return result
+
+    def record_edit(self, first, old_last, delta):
+        """Merge one edit into the dirty line range (kept in current line numbers)."""
+        new_last = old_last + delta
+        if self.pending_edit is None:
+            self.pending_edit = (first, max(first, new_last), delta)
+            return
+
+        dirty_first, dirty_last, total = self.pending_edit
+        if dirty_last > old_last:
+            dirty_last += delta
+        self.pending_edit = (min(dirty_first, first), max(dirty_last, new_last, first), total + delta)
+
+    def schedule_analysis(self):
+        if self.analysis_job is not None:
+            self.after_cancel(self.analysis_job)
+        self.analysis_job = self.after(LIVE_ANALYSIS_DELAY, self.run_live_analysis)
+
+    def run_live_analysis(self):
+        self.analysis_job = None
+        line_count = int(self.source_text.index('end-1c').split('.')[0])
+
+        try:
+            if self.needs_full_analysis or self.pending_edit is None:
+                raise ValueError("full analysis requested")
+
+            first, last, delta = self.pending_edit
+            last = min(last, line_count)
+            new_lines = self.source_text.get(f"{first}.0", f"{last}.end").split('\n')
+            diagnostics = self.analyzer.edit(first, len(new_lines) - delta, new_lines)
+        except ValueError:
+            diagnostics = self.analyzer.reset(self.source_text.get("1.0", "end-1c"))
+
+        self.pending_edit = None
+        self.needs_full_analysis = False
+        self.show_diagnostics(diagnostics)
+
+    def show_diagnostics(self, diagnostics):
+        self.source_text.tag_remove("lexer_error", "1.0", tk.END)
+        self.source_text.tag_remove("parser_error", "1.0", tk.END)
+
+        for line, kind, _ in diagnostics:
+            self.source_text.tag_add(f"{kind}_error", f"{line}.0", f"{line}.end")
+
+        if diagnostics:
+            line, kind, message = diagnostics[0]
+            more = f"  (+{len(diagnostics) - 1} more)" if len(diagnostics) > 1 else ""
+            self.diagnostics_label.config(text=f"Line {line}: {message}{more}")
+        else:
+            self.diagnostics_label.config(text="")
+
+    # ---------- Syntax Highlighting ----------
+    def schedule_highlight(self):
+        if self.highlight_job is None:
+            self.highlight_job = self.after_idle(self.highlight_visible)
+
+    def highlight_visible(self):
+        """Re-tag the visible lines (plus a margin) using the lexer's token kinds."""
+        self.highlight_job = None
+        text = self.source_text
+        line_count = int(text.index('end-1c').split('.')[0])
+        top = int(text.index("@0,0").split('.')[0])
+        bottom = int(text.index(f"@0,{text.winfo_height()}").split('.')[0])
+        first = max(1, top - HIGHLIGHT_MARGIN)
+        last = min(line_count, bottom + HIGHLIGHT_MARGIN)
+
+        lines = text.get(f"{first}.0", f"{last}.end").split('\n')
+        grouped = self.highlighter.window_spans(lines, self.comment_state_before(first))
+
+        for kind, spans in grouped.items():
+            tag = f"syn_{kind}"
+            text.tag_remove(tag, f"{first}.0", f"{last}.end")
+            if spans:
+                indices = []
+                for offset, start, end in spans:
+                    indices.append(f"{first + offset}.{start}")
+                    indices.append(f"{first + offset}.{end}")
+                text.tag_add(tag, *indices)
+
+    def comment_state_before(self, line):
+        """OBTW state at the start of a line, from the nearest OBTW/TLDR above it."""
+        if line <= 1:
+            return False
+        found = self.source_text.search("OBTW|TLDR", f"{line}.0", stopindex="1.0", backwards=True, regexp=True)
+        if not found:
+            return False
+        previous = self.source_text.get(f"{found} linestart", f"{found} lineend")
+        return self.highlighter.comment_state_after(previous)
 
     def update_line_numbers(self, event=None):
+        """Add or remove only the gutter lines that changed."""
         line_count = int(self.source_text.index('end-1c').split('.')[0])
-        line_content = "\n".join(str(i) for i in range(1, line_count + 1))
+        if line_count == self.gutter_count:
+            return
+
         self.line_numbers.config(state="normal")
-        self.line_numbers.delete("1.0", tk.END)
-        self.line_numbers.insert("1.0", line_content)
-        self.line_numbers.config(state="disabled")
+        if line_count > self.gutter_count:
+            new_numbers = "\n".join(str(i) for i in range(self.gutter_count + 1, line_count + 1))
+            if self.gutter_count:
+                new_numbers = "\n" + new_numbers
+            self.line_numbers.insert("end-1c", new_numbers)
+        else:
+            self.line_numbers.delete(f"{line_count}.end", "end-1c")
+        self.line_numbers.config(state="disabled", width=max(4, len(str(line_count)) + 1))
+        self.gutter_count = line_count
+        self.line_numbers.yview_moveto(self.source_text.yview()[0])
 
     # ---------- File Operations ----------
     def open_file(self):
@@ -248,10 +439,29 @@ class LOLGui(tk.Tk):
 
     # ---------- Main Logic (Updated) ----------
     def run_execution(self):
+        """Analyze button: run every phase and show its timings in the status bar"""
+        stats = PipelineStats()
+        try:
+            self.run_phases(stats)
+        finally:
+            self.show_stats(stats)
+
+    def show_stats(self, stats):
+        """================ show_stats ================"""
+        if stats.phases:
+            stats_text = stats.summary()
+            execute_stats = stats.get("execute")
+            if execute_stats is not None:
+                stats_text += f"  |  {execute_stats.statements} statements run"
+            if self.unit_cache.units:
+                stats_text += f"  |  {len(self.unit_cache.rebuilt)}/{len(self.unit_cache.units)} units rebuilt"
+            self.status_bar.config(text=stats_text)
+        else:
+            self.status_bar.config(text="")
+
+    def run_phases(self, stats):
         try:
-            from lexer import Lexer
-            from parser import parse_lolcode
-            from semantic import analyze_lolcode
+            from pipeline import run_pipeline
             from execute import execute_lolcode
         except ImportError:
             messagebox.showerror("Error", "Required modules (lexer, parser, semantic, execute) not found.")
@@ -259,74 +469,49 @@ class LOLGui(tk.Tk):
 
         code = self.source_text.get("1.0", tk.END)
         self.console.delete("1.0", tk.END)
-        
-        # --- 1. Tokenization ---
-        try:
-            lexer = Lexer()
-            tokens = lexer.tokenize(code)
-            
-            # Show Lexer Errors first if any
-            if hasattr(lexer, 'errors') and lexer.errors:
-                self.console.insert(tk.END, "[!] Lexer Errors:\n")
-                for err in lexer.errors:
-                    self.console.insert(tk.END, f"{err}\n")
-                return # Stop if lexer errors
-
-            self.lexeme_table.delete(*self.lexeme_table.get_children())
-            for desc, token, _, _ in tokens:
-                self.lexeme_table.insert("", tk.END, values=(desc, token))
-                
-        except Exception as e:
-            messagebox.showerror("Lexer Error", str(e))
-            return
 
-        # --- 2. Parsing ---
+        # --- 1. Lexing, parsing and semantic analysis ---
+        # Only the functions and regions changed since the last run are reprocessed
         try:
-            # Parse returns: success, parser, symbol_table, function_dictionary, parse_errors
-            parse_results = parse_lolcode(tokens)
-            
-            # Unpack assuming 5 return values (based on your main.py logic)
-            if len(parse_results) == 5:
-                success, parser_obj, symbol_table, function_dict, parse_errors = parse_results
-            else:
-                # Fallback for older parser versions
-                success = parse_results[0]
-                parser_obj = parse_results[1]
-                symbol_table = parse_results[2]
-                function_dict = parse_results[3] if len(parse_results) > 3 else {}
-                parse_errors = []
-
-            # Update UI with initial parse state
-            self.update_tables(symbol_table, function_dict)
-            
-            if not success:
-                self.console.insert(tk.END, "[!] Parsing Failed. Errors:\n")
-                if parse_errors:
-                    for err in parse_errors:
-                        self.console.insert(tk.END, f"{err}\n")
-                elif hasattr(parser_obj, 'errors'):
-                    for err in parser_obj.errors:
-                        self.console.insert(tk.END, f"{err}\n")
-                return # Stop if parser errors
-
+            failed_stage, errors, tokens, symbol_table, function_dict = run_pipeline(
+                code, stats, execute=False, unit_cache=self.unit_cache)
         except Exception as e:
-            self.console.insert(tk.END, f"[!] Parser Crash: {e}\n")
+            self.console.insert(tk.END, f"[!] Front End Crash: {e}\n")
             import traceback
             traceback.print_exc()
             return
 
-        # --- 3. Semantic Analysis & Execution ---
+        # Show Lexer Errors first if any
+        if failed_stage == "Lexer":
+            self.console.insert(tk.END, "[!] Lexer Errors:\n")
+            for err in errors:
+                self.console.insert(tk.END, f"{err}\n")
+            return # Stop if lexer errors
+
+        self.lexeme_table.delete(*self.lexeme_table.get_children())
+        for desc, token, _, _ in tokens:
+            self.lexeme_table.insert("", tk.END, values=(desc, token))
+
+        # --- 2. Parse state ---
+        self.update_tables(symbol_table, function_dict)
+
+        if failed_stage == "Parser":
+            self.console.insert(tk.END, "[!] Parsing Failed. Errors:\n")
+            for err in errors:
+                self.console.insert(tk.END, f"{err}\n")
+            return # Stop if parser errors
+
+        # --- 3. Execution ---
         old_stdout = sys.stdout 
         sys.stdout = IORedirector(self.console)
 
         try:
-            sem_success, sem_errors = analyze_lolcode(tokens, symbol_table, function_dict)
-            
-            if sem_success:
+            if failed_stage != "Semantic":
                 
                 # Execute logic matching main.py structure
                 # Returns: final_symbol_table, final_function_table, final_errors
-                exec_result = execute_lolcode(tokens, symbol_table, function_dict)
+                with stats.phase("execute") as phase:
+                    exec_result = execute_lolcode(tokens, symbol_table, function_dict, phase_stats=phase)
                 
                 # Unpack results
                 if isinstance(exec_result, tuple) and len(exec_result) == 3:
@@ -354,7 +539,7 @@ class LOLGui(tk.Tk):
 
             else:
                 print("\n[Semantic Analysis Failed]")
-                for err in sem_errors:
+                for err in errors:
                     print(f"Error: {err}")
 
         except Exception as e:
@@ -402,6 +587,7 @@ class LOLGui(tk.Tk):
         self.function_table.delete(*self.function_table.get_children())
         self.console.delete("1.0", tk.END)
         self.console.insert(tk.END, "> Workspace cleared.\n")
+        self.status_bar.config(text="")
 
 def start_gui():
     app = LOLGui()
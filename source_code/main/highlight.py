@@ -0,0 +1,107 @@
+"""
+LOLCODE Syntax Highlighting
+Computes highlight spans for a window of editor lines using the real Lexer,
+so the GUI only tokenizes the lines that are on screen.
+"""
+from lexer import Lexer
+
+# Dummy "NNN| " prefix expected by Lexer.tokenize_line
+LINE_PREFIX = "0  | "
+
+# Token kinds the editor colours (plus COMMENT and INVALID)
+HIGHLIGHT_KINDS = ['KEYWORD', 'TYPE', 'TROOF', 'YARN', 'NUMBR', 'NUMBAR',
+                   'IDENTIFIER', 'OPERATOR', 'COMMENT', 'INVALID']
+
+# Cached (line, state) results kept before the cache is dropped
+SPAN_CACHE_SIZE = 20000
+
+
+class SyntaxHighlighter:
+    """Turns editor lines into (start_col, end_col, kind) spans"""
+
+    def __init__(self):
+        """================ __init__ ================"""
+        self.lexer = Lexer()
+        # (line, in_comment) -> (spans, in_comment); a keystroke only misses on the edited line
+        self.cache = {}
+
+    def comment_state_after(self, line):
+        """
+        OBTW state after a line containing OBTW or TLDR. Such a line sets the
+        state by itself, so the state before any line can be found from the
+        nearest line above it that mentions either keyword.
+        """
+        return self.lexer.strip_multiline_comment(LINE_PREFIX + line, False)[1]
+
+    def line_spans(self, line, in_comment=False):
+        """
+        Spans for one line given the OBTW state at its start, following the
+        same comment rules as Lexer.tokenize. Returns (spans, in_comment).
+        """
+        key = (line, in_comment)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        spans = []
+        code = []
+
+        # ----------------- Multi-line comments -----------------
+        if 'OBTW' in line:
+            start = line.index('OBTW')
+            code.append((0, start))
+            if 'TLDR' in line:
+                end = max(line.index('TLDR'), start + 4) + 4
+                spans.append((start, end, 'COMMENT'))
+                code.append((end, len(line)))
+                in_comment = False
+            else:
+                spans.append((start, len(line), 'COMMENT'))
+                in_comment = True
+        elif 'TLDR' in line:
+            end = line.index('TLDR') + 4
+            spans.append((0, end, 'COMMENT'))
+            code.append((end, len(line)))
+            in_comment = False
+        elif in_comment:
+            spans.append((0, len(line), 'COMMENT'))
+        else:
+            code.append((0, len(line)))
+
+        # ----------------- Code (with single-line comments) -----------------
+        for start, end in code:
+            segment = line[start:end]
+            if 'BTW' in segment:
+                btw = segment.index('BTW')
+                spans.append((start + btw, end, 'COMMENT'))
+                segment = segment[:btw]
+            if segment.strip():
+                self.code_spans(segment, start, spans)
+
+        if len(self.cache) >= SPAN_CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = (spans, in_comment)
+        return spans, in_comment
+
+    def code_spans(self, segment, offset, spans):
+        """================ code_spans ================"""
+        token_spans = []
+        self.lexer.tokenize_line(LINE_PREFIX + segment, token_spans)
+        self.lexer.errors.clear()
+
+        shift = offset - len(LINE_PREFIX)
+        for start, end, kind in token_spans:
+            spans.append((start + shift, end + shift, kind))
+
+    def window_spans(self, lines, in_comment=False):
+        """
+        Spans for a consecutive window of lines, grouped by kind so the GUI
+        can tag each kind in one call. Returns {kind: [(line_offset, start, end)]}.
+        """
+        grouped = {kind: [] for kind in HIGHLIGHT_KINDS}
+        for offset, line in enumerate(lines):
+            spans, in_comment = self.line_spans(line, in_comment)
+            for start, end, kind in spans:
+                if kind in grouped:
+                    grouped[kind].append((offset, start, end))
+        return grouped
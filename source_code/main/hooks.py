@@ -0,0 +1,132 @@
+"""
+LOLCODE Execution Hooks
+A registry of callbacks that external tools (coverage, tracing, metrics) can
+attach to a running Execute instance instead of monkeypatching it.
+
+Events and their arguments:
+    on_statement(line)          before each statement runs
+    on_call(func, args)         HOW IZ I function entered, args already evaluated
+    on_return(func, value)      function left (value is None when it fell off the end)
+    on_loop_iteration(label)    loop condition passed, body about to run
+    on_output(text)             VISIBLE printed text (including its newline)
+    on_input(var)               GIMMEH about to read into var
+
+    hooks = HookRegistry()
+    hooks.register('on_output', print_to_log)
+    execute_lolcode(tokens, symbol_table, function_dictionary, instruments=[hooks])
+
+An executor without a registry pays nothing for on_statement, which is wired
+in by shadowing execute_statement on the attached instance only. The rarer
+events cost one `self.hooks is not None` test at their call sites.
+"""
+
+# Supported event names
+HOOK_EVENTS = ('on_statement', 'on_call', 'on_return', 'on_loop_iteration', 'on_output', 'on_input')
+
+# Line-leading keywords that close or label a block rather than run as a
+# statement of their own; coverage does not expect them to be reported
+STRUCTURAL_KEYWORDS = {'KTHXBYE', 'IM OUTTA YR', 'OIC', 'IF U SAY SO', 'YA RLY', 'NO WAI',
+                       'MEBBE', 'OMG', 'OMGWTF', 'GTFO', 'FOUND YR'}
+
+
+class HookRegistry:
+    """Callbacks per event, attached to executors as an instrument"""
+
+    def __init__(self):
+        """================ __init__ ================"""
+        self.callbacks = {event: [] for event in HOOK_EVENTS}
+
+    def register(self, event, callback):
+        """Call `callback` on `event`; returns the callback so this works as a decorator helper"""
+        if event not in self.callbacks:
+            raise ValueError(f"Unknown hook event '{event}'. Expected one of: {', '.join(HOOK_EVENTS)}")
+        self.callbacks[event].append(callback)
+        return callback
+
+    def unregister(self, event, callback):
+        """================ unregister ================"""
+        if callback in self.callbacks.get(event, []):
+            self.callbacks[event].remove(callback)
+
+    def emit(self, event, *args):
+        """Call every callback registered for `event`"""
+        for callback in self.callbacks[event]:
+            callback(*args)
+
+    # ----------------- Attaching -----------------
+    def attach(self, executor):
+        """Select the instrumented dispatch path on `executor`"""
+        executor.hooks = self
+        if self.callbacks['on_statement']:
+            statement = executor.execute_statement
+            statement_hooks = self.callbacks['on_statement']
+
+            def execute_statement():
+                token = executor.current_token()
+                if token[2] != 'NEWLINE':
+                    for callback in statement_hooks:
+                        callback(token[3])
+                return (yield from statement())
+
+            executor.execute_statement = execute_statement
+
+    def detach(self, executor):
+        """Return `executor` to the plain dispatch path"""
+        executor.hooks = None
+        executor.__dict__.pop('execute_statement', None)
+
+
+class LineCoverage:
+    """Line coverage for one script, collected through on_statement"""
+
+    def __init__(self, registry=None):
+        """================ __init__ ================"""
+        self.registry = registry if registry is not None else HookRegistry()
+        self.covered = set()
+        self.registry.register('on_statement', self.covered.add)
+
+    def attach(self, executor):
+        """================ attach ================"""
+        self.registry.attach(executor)
+
+    def detach(self, executor):
+        """================ detach ================"""
+        self.registry.detach(executor)
+
+    @staticmethod
+    def executable_lines(tokens):
+        """Lines whose first token starts a statement"""
+        lines = set()
+        line_start = True
+        for token in tokens:
+            if token[2] == 'NEWLINE':
+                line_start = True
+                continue
+            if line_start and token[1] not in STRUCTURAL_KEYWORDS and token[1] != 'IM':
+                lines.add(token[3])
+            line_start = False
+        return lines
+
+    def missing_lines(self, tokens):
+        """================ missing_lines ================"""
+        return sorted(self.executable_lines(tokens) - self.covered)
+
+    def report(self, tokens):
+        """Covered/total summary with the missing lines as ranges"""
+        executable = self.executable_lines(tokens)
+        covered = len(executable & self.covered)
+        percent = covered / len(executable) * 100 if executable else 100.0
+        missing = format_ranges(self.missing_lines(tokens))
+        return f"Coverage: {covered}/{len(executable)} lines ({percent:.1f}%)" + \
+               (f"\nMissing: {missing}" if missing else "")
+
+
+def format_ranges(numbers):
+    """[1, 2, 3, 7, 9, 10] -> '1-3, 7, 9-10'"""
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
@@ -0,0 +1,386 @@
+"""
+LOLCODE Incremental Analysis
+Keeps per-line lexer state and per-block parse results for the editor so an
+edit only re-lexes the lines it touched and re-parses the blocks around them.
+"""
+import re
+from bisect import bisect_right
+
+from lexer import Lexer
+from parser import Parser
+
+# Keywords that open / close a multi-line block
+BLOCK_OPENERS = {
+    'HOW IZ I': 'function',
+    'WAZZUP': 'wazzup',
+    'O RLY?': 'block',
+    'WTF?': 'block',
+    'IM IN YR': 'block',
+}
+BLOCK_CLOSERS = {'IF U SAY SO', 'BUHBYE', 'OIC', 'IM OUTTA YR'}
+
+PARSER_ERROR = re.compile(r'^Error on line (-?\d+): (.*)$', re.DOTALL)
+EMBEDDED_LINE = re.compile(r'( at)? line:? \d+')
+
+
+class LineRecord:
+    """Lexer result for one source line"""
+    __slots__ = ('text', 'state_in', 'state_out', 'tokens', 'errors', 'lexed_at')
+
+    def __init__(self, text):
+        self.text = text
+        self.state_in = False
+        self.state_out = False
+        self.tokens = []
+        self.errors = []
+        self.lexed_at = 0
+
+    def is_blank(self):
+        """A line with no real tokens and no lexer errors"""
+        if self.errors:
+            return False
+        for token in self.tokens:
+            if token[2] != 'NEWLINE':
+                return False
+        return True
+
+
+class Unit:
+    """A top-level statement, block, WAZZUP section or HOW IZ I function"""
+    __slots__ = ('start', 'end', 'kind', 'diagnostics')
+
+    def __init__(self, start, end, kind):
+        self.start = start
+        self.end = end
+        self.kind = kind
+        self.diagnostics = []
+
+    def shift(self, delta):
+        self.start += delta
+        self.end += delta
+        self.diagnostics = [(line + delta, kind, msg) for line, kind, msg in self.diagnostics]
+
+
+class IncrementalAnalyzer:
+    """
+    Incremental lexer + parser front end for the GUI editor.
+
+    Line numbers are 1-based. reset() analyzes a whole buffer once; edit()
+    replaces a range of lines and re-lexes only until the OBTW comment state
+    converges with the previous run, then re-parses only the units whose
+    lines changed. Results are returned as (line, kind, message) tuples.
+    """
+
+    def __init__(self):
+        """================ __init__ ================"""
+        self.lexer = Lexer()
+        self.lines = []
+        self.units = []
+        self.unit_starts = []
+        self.symbol_table = {}
+        self.function_scopes = {}
+        self.relexed_lines = 0
+        self.reparsed_units = 0
+
+    # ================================================================
+    # ======================= PUBLIC API =============================
+    # ================================================================
+    def reset(self, text):
+        """================ reset ================"""
+        self.lines = [LineRecord(line) for line in text.split('\n')]
+        self.relexed_lines = 0
+        self.reparsed_units = 0
+        self.relex(0, len(self.lines) - 1, force=True)
+
+        self.units = self.segment(0, None)
+        self.unit_starts = [unit.start for unit in self.units]
+        self.update_context(force=True)
+        return self.diagnostics()
+
+    def edit(self, first_line, old_count, new_lines):
+        """
+        Replace old_count lines starting at first_line with new_lines.
+        Returns the full diagnostics list after the update.
+        """
+        start = first_line - 1
+        if start < 0 or start + old_count > len(self.lines):
+            raise ValueError(f"Edit range {first_line}+{old_count} outside buffer of {len(self.lines)} lines")
+
+        delta = len(new_lines) - old_count
+        self.lines[start:start + old_count] = [LineRecord(line) for line in new_lines]
+        self.relexed_lines = 0
+        self.reparsed_units = 0
+
+        # ----------------- Re-lex until comment state converges -----------------
+        last = self.relex(start, start + len(new_lines) - 1)
+
+        # ----------------- Re-segment the touched region -----------------
+        last_line = last + 1
+        first_unit = bisect_right(self.unit_starts, first_line) - 1
+        if first_unit < 0 or self.units[first_unit].end < first_line:
+            first_unit += 1
+
+        # Old units starting after the re-lexed lines keep their results (shifted)
+        tail = first_unit
+        while tail < len(self.units) and self.units[tail].start <= last_line - delta:
+            tail += 1
+        removed = self.units[first_unit:tail]
+        for unit in self.units[tail:]:
+            unit.shift(delta)
+
+        seg_start = min([first_line] + [unit.start for unit in removed])
+        kept_starts = set(unit.start for unit in self.units[tail:])
+        new_units = self.segment(seg_start - 1, (last_line, kept_starts))
+
+        # Drop any kept units the new segmentation swallowed
+        resume_line = new_units[-1].end if new_units else last_line
+        while tail < len(self.units) and self.units[tail].start <= resume_line:
+            removed.append(self.units[tail])
+            tail += 1
+
+        self.units[first_unit:tail] = new_units
+        self.unit_starts = [unit.start for unit in self.units]
+
+        # ----------------- Re-parse only what changed -----------------
+        declarations = ('wazzup', 'function')
+        if any(unit.kind in declarations for unit in removed + new_units) and self.update_context():
+            return self.diagnostics()
+
+        for unit in new_units:
+            self.parse_unit(unit)
+
+        return self.diagnostics()
+
+    def diagnostics(self):
+        """================ diagnostics ================"""
+        result = []
+        for unit in self.units:
+            result.extend(unit.diagnostics)
+
+        kinds = [unit.kind for unit in self.units]
+        if not kinds or kinds[0] != 'start':
+            result.append((1, 'parser', "Program must start with HAI"))
+        if not kinds or kinds[-1] != 'end':
+            result.append((len(self.lines), 'parser', "Missing closing argument 'KTHXBYE' for opening argument 'HAI'"))
+
+        result.sort(key=lambda diag: diag[0])
+        return result
+
+    def tokens(self):
+        """Full token stream, equivalent to Lexer().tokenize(text)"""
+        all_tokens = []
+        for index, record in enumerate(self.lines):
+            all_tokens.extend(self.line_tokens(record, index + 1))
+        return all_tokens
+
+    # ================================================================
+    # ======================= LEXING =================================
+    # ================================================================
+    def relex(self, first, last, force=False):
+        """
+        Lex lines first..last (0-based), then keep going while the comment
+        state flowing out of a line differs from what the next line saw.
+        Returns the index of the last re-lexed line.
+        """
+        state = self.lines[first - 1].state_out if first > 0 else False
+        index = first
+
+        while index < len(self.lines):
+            record = self.lines[index]
+            if index > last and not force and record.state_in == state and record.lexed_at:
+                break
+
+            self.lex_record(record, index + 1, state)
+            state = record.state_out
+            index += 1
+
+        return index - 1
+
+    def lex_record(self, record, line_num, state):
+        """================ lex_record ================"""
+        error_mark = len(self.lexer.errors)
+        raw_line = f"{line_num:<3}| " + record.text
+        record.state_in = state
+        record.tokens, record.state_out = self.lexer.tokenize_numbered_line(raw_line, state)
+        record.errors = [EMBEDDED_LINE.sub('', err) for err in self.lexer.errors[error_mark:]]
+        record.lexed_at = line_num
+        del self.lexer.errors[error_mark:]
+        self.relexed_lines += 1
+
+    def line_tokens(self, record, line_num):
+        """Tokens for a line, renumbered if the line moved since it was lexed"""
+        if record.lexed_at != line_num:
+            record.tokens = [(desc, value, typ, line_num) for desc, value, typ, _ in record.tokens]
+            record.lexed_at = line_num
+        return record.tokens
+
+    # ================================================================
+    # ======================= SEGMENTATION ===========================
+    # ================================================================
+    def segment(self, first, stop):
+        """
+        Split lines from index first into units. When stop is given as
+        (min_line, kept_starts), segmentation ends at the first unit boundary
+        past min_line whose next non-blank line starts a kept unit.
+        """
+        units = []
+        index = first
+        depth = 0
+        current = None
+
+        while index < len(self.lines):
+            record = self.lines[index]
+            line_num = index + 1
+
+            if current is None:
+                if record.is_blank():
+                    index += 1
+                    continue
+                if stop and line_num > stop[0] and line_num in stop[1]:
+                    break
+                current = Unit(line_num, line_num, self.unit_kind(record))
+
+            for token in record.tokens:
+                if token[1] in BLOCK_OPENERS:
+                    depth += 1
+                elif token[1] in BLOCK_CLOSERS and depth > 0:
+                    depth -= 1
+
+            current.end = line_num
+            if depth == 0:
+                units.append(current)
+                current = None
+            index += 1
+
+        if current is not None:
+            units.append(current)
+
+        for unit in units:
+            self.collect_lex_errors(unit)
+        return units
+
+    def unit_kind(self, record):
+        """================ unit_kind ================"""
+        for token in record.tokens:
+            if token[2] == 'NEWLINE':
+                continue
+            if token[1] == 'HAI':
+                return 'start'
+            if token[1] == 'KTHXBYE':
+                return 'end'
+            return BLOCK_OPENERS.get(token[1], 'statement')
+        return 'statement'
+
+    def collect_lex_errors(self, unit):
+        """================ collect_lex_errors ================"""
+        unit.diagnostics = []
+        for line_num in range(unit.start, unit.end + 1):
+            for err in self.lines[line_num - 1].errors:
+                unit.diagnostics.append((line_num, 'lexer', err))
+
+    # ================================================================
+    # ======================= PARSING ================================
+    # ================================================================
+    def update_context(self, force=False):
+        """
+        Rebuild the declarations every unit depends on (WAZZUP variables and
+        function signatures). If they changed, or force is set, every unit is
+        re-parsed and True is returned.
+        """
+        symbol_table = {}
+        function_scopes = {}
+
+        for unit in self.units:
+            if unit.kind == 'wazzup':
+                parser = self.make_parser(unit, {}, {})
+                self.run_unit_parser(parser, unit)
+                symbol_table.update(parser.symbol_table)
+            elif unit.kind == 'function':
+                tokens = self.unit_tokens(unit)
+                params = [tok[1] for prev, tok in zip(tokens, tokens[1:])
+                          if prev[1] == 'YR' and tok[2] == 'IDENTIFIER' and tok[3] == unit.start]
+                if len(tokens) > 1 and tokens[1][2] == 'IDENTIFIER':
+                    function_scopes[tokens[1][1]] = {'params': params}
+                for p in params:
+                    symbol_table[p] = ('NOOB', 'NOOB', None, None)
+
+        changed = (set(symbol_table) != set(self.symbol_table) or function_scopes != self.function_scopes)
+        self.symbol_table = symbol_table
+        self.function_scopes = function_scopes
+
+        if not (changed or force):
+            return False
+
+        for unit in self.units:
+            self.parse_unit(unit)
+        return True
+
+    def unit_tokens(self, unit):
+        """================ unit_tokens ================"""
+        tokens = []
+        for line_num in range(unit.start, unit.end + 1):
+            tokens.extend(self.line_tokens(self.lines[line_num - 1], line_num))
+        return tokens
+
+    def make_parser(self, unit, symbol_table, function_scopes):
+        """================ make_parser ================"""
+        tokens = self.unit_tokens(unit)
+        # Guard token so statement parsers never run off the end of the unit
+        tokens.append(('Code Delimiter', 'KTHXBYE', 'KEYWORD', unit.end))
+        parser = Parser(tokens)
+        parser.symbol_table = dict(symbol_table)
+        parser.function_scopes = dict(function_scopes)
+        return parser
+
+    def parse_unit(self, unit):
+        """================ parse_unit ================"""
+        self.collect_lex_errors(unit)
+        if unit.kind == 'wazzup':
+            parser = self.make_parser(unit, {}, {})
+        else:
+            parser = self.make_parser(unit, self.symbol_table, self.function_scopes)
+        self.run_unit_parser(parser, unit)
+
+        for err in parser.errors:
+            match = PARSER_ERROR.match(err)
+            if match:
+                message = EMBEDDED_LINE.sub('', match.group(2))
+                unit.diagnostics.append((int(match.group(1)) or unit.start, 'parser', message))
+            else:
+                unit.diagnostics.append((unit.start, 'parser', err))
+        self.reparsed_units += 1
+
+    def run_unit_parser(self, parser, unit):
+        """Drive the regular Parser over a single unit"""
+        try:
+            if unit.kind == 'start':
+                parser.consume('HAI')
+            elif unit.kind == 'end':
+                parser.consume('KTHXBYE')
+            elif unit.kind == 'wazzup':
+                parser.parse_variable_list()
+            elif unit.kind == 'function':
+                parser.parse_function()
+            else:
+                while parser.current_token() and parser.current_token()[1] != 'KTHXBYE':
+                    token = parser.current_token()
+                    if token[2] == 'NEWLINE':
+                        parser.consume()
+                    elif token[1] == 'I HAS A':
+                        parser.add_error(token[3], "I HAS A variable declaration must be inside the WAZZUP block")
+                        break
+                    else:
+                        start = parser.position
+                        parser.parse_statement()
+                        if parser.position == start:
+                            parser.consume()
+
+            if unit.kind not in ('start', 'end'):
+                ct = parser.current_token()
+                while ct and ct[2] == 'NEWLINE':
+                    parser.consume()
+                    ct = parser.current_token()
+                if ct and ct[1] != 'KTHXBYE':
+                    parser.add_error(ct[3], f"Unexpected token '{ct[1]}'")
+        except Exception as e:
+            parser.add_error(unit.start, f"Parser crash: {e}")
@@ -0,0 +1,68 @@
+"""
+LOLCODE Function Inlining
+A HOW IZ I function whose whole body is one small FOUND YR expression does
+all of its work in that expression, yet a call still copies the caller's
+symbol table, jumps into the body and walks it to find it:
+
+    HOW IZ I twice YR n
+        FOUND YR SUM OF n AN n
+    IF U SAY SO
+
+    bodies = inline_bodies(function_bodies, function_dictionary)
+
+For each such function `bodies` holds (names, tokens, start): a copy of its
+body whose parameter identifiers are renamed to `names`, and the position
+of the expression in it. Execute.execute_function evaluates that expression
+in the caller's frame with `names` bound next to the caller's variables and
+removes them again afterwards. The renamed identifiers cannot be written in
+LOLCODE, so they never shadow or change a caller's variable, and the body
+has no statements that could assign anything. Bodies that call a function
+are left alone, which also rules out recursion.
+"""
+
+# Expression tokens above which a body is not worth inlining
+INLINE_MAX_TOKENS = 16
+
+
+def inline_name(func_name, param):
+    """Name a parameter of an inlined body is bound to; ':' never appears in an identifier"""
+    return f"{func_name}:{param}"
+
+
+def inline_body(func_name, body, params):
+    """(names, tokens, start) for a body that is just FOUND YR <expression>, otherwise None"""
+    # ----------------- Shape: header line, then FOUND YR straight away -----------------
+    header_end = 0
+    while header_end < len(body) and body[header_end][2] != 'NEWLINE':
+        header_end += 1
+    start = header_end + 2
+    if start >= len(body) or body[header_end + 1][1] != 'FOUND YR':
+        return None
+
+    end = start
+    while end < len(body) and body[end][2] != 'NEWLINE':
+        if body[end][1] in ('I IZ', 'I'):
+            return None
+        end += 1
+    if end == start or end - start > INLINE_MAX_TOKENS:
+        return None
+
+    # ----------------- Rename parameters inside the expression -----------------
+    renamed = {param: inline_name(func_name, param) for param in params}
+    tokens = list(body)
+    for pos in range(start, end):
+        token = tokens[pos]
+        if token[2] == 'IDENTIFIER' and token[1] in renamed:
+            tokens[pos] = (token[0], renamed[token[1]], token[2], token[3])
+    return tuple(renamed[param] for param in params), tuple(tokens), start
+
+
+def inline_bodies(function_bodies, function_dictionary):
+    """{function name: (names, tokens, start)} for every function small enough to inline"""
+    bodies = {}
+    for func_name, body in function_bodies.items():
+        params = [param for param, _ in function_dictionary.get(func_name, [])]
+        inlined = inline_body(func_name, body, params)
+        if inlined is not None:
+            bodies[func_name] = inlined
+    return bodies
@@ -0,0 +1,142 @@
+"""
+LOLCODE Phase Instrumentation
+Records wall time, CPU time, peak traced memory, token count and statement
+count for each interpreter phase. Nothing is measured unless a PipelineStats
+is passed in, so uninstrumented runs only pay for a None check per phase.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Phase names, in pipeline order
+PHASES = ['lex', 'parse', 'semantic', 'execute']
+
+
+class PhaseStats:
+    """Measurements for one phase"""
+
+    def __init__(self, name):
+        """================ __init__ ================"""
+        self.name = name
+        self.wall = 0.0          # seconds
+        self.cpu = 0.0           # seconds of process CPU time
+        self.peak_memory = None  # bytes above the phase's starting point, None when not traced
+        self.tokens = 0
+        self.statements = 0
+
+    def as_dict(self):
+        """================ as_dict ================"""
+        return {
+            "phase": self.name,
+            "wall_ms": self.wall * 1000,
+            "cpu_ms": self.cpu * 1000,
+            "peak_memory_bytes": self.peak_memory,
+            "tokens": self.tokens,
+            "statements": self.statements,
+        }
+
+
+class PipelineStats:
+    """
+    Per-phase measurements for one run. Tracing memory with tracemalloc
+    slows the traced phases down, so pass memory=False for timings that are
+    comparable with an uninstrumented run.
+    """
+
+    def __init__(self, memory=True):
+        """================ __init__ ================"""
+        self.memory = memory
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        """Measure the body of the with-block as phase `name`"""
+        record = PhaseStats(name)
+        started_tracing = False
+        if self.memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                started_tracing = True
+            base_memory = tracemalloc.get_traced_memory()[0]
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - wall
+            record.cpu = time.process_time() - cpu
+            if self.memory:
+                record.peak_memory = max(0, tracemalloc.get_traced_memory()[1] - base_memory)
+                if started_tracing:
+                    tracemalloc.stop()
+            self.phases.append(record)
+
+    def get(self, name):
+        """Last recorded phase called `name`, or None"""
+        for record in reversed(self.phases):
+            if record.name == name:
+                return record
+        return None
+
+    def total_wall(self):
+        """================ total_wall ================"""
+        return sum(record.wall for record in self.phases)
+
+    def total_cpu(self):
+        """================ total_cpu ================"""
+        return sum(record.cpu for record in self.phases)
+
+    def peak_memory(self):
+        """Highest per-phase peak, or None when memory was not traced"""
+        peaks = [record.peak_memory for record in self.phases if record.peak_memory is not None]
+        return max(peaks) if peaks else None
+
+    def as_dict(self):
+        """================ as_dict ================"""
+        return {
+            "phases": [record.as_dict() for record in self.phases],
+            "total": {
+                "wall_ms": self.total_wall() * 1000,
+                "cpu_ms": self.total_cpu() * 1000,
+                "peak_memory_bytes": self.peak_memory(),
+            },
+        }
+
+    def format_table(self):
+        """Phase table for terminals"""
+        lines = [f"{'phase':<10} {'wall ms':>10} {'cpu ms':>10} {'peak KiB':>10} {'tokens':>8} {'stmts':>8}"]
+        for record in self.phases:
+            lines.append(f"{record.name:<10} {record.wall * 1000:>10.3f} {record.cpu * 1000:>10.3f} "
+                         f"{format_kib(record.peak_memory):>10} {record.tokens:>8} {record.statements:>8}")
+        lines.append(f"{'total':<10} {self.total_wall() * 1000:>10.3f} {self.total_cpu() * 1000:>10.3f} "
+                     f"{format_kib(self.peak_memory()):>10}")
+        return "\n".join(lines)
+
+    def summary(self):
+        """One-line readout for the GUI status bar"""
+        parts = [f"{record.name} {record.wall * 1000:.1f} ms" for record in self.phases]
+        parts.append(f"total {self.total_wall() * 1000:.1f} ms")
+        peak = self.peak_memory()
+        if peak is not None:
+            parts.append(f"peak {format_kib(peak)} KiB")
+        return "  |  ".join(parts)
+
+
+def format_kib(size):
+    """================ format_kib ================"""
+    return "-" if size is None else f"{size / 1024:.1f}"
+
+
+def measure(stats, name):
+    """stats.phase(name), or a context that records nothing when stats is None"""
+    if stats is None:
+        return nullcontext(PhaseStats(name))
+    return stats.phase(name)
+
+
+def count_statements(tokens):
+    """Source lines holding at least one token"""
+    return len({token[3] for token in tokens if token[2] != 'NEWLINE'})
@@ -0,0 +1,302 @@
+"""
+LOLCODE Embedding API
+Compile a program once and run it many times:
+
+    interpreter = Interpreter()
+    program = interpreter.compile(source)     # lex, parse, analyze (cached)
+    result = program.run(inputs=['5', '3'])   # fresh state every run
+    print(result.stdout, result.symbol_table['IT'])
+
+A CompiledProgram is immutable: its tokens are a tuple and its symbol table,
+function table and function bodies are read-only mappings. Every run hands
+the executor a shallow copy of the initial symbol table. Entries are
+(value, desc, line, type) tuples that the executor only ever replaces, never
+edits, so copying the dict is enough for copy-on-write state: runs cannot see
+each other's variables and the program itself never changes.
+
+Interpreter keeps an LRU of compiled programs keyed by the SHA-256 of the
+source, so services that receive the same text again skip the front end.
+Given a unitcache.UnitCache it also recompiles edited sources a function
+or region at a time.
+
+start() returns a resumable Session instead: the executor runs as a
+generator that pauses at every GIMMEH and VISIBLE, so a host can keep
+thousands of interactive runs waiting in one thread (see drive() for
+asyncio).
+"""
+import hashlib
+import io
+from collections import OrderedDict
+from types import MappingProxyType
+
+from execute import Execute
+from pipeline import run_pipeline
+from typeinfer import infer_types
+
+# Compiled programs kept by an Interpreter before the least recently used goes
+DEFAULT_CACHE_SIZE = 128
+
+
+def source_hash(source):
+    """================ source_hash ================"""
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class RunResult:
+    """Outcome of one CompiledProgram.run"""
+
+    def __init__(self, symbol_table, errors, stdout, statements):
+        """================ __init__ ================"""
+        self.symbol_table = symbol_table  # final variables, plus 'IT' when set
+        self.errors = errors              # runtime errors, or the compile errors
+        self.stdout = stdout              # captured text; None when run() was given an output
+        self.statements = statements      # statements executed
+
+    @property
+    def it(self):
+        """================ it ================"""
+        return self.symbol_table.get('IT')
+
+
+class CompiledProgram:
+    """The front end's output for one source text; run() it any number of times"""
+
+    def __init__(self, source, tokens, symbol_table, function_dictionary, failed_stage=None, errors=()):
+        """================ __init__ ================"""
+        self.source_hash = source_hash(source)
+        self.tokens = tuple(tokens)
+        self.symbol_table = MappingProxyType(dict(symbol_table))
+        self.function_dictionary = MappingProxyType(
+            {name: tuple(params) for name, params in function_dictionary.items()})
+        self.failed_stage = failed_stage  # None, or "Lexer", "Parser" or "Semantic"
+        self.errors = tuple(errors)
+
+        # Operand types, function bodies and variable slots are worked out
+        # once here instead of on every run
+        self.types = None
+        if failed_stage is None:
+            types, _ = infer_types(self.tokens, symbol_table)
+            self.types = tuple(types)
+        scanner = Execute(self.tokens, self.symbol_table, self.function_dictionary, gui_input=False)
+        scanner.types = self.types
+        scanner.store_function_bodies()
+        self.function_bodies = MappingProxyType(scanner.function_bodies)
+        self.inline_bodies = MappingProxyType(scanner.inline_bodies)
+        self.slots = MappingProxyType(scanner.slots)
+        self.frame = (tuple(scanner.values), tuple(scanner.dtypes), tuple(scanner.decls))
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        """================ __setattr__ ================"""
+        if getattr(self, 'frozen', False):
+            raise AttributeError("CompiledProgram is immutable")
+        super().__setattr__(name, value)
+
+    @property
+    def ok(self):
+        """True when the front end reported no errors"""
+        return self.failed_stage is None
+
+    def run(self, inputs=None, output=None, instruments=()):
+        """
+        Execute from a fresh copy of the initial state. GIMMEH takes values
+        from `inputs` in order (EOFError when they run out), or reads stdin
+        when `inputs` is None. VISIBLE writes to `output` when given,
+        otherwise the text is captured in RunResult.stdout. A program that
+        failed to compile does not run; its RunResult carries the compile
+        errors.
+        """
+        if self.failed_stage is not None:
+            return RunResult(dict(self.symbol_table), list(self.errors), "", 0)
+
+        executor = self.executor()
+        captured = io.StringIO() if output is None else None
+        executor.output = output if output is not None else captured
+        if inputs is not None:
+            values = iter(inputs)
+
+            def read_input(var_name):
+                try:
+                    return str(next(values))
+                except StopIteration:
+                    raise EOFError(f"no input left for GIMMEH {var_name}") from None
+
+            executor.read_input = read_input
+
+        for instrument in instruments:
+            instrument.attach(executor)
+        try:
+            executor.execute()
+        finally:
+            for instrument in instruments:
+                instrument.detach(executor)
+
+        return finish(executor, captured.getvalue() if captured is not None else None)
+
+    def start(self, instruments=()):
+        """
+        A paused Session of this program that runs only when advanced, so a
+        host can keep many of them waiting on GIMMEH without a thread each
+        """
+        executor = self.executor()
+        executor.resumable = True
+        return Session(executor, self.errors if self.failed_stage is not None else None, instruments)
+
+    def executor(self):
+        """An Execute over this program's tokens with a fresh copy of its initial state"""
+        executor = Execute(self.tokens, {}, self.function_dictionary, gui_input=False)
+        executor.slots = dict(self.slots)
+        executor.values, executor.dtypes, executor.decls = (list(column) for column in self.frame)
+        executor.function_bodies = self.function_bodies
+        executor.types = self.types
+        executor.program_types = self.types
+        executor.inline_bodies = self.inline_bodies
+        return executor
+
+
+def finish(executor, stdout):
+    """RunResult of a finished executor; IT is added to the symbol table as execute_lolcode does"""
+    symbol_table = dict(executor.symbol_table)
+    if executor.it_var:
+        symbol_table['IT'] = executor.it_var[-1][0]
+    return RunResult(symbol_table, executor.errors, stdout, executor.statement_count)
+
+
+class Session:
+    """
+    One resumable run of a CompiledProgram. advance() runs the program to
+    its next event and returns it:
+        ('output', text)       VISIBLE printed text (including its newline)
+        ('input', var_name)    GIMMEH wants a value; pass it to the next advance()
+        ('done', RunResult)    the program finished (stdout is None: it was
+                               all returned as 'output' events)
+    Exceptions from the program propagate out of advance(). A paused session
+    holds only its executor and generator frames.
+    """
+
+    def __init__(self, executor, compile_errors=None, instruments=()):
+        """================ __init__ ================"""
+        self.executor = executor
+        self.instruments = instruments
+        self.result = None
+        self.waiting = None  # variable name while paused at GIMMEH
+        if compile_errors is not None:
+            self.result = RunResult(dict(executor.symbol_table), list(compile_errors), None, 0)
+            self.steps = None
+            return
+        for instrument in instruments:
+            instrument.attach(executor)
+        self.steps = executor.steps()
+
+    @property
+    def done(self):
+        """================ done ================"""
+        return self.result is not None
+
+    def advance(self, value=None):
+        """Resume with `value` for the pending GIMMEH (if any) and run to the next event"""
+        if self.result is not None:
+            return ('done', self.result)
+        if self.waiting is not None:
+            value = '' if value is None else str(value)
+            self.waiting = None
+        else:
+            value = None  # nothing asked for one
+        try:
+            event = self.steps.send(value)
+        except StopIteration:
+            self.detach()
+            self.result = finish(self.executor, None)
+            return ('done', self.result)
+        except BaseException:
+            self.detach()
+            raise
+        if event[0] == 'input':
+            self.waiting = event[1]
+        return event
+
+    def detach(self):
+        """================ detach ================"""
+        for instrument in self.instruments:
+            instrument.detach(self.executor)
+        self.instruments = ()
+
+    def close(self):
+        """Abandon a paused session"""
+        if self.steps is not None:
+            self.steps.close()
+        self.detach()
+
+
+async def drive(session, read_input, write_output=None):
+    """
+    Run a session on an asyncio loop: awaits `read_input(var_name)` at each
+    GIMMEH and calls `write_output(text)` for each VISIBLE. Returns the
+    RunResult. The program runs without awaiting between inputs, so it
+    yields the loop to other sessions once per output and while it waits.
+    """
+    import asyncio
+
+    value = None
+    while True:
+        kind, payload = session.advance(value)
+        value = None
+        if kind == 'output':
+            if write_output is not None:
+                write_output(payload)
+            await asyncio.sleep(0)
+        elif kind == 'input':
+            value = await read_input(payload)
+        else:
+            return payload
+
+
+def compile_program(source, stats=None, unit_cache=None):
+    """
+    Run the front end over `source` and freeze the result; see
+    instrument.PipelineStats for `stats` and unitcache.UnitCache for `unit_cache`
+    """
+    failed_stage, errors, tokens, symbol_table, function_dictionary = run_pipeline(
+        source, stats, execute=False, unit_cache=unit_cache)
+    return CompiledProgram(source, tokens, symbol_table, function_dictionary, failed_stage, errors)
+
+
+class Interpreter:
+    """Compiles sources through an LRU cache of CompiledPrograms"""
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, unit_cache=None):
+        """
+        Pass a unitcache.UnitCache as `unit_cache` so that a source that is
+        new, but close to one compiled before, only reprocesses the
+        functions and regions that differ
+        """
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # source hash -> CompiledProgram, oldest first
+        self.unit_cache = unit_cache
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, source):
+        """The CompiledProgram for `source`, from the cache when it was seen recently"""
+        key = source_hash(source)
+        program = self.cache.get(key)
+        if program is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return program
+
+        self.misses += 1
+        program = compile_program(source, unit_cache=self.unit_cache)
+        if self.cache_size > 0:
+            self.cache[key] = program
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return program
+
+    def run(self, source, inputs=None, output=None):
+        """compile(source).run(...) in one call"""
+        return self.compile(source).run(inputs, output)
+
+    def clear(self):
+        """================ clear ================"""
+        self.cache.clear()
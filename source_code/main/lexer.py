@@ -1,5 +1,6 @@
 
 import re
+import sys
 
 class Lexer:
     """
@@ -164,36 +165,56 @@ class Lexer:
         in_comment = False
         
         for line in lines:
-            # Check if we're entering a multi-line comment
-            if 'OBTW' in line:
-                # Keep any content before OBTW on the same line
-                before_obtw = line.split('OBTW', 1)[0].strip()
-                if before_obtw:
-                    cleaned_lines.append(before_obtw)
-                in_comment = True
-                
-                # Check if TLDR is on the same line
-                if 'TLDR' in line:
-                    after_tldr = line.split('TLDR', 1)[1].strip()
-                    if after_tldr:
-                        cleaned_lines.append(after_tldr)
-                    in_comment = False
-                continue
+            kept, in_comment = self.strip_multiline_comment(line, in_comment)
+            cleaned_lines.extend(kept)
+        
+        return cleaned_lines
+
+    def strip_multiline_comment(self, line, in_comment):
+        """
+        Apply the OBTW/TLDR rules to a single numbered line.
+        Returns the surviving pieces of the line and the comment state
+        for the next line, so callers can lex a line in isolation.
+        """
+        kept = []
+
+        # Check if we're entering a multi-line comment
+        if 'OBTW' in line:
+            # Keep any content before OBTW on the same line
+            before_obtw = line.split('OBTW', 1)[0].strip()
+            if before_obtw:
+                kept.append(before_obtw)
+            in_comment = True
             
-            # Check if we're exiting a multi-line comment
+            # Check if TLDR is on the same line
             if 'TLDR' in line:
-                # Keep any content after TLDR on the same line
                 after_tldr = line.split('TLDR', 1)[1].strip()
                 if after_tldr:
-                    cleaned_lines.append(after_tldr)
+                    kept.append(self.line_prefix(line) + after_tldr)
                 in_comment = False
-                continue
-            
-            # If not in a comment, keep the line
-            if not in_comment:
-                cleaned_lines.append(line)
+            return kept, in_comment
         
-        return cleaned_lines
+        # Check if we're exiting a multi-line comment
+        if 'TLDR' in line:
+            # Keep any content after TLDR on the same line
+            after_tldr = line.split('TLDR', 1)[1].strip()
+            if after_tldr:
+                kept.append(self.line_prefix(line) + after_tldr)
+            return kept, False
+        
+        # If not in a comment, keep the line
+        if not in_comment:
+            kept.append(line)
+
+        return kept, in_comment
+
+    def line_prefix(self, raw_line):
+        """================ line_prefix ================"""
+        return raw_line.split('|', 1)[0] + '| '
+
+    def line_number(self, raw_line):
+        """================ line_number ================"""
+        return int(raw_line.split('|', 1)[0].strip())
 
     # ================================================================
     # ======================= COMMENT HANDLING ======================
@@ -217,24 +238,32 @@ class Lexer:
     # ================================================================
     # ======================= TOKENIZATION ==========================
     # ================================================================
-    def tokenize_line(self, raw_line):
-        """================ tokenize_line ================"""
+    def tokenize_line(self, raw_line, spans=None):
+        """
+        Tokenize one numbered line. If a spans list is given, the column
+        range of every token is appended to it as (start, end, token_type),
+        with 'INVALID' for text that only produced an error.
+        """
         tokens = []
         line = raw_line
-        pos = 4  # Skip "3 | " prefix
+        pos = line.find('|') + 2  # Skip "3  | " prefix
         in_string = False
         string_content = ""
-        final_line_num = int(raw_line[:3].strip())
+        string_start = pos
+        final_line_num = self.line_number(raw_line)
 
         while pos < len(line):
 
             if line[pos] == '"':
                 if in_string:
                     tokens.append(('String Literal', string_content, 'YARN', final_line_num))
+                    if spans is not None:
+                        spans.append((string_start, pos + 1, 'YARN'))
                     in_string = False
                     string_content = ""
                 else:
                     in_string = True
+                    string_start = pos
                 pos += 1
                 continue
 
@@ -255,6 +284,8 @@ class Lexer:
                     f"Invalid identifier '{bad}' at line {final_line_num} "
                     "(identifiers cannot start with a digit)"
                 )
+                if spans is not None:
+                    spans.append((pos, pos + len(bad), 'INVALID'))
                 pos += len(bad)
                 continue
 
@@ -279,7 +310,10 @@ class Lexer:
                                     )
                                     break
 
-                    tokens.append((description, value, token_type, final_line_num))
+                    # One shared string per distinct lexeme, however often it recurs
+                    tokens.append((description, sys.intern(value), token_type, final_line_num))
+                    if spans is not None:
+                        spans.append((pos, match.end(), token_type))
                     pos = match.end()
                     matched = True
                     break
@@ -289,6 +323,8 @@ class Lexer:
                 if re.match(r'[A-Za-z]', line[pos]):
                     bad = re.match(r'[A-Za-z][A-Za-z0-9_]*', line[pos:]).group(0)
                     self.errors.append(f"Invalid token '{bad}' at line {final_line_num}")
+                    if spans is not None:
+                        spans.append((pos, pos + len(bad), 'INVALID'))
                     pos += len(bad)
                 else:
                     pos += 1  # Skip unknown char
@@ -321,26 +357,41 @@ class Lexer:
     # ======================= MAIN TOKENIZE ==========================
     # ================================================================
     def tokenize(self, text):
-        text_with_linenum = self.assign_linenum(text)
-        # Remove multi-line comments first
-        text_no_multiline = self.remove_multiline_comments(text_with_linenum)
-        # Then remove single-line comments
-        final_text = self.remove_comments(text_no_multiline)
-        
-        all_tokens = []
-        for raw_line in final_text.split('\n'):
-            stripped = raw_line.strip()
-
-            if stripped:
-                line_tokens = self.tokenize_line(raw_line)
-                all_tokens.extend(line_tokens)
+        return list(self.iter_tokens(text))
+
+    def iter_tokens(self, text, first_line=1, in_comment=False):
+        """
+        Tokens of `text` one line at a time, so a consumer such as the
+        parser can start before the whole file is lexed. Counters and errors
+        are complete once the generator is exhausted. A piece of a larger
+        source is lexed by giving the number of its first line and whether
+        it starts inside an OBTW comment.
+        """
+        for line_count, line in enumerate(iter_lines(text), first_line):
+            raw_line = f"{line_count:<3}| " + line
+            line_tokens, in_comment = self.tokenize_numbered_line(raw_line, in_comment)
+            self.update_counters(line_tokens)
+            yield from line_tokens
+
+    def tokenize_numbered_line(self, raw_line, in_comment=False):
+        """
+        Tokenize one "NNN| " prefixed line given the OBTW state at its start.
+        Returns the line's tokens (NEWLINE included) and the comment state
+        for the following line. Counters are left to the caller.
+        """
+        # Remove multi-line comments first, then single-line comments
+        kept, in_comment = self.strip_multiline_comment(raw_line, in_comment)
+        final_lines = self.remove_comments(kept).split('\n') if kept else []
+
+        line_tokens = []
+        for line in final_lines:
+            if line.strip():
+                line_tokens.extend(self.tokenize_line(line))
 
             # Add NEWLINE token (parser needs it)
-            line_num = int(raw_line[:3].strip())
-            all_tokens.append(("Newline", "\\n", "NEWLINE", line_num))
+            line_tokens.append(("Newline", "\\n", "NEWLINE", self.line_number(line)))
 
-        self.update_counters(all_tokens)
-        return all_tokens
+        return line_tokens, in_comment
 
 # ======================= ERROR HANDLING ==========================
     
@@ -348,3 +399,15 @@ class Lexer:
     # ======================= UTILITIES =============================
     # ================================================================
   
+
+
+def iter_lines(text):
+    """text.split('\\n') without building the list"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
@@ -0,0 +1,93 @@
+"""
+LOLCODE Server Load Generator
+Drives an execution server (see server.py) with `concurrency` clients, each
+on its own connection, sending one request at a time until `requests` have
+been answered. The first request carries the source; the rest send its
+script_id, as a service that runs the same program repeatedly would.
+
+Reports throughput and latency percentiles (nearest rank) in milliseconds.
+"""
+import asyncio
+import json
+import time
+
+
+async def open_connection(address):
+    """Connect to 'HOST:PORT' or a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if port.isdigit() and host:
+        return await asyncio.open_connection(host, int(port))
+    return await asyncio.open_unix_connection(address)
+
+
+async def request(reader, writer, payload):
+    """================ request ================"""
+    writer.write(json.dumps(payload).encode('utf-8') + b"\n")
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("server closed the connection")
+    return json.loads(line)
+
+
+async def run_load(address, source, requests=1000, concurrency=8, inputs=(), timeout=None):
+    """Fire `requests` runs of `source` at the server; returns the results document"""
+    reader, writer = await open_connection(address)
+    first = {"id": 0, "source": source, "inputs": list(inputs)}
+    if timeout is not None:
+        first["timeout"] = timeout
+    script_id = (await request(reader, writer, first))["script_id"]
+    writer.close()
+
+    latencies = []
+    statuses = {}
+    remaining = [requests]
+
+    async def client(number):
+        reader, writer = await open_connection(address)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                payload = {"id": number, "script_id": script_id, "inputs": list(inputs)}
+                if timeout is not None:
+                    payload["timeout"] = timeout
+                start = time.perf_counter()
+                response = await request(reader, writer, payload)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response["status"]] = statuses.get(response["status"], 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "statuses": statuses,
+        "latency_ms": {"p50": percentile(latencies, 50), "p90": percentile(latencies, 90),
+                       "p99": percentile(latencies, 99), "max": max(latencies, default=0.0)},
+    }
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of `values` (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def format_load(results):
+    """================ format_load ================"""
+    latency = results["latency_ms"]
+    statuses = ", ".join(f"{status} {count}" for status, count in sorted(results["statuses"].items()))
+    return (f"{results['requests']} requests, {results['concurrency']} clients, "
+            f"{results['seconds']:.2f} s: {results['throughput']:.1f} req/s\n"
+            f"latency ms: p50 {latency['p50']:.2f}  p90 {latency['p90']:.2f}  "
+            f"p99 {latency['p99']:.2f}  max {latency['max']:.2f}\n"
+            f"statuses: {statuses}")
@@ -1,72 +1,659 @@
-
 """
 LOLCODE CLI & GUI Launcher
-Handles command-line interface for tokenizing and parsing LOLCODE,
-or launching the GUI version of the interpreter.
+Headless command-line interface for running, tokenizing, checking and
+benchmarking LOLCODE files, or launching the GUI version of the interpreter.
+
+    python3 main.py run FILE       execute a program (GIMMEH reads stdin)
+    python3 main.py tokens FILE    print the lexeme table
+    python3 main.py check FILE     lex, parse and analyze without running
+    python3 main.py bench [FILE]   time each phase over files or the benchmark suite
+    python3 main.py golden [DIR]   compare scripts' output with stored golden files
+    python3 main.py batch FILE...  run many programs interleaved in one process
+    python3 main.py serve          run the JSON-lines execution server
+    python3 main.py load FILE      measure a server's throughput and latency
+    python3 main.py generate       print a random valid program for scaling tests
+    python3 main.py --gui          launch the GUI
+
+The interpreter phases and the GUI (and so tkinter) are imported only by the
+commands that need them, so batch runs start fast and work without a display.
 """
 
 # ================================================================
 # ======================= IMPORTS =================================
 # ================================================================
-from lexer import Lexer
-from parser import parse_lolcode
-from semantic import analyze_lolcode
-from execute import execute_lolcode
-import gui  # GUI module
+import argparse
+import os
+import sys
+
+# Exit codes
+EXIT_OK = 0
+EXIT_ERRORS = 1  # lexer, parser, semantic or runtime errors in the program
+
+# ================================================================
+# ======================= HELPERS ================================
+# ================================================================
+def load_source(path):
+    """================ load_source ================"""
+    with open(path, 'r') as file:
+        return file.read()
+
+
+def report(errors, stage):
+    """Print a stage's errors to stderr"""
+    print(f"[!] {stage} Errors:", file=sys.stderr)
+    for err in errors:
+        print(err, file=sys.stderr)
+
+
+def make_stats(args):
+    """PipelineStats when --timings was given, else None"""
+    if not getattr(args, "timings", None):
+        return None
+    from instrument import PipelineStats
+    return PipelineStats(memory=not args.no_memory)
+
+
+def load_unit_cache(args):
+    """The UnitCache saved at --unit-cache, or None without the option"""
+    if not getattr(args, "unit_cache", None):
+        return None
+    from unitcache import UnitCache
+    return UnitCache.load(args.unit_cache)
+
+
+def print_rebuilt(unit_cache):
+    """Print which units the last compile through `unit_cache` rebuilt to stderr"""
+    if unit_cache is None:
+        return
+    from unitcache import format_rebuilt
+    print(format_rebuilt(unit_cache), file=sys.stderr)
+
+
+def print_timings(args, stats):
+    """Print collected phase stats to stderr as a table or JSON"""
+    if stats is None:
+        return
+    if args.timings == "json":
+        import json
+        print(json.dumps(stats.as_dict(), indent=1), file=sys.stderr)
+    else:
+        print(stats.format_table(), file=sys.stderr)
 
 # ================================================================
-# ======================= CLI RUNNER =============================
+# ======================= COMMANDS ===============================
 # ================================================================
-def run_cli():
+def run_cli(args):
     """================ run_cli ================"""
-    # ----------------- Load source code -----------------
-    input_file = "02_gimmeh.lol"
-    with open(input_file, 'r') as file:
-        text = file.read()
+    from pipeline import run_pipeline
+
+    text = load_source(args.file)
+    stats = make_stats(args)
+    unit_cache = load_unit_cache(args)
+    instruments = []
+    if args.profile or args.profile_stacks:
+        from profiler import LineProfiler
+        line_profiler = LineProfiler()
+        instruments.append(line_profiler)
+    if args.trace:
+        from recorder import TraceRecorder
+        recorder = TraceRecorder(dump_path=args.trace)
+        instruments.append(recorder)
+    if args.coverage:
+        from hooks import LineCoverage
+        coverage = LineCoverage()
+        instruments.append(coverage)
+    if args.sample or args.sample_stacks:
+        from profiler import SamplingProfiler
+        sampler = SamplingProfiler(1 / args.sample_hz)
+        instruments.append(sampler)
+
+    try:
+        failed_stage, errors, tokens = run_pipeline(text, stats, instruments=instruments,
+                                                    unit_cache=unit_cache)[:3]
+    except EOFError:
+        print("[!] GIMMEH reached the end of standard input", file=sys.stderr)
+        return EXIT_ERRORS
+    finally:
+        if args.profile:
+            print(line_profiler.report(text, args.profile), file=sys.stderr)
+        if args.profile_stacks:
+            line_profiler.write_collapsed(args.profile_stacks)
+        if args.sample:
+            print(sampler.report(text, args.sample), file=sys.stderr)
+        if args.sample_stacks:
+            sampler.write_collapsed(args.sample_stacks)
+        if args.trace:
+            recorder.dump(args.trace)
+        if unit_cache is not None:
+            unit_cache.save(args.unit_cache)
 
-    # ----------------- Tokenization -----------------
-    lexer = Lexer()
-    tokens = lexer.tokenize(text)
+    print_rebuilt(unit_cache)
+    print_timings(args, stats)
+    if args.coverage:
+        print(coverage.report(tokens), file=sys.stderr)
+    if failed_stage:
+        report(errors, failed_stage)
+        return EXIT_ERRORS
+    return EXIT_OK
 
-    if len(lexer.errors) == 0:
-        lexer_success = True
 
+def tokens_cli(args):
+    """================ tokens_cli ================"""
+    from lexer import Lexer
+    from parallel_lexer import ParallelLexer
+
+    lexer = ParallelLexer(args.jobs) if args.jobs else Lexer()
+    tokens = lexer.tokenize(load_source(args.file))
+
+    if args.json:
+        import json
+        rows = [{"description": desc, "lexeme": lexeme, "type": kind, "line": line}
+                for desc, lexeme, kind, line in tokens]
+        print(json.dumps(rows, indent=1))
     else:
-        lexer_success = False
-
-
-        # ----------------- Parsing --------        ---------
-    if lexer_success:
-            # ----------------- Parsing -----------------
-        success, parser, symbol_table, function_dictionary, parse_errors = parse_lolcode(tokens)
-        if success:
-            semantic_success, semantic_errors = analyze_lolcode(tokens, symbol_table, function_dictionary)
-            if semantic_success:
-                final_symbol_table, final_function_table, final_errors = execute_lolcode(tokens, symbol_table, function_dictionary)
-            else:
-                for i in semantic_errors:
-                    print(i)
+        for desc, lexeme, kind, line in tokens:
+            if kind != 'NEWLINE':
+                print(f"{line:>5}  {kind:<12} {lexeme!r:<24} {desc}")
+
+    if lexer.errors:
+        report(lexer.errors, "Lexer")
+        return EXIT_ERRORS
+    return EXIT_OK
+
+
+def check_cli(args):
+    """================ check_cli ================"""
+    from pipeline import run_pipeline
+
+    status = EXIT_OK
+    unit_cache = load_unit_cache(args)
+    for path in args.files:
+        stats = make_stats(args)
+        failed_stage, errors = run_pipeline(load_source(path), stats, execute=False, unit_cache=unit_cache)[:2]
+        if failed_stage:
+            report(errors, failed_stage)
+            print(f"{path}: FAILED")
+            status = EXIT_ERRORS
         else:
-            for i in parse_errors:
-                print(i)
-                        
+            print(f"{path}: OK")
+        print_rebuilt(unit_cache)
+        print_timings(args, stats)
+    if unit_cache is not None:
+        unit_cache.save(args.unit_cache)
+    return status
+
+
+def trace_cli(args):
+    """================ trace_cli ================"""
+    from recorder import format_trace
+
+    source = load_source(args.source) if args.source else None
+    print(format_trace(args.file, args.last, source))
+    return EXIT_OK
+
+
+def bench_cli(args):
+    """================ bench_cli ================"""
+    import json
+    import benchmark
+
+    if args.scaling:
+        return scaling_cli(args)
+    if args.nesting:
+        return nesting_cli(args)
+    if args.stream:
+        return stream_cli(args)
+    if args.parallel_lex:
+        return parallel_lex_cli(args)
+    if args.files:
+        scripts = [(path, path) for path in args.files]
     else:
-        for i in lexer.errors:
-            print(i)
+        scripts = benchmark.discover(args.suite)
+    inputs = load_source(args.input_file).splitlines() if args.input_file else None
+    if args.api:
+        return api_cli(args, scripts, inputs)
+
+    print(benchmark.format_header())
+    results = benchmark.run_suite(scripts, args.repeat, args.timeout, inputs, benchmark.print_progress)
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    status = EXIT_OK
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        regressions = benchmark.compare(results, baseline, args.threshold)
+        print(benchmark.format_regressions(regressions))
+        if regressions:
+            status = EXIT_ERRORS
+
+    if args.startup:
+        print_startup(scripts[0][1], args.repeat)
+    return status
+
+
+def golden_cli(args):
+    """================ golden_cli ================"""
+    import time
+    import benchmark
+    import golden
+
+    scripts = golden.collect(args.paths or [benchmark.SUITES[suite] for suite in ("project", "other")])
+    inputs = load_source(args.input_file).splitlines() if args.input_file else None
+    failures = []
+
+    def progress(path, result, elapsed):
+        verdict = golden.verdict(path, result, args.update)
+        if verdict not in ("pass", "updated"):
+            failures.append(path)
+        print(golden.format_verdict(path, verdict, elapsed), flush=True)
+
+    start = time.perf_counter()
+    golden.run_corpus(scripts, args.jobs, args.timeout, inputs, progress)
+    outcome = "written" if args.update else "matched"
+    print(f"{len(scripts) - len(failures)}/{len(scripts)} {outcome} in {time.perf_counter() - start:.2f} s")
+
+    if scripts and args.startup_budget > 0:
+        python, check, tkinter = golden.startup(scripts[0])
+        verdict = golden.startup_verdict(python, check, tkinter, args.startup_budget / 1000)
+        if verdict != "pass":
+            failures.append("startup")
+        print(golden.format_startup(python, check, tkinter, verdict))
+    return EXIT_ERRORS if failures else EXIT_OK
+
+
+def api_cli(args, scripts, inputs):
+    """Per-run cost of the full pipeline against a compiled program's run()"""
+    import benchmark
+    from interpreter import compile_program
+
+    print(benchmark.format_api_header())
+    for name, path in scripts:
+        result = benchmark.api_overhead(path, args.runs, args.timeout, inputs)
+        print(benchmark.format_api_result(name, result), flush=True)
+
+    empty = compile_program("HAI\nKTHXBYE\n")
+    per_run = benchmark.best_batch(empty.run, args.runs * 10)
+    print(f"fixed cost of run() on an empty program: {per_run * 1000:.1f} us")
+    return EXIT_OK
+
+
+def scaling_cli(args):
+    """Time and trace memory for generated programs of growing size"""
+    import json
+    import benchmark
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(benchmark.format_scaling_header())
+    results = benchmark.run_scaling(sizes, args.seed, args.repeat, args.timeout,
+                                    lambda point: print(benchmark.format_scaling_point(point), flush=True),
+                                    **generator_knobs(args))
+    print(benchmark.format_growth(results["growth"]))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    return EXIT_OK
+
+
+def nesting_cli(args):
+    """Time programs whose expressions are nested ever deeper"""
+    import json
+    import benchmark
+
+    depths = [int(depth) for depth in args.depths.split(",")]
+    print(benchmark.format_scaling_header('depth'))
+    results = benchmark.run_nesting(depths, args.repeat, args.timeout,
+                                    lambda point: print(benchmark.format_scaling_point(point), flush=True))
+    print(benchmark.format_growth(results["growth"]))
+    print(benchmark.format_growth(results["memory_growth"], label="memory growth exponent vs tokens"))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    return EXIT_OK
+
+
+def stream_cli(args):
+    """Lex and parse generated programs separately, fused, and streamed without keeping tokens"""
+    import json
+    import benchmark
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    modes = list(benchmark.STREAM_MODES)
+    print(benchmark.format_scaling_header(phases=modes))
+    results = benchmark.run_streaming(sizes, args.seed, args.repeat,
+                                      lambda point: print(benchmark.format_scaling_point(point, modes), flush=True),
+                                      **generator_knobs(args))
+    print(benchmark.format_growth(results["growth"], modes))
+    print(benchmark.format_growth(results["memory_growth"], modes, "memory growth exponent vs tokens"))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    return EXIT_OK
+
+
+def parallel_lex_cli(args):
+    """Lex generated programs serially and across growing numbers of worker processes"""
+    import json
+    import benchmark
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if args.lex_jobs:
+        jobs = [int(count) for count in args.lex_jobs.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        jobs = [count for count in (2, 4, 8, 16, 32, 64) if count < cpus] + [max(cpus, 2)]
+    print(f"{os.cpu_count()} CPUs")
+    print(benchmark.format_parallel_header(jobs))
+    results = benchmark.run_parallel_lex(sizes, jobs, args.seed, args.repeat,
+                                         lambda point: print(benchmark.format_parallel_point(point), flush=True),
+                                         **generator_knobs(args))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    mismatched = any(not run["matches"] for point in results["points"] for run in point["runs"])
+    return EXIT_ERRORS if mismatched else EXIT_OK
+
+
+def batch_cli(args):
+    """================ batch_cli ================"""
+    import json
+    from benchmark import inputs_for
+    from scheduler import Scheduler, format_metrics, format_task, format_task_header
+
+    inputs = load_source(args.input_file).splitlines() if args.input_file else None
+    scheduler = Scheduler(args.quantum, args.cpu_budget)
+    for path in args.files:
+        scheduler.add(path, load_source(path), stdin=inputs if inputs is not None else list(inputs_for(path)))
+    scheduler.run()
+
+    print(format_task_header())
+    status = EXIT_OK
+    for task in scheduler.tasks.values():
+        print(format_task(task))
+        if task.status != "ok":
+            status = EXIT_ERRORS
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(task.name))[0]
+            with open(os.path.join(args.output_dir, name + ".out"), 'w') as file:
+                file.write(task.stdout.getvalue())
+    metrics = scheduler.metrics()
+    print(format_metrics(metrics))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(metrics, file, indent=1)
+    return status
+
+
+def serve_cli(args):
+    """================ serve_cli ================"""
+    import asyncio
+    from server import serve
+
+    def ready(address):
+        print(f"listening on {address} with {args.workers} workers", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.socket, args.host, args.port, ready, args.timeout, args.max_output,
+                          workers=args.workers, max_jobs=args.max_jobs, memory_mb=args.memory_mb,
+                          unit_cache_size=args.unit_cache))
+    except KeyboardInterrupt:
+        pass
+    return EXIT_OK
+
+
+def load_cli(args):
+    """
+    Load-test a running server at --connect, or, without it, one started in
+    this process on a temporary Unix socket.
+    """
+    import asyncio
+    import json
+    from loadgen import format_load, run_load
+
+    source = load_source(args.file)
+    inputs = load_source(args.input_file).splitlines() if args.input_file else []
+
+    async def measure():
+        if args.connect:
+            return await run_load(args.connect, source, args.requests, args.concurrency, inputs)
+        import tempfile
+        from server import serve
+
+        socket_path = os.path.join(tempfile.mkdtemp(), "lolcode.sock")
+        started = asyncio.Event()
+        server = asyncio.ensure_future(serve(socket_path, ready=lambda address: started.set(),
+                                             workers=args.workers, max_jobs=args.max_jobs))
+        await started.wait()
+        try:
+            return await run_load(socket_path, source, args.requests, args.concurrency, inputs)
+        finally:
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+
+    results = asyncio.run(measure())
+    print(format_load(results))
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    return EXIT_OK
+
+
+def generate_cli(args):
+    """================ generate_cli ================"""
+    from generator import generate_program
+
+    sys.stdout.write(generate_program(args.seed, statements=args.statements, **generator_knobs(args)))
+    return EXIT_OK
+
+
+def generator_knobs(args):
+    """ProgramGenerator keyword arguments from the shared generator flags"""
+    return {"variables": args.variables, "expr_depth": args.expr_depth, "loop_depth": args.loop_depth,
+            "branch_density": args.branch_density, "functions": args.functions, "fan_out": args.fan_out,
+            "loop_iterations": args.loop_iterations}
+
+
+def print_startup(path, repeat):
+    """
+    Start-up cost of a headless `check` compared with a bare interpreter, and
+    whether the check process pulled in the GUI toolkit (golden.startup).
+    """
+    import golden
+
+    python, check, tkinter = golden.startup(path, repeat)
+    print(f"startup: python {python * 1000:.1f} ms, "
+          f"check {check * 1000:.1f} ms (+{(check - python) * 1000:.1f} ms)")
+    print(f"tkinter imported: {'yes' if tkinter else 'no'}")
+
+
+def gui_cli(args):
+    """================ gui_cli ================"""
+    import gui
+    gui.start_gui()
+    return EXIT_OK
 
 # ================================================================
 # ======================= MAIN ENTRY ============================
 # ================================================================
-def main():
+def add_timing_arguments(command):
+    """================ add_timing_arguments ================"""
+    command.add_argument("--timings", nargs="?", const="table", choices=["table", "json"],
+                         help="print per-phase time, memory, token and statement counts to stderr")
+    command.add_argument("--no-memory", action="store_true",
+                         help="skip tracemalloc so --timings reflects uninstrumented speed")
+
+
+def add_unit_cache_arguments(command):
+    """================ add_unit_cache_arguments ================"""
+    command.add_argument("--unit-cache", metavar="FILE",
+                         help="reuse front-end results per function and region saved in FILE, update it, "
+                              "and print the units that were rebuilt to stderr")
+
+
+def add_generator_arguments(command):
+    """Knobs shared by `generate` and `bench --scaling`"""
+    command.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    command.add_argument("--variables", type=int, default=10, help="WAZZUP variables (default 10)")
+    command.add_argument("--expr-depth", type=int, default=2, help="arithmetic nesting depth (default 2)")
+    command.add_argument("--loop-depth", type=int, default=1, help="deepest loop nesting (default 1)")
+    command.add_argument("--branch-density", type=float, default=0.1,
+                         help="chance a statement opens O RLY? or WTF? (default 0.1)")
+    command.add_argument("--functions", type=int, default=2, help="HOW IZ I functions (default 2)")
+    command.add_argument("--fan-out", type=int, default=1, help="calls per function to earlier ones (default 1)")
+    command.add_argument("--loop-iterations", type=int, default=3, help="iterations per loop (default 3)")
+
+
+def build_arg_parser():
+    """================ build_arg_parser ================"""
+    arg_parser = argparse.ArgumentParser(description="LOLCODE interpreter")
+    arg_parser.add_argument("--gui", action="store_true", help="launch the GUI")
+    commands = arg_parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="execute a program")
+    run.add_argument("file")
+    add_timing_arguments(run)
+    add_unit_cache_arguments(run)
+    run.add_argument("--profile", nargs="?", type=int, const=20, metavar="N",
+                     help="print the N hottest lines, functions and loops to stderr (default 20)")
+    run.add_argument("--profile-stacks", metavar="FILE",
+                     help="write collapsed stacks for flamegraph tools to FILE")
+    run.add_argument("--coverage", action="store_true",
+                     help="print which statement lines ran to stderr")
+    run.add_argument("--trace", metavar="FILE",
+                     help="record recent statements in a binary ring buffer and write it to FILE")
+    run.add_argument("--sample", nargs="?", type=int, const=20, metavar="N",
+                     help="sample the running program and print the N hottest lines to stderr")
+    run.add_argument("--sample-hz", type=float, default=1000, metavar="HZ",
+                     help="sampling rate for --sample (default 1000)")
+    run.add_argument("--sample-stacks", metavar="FILE",
+                     help="write sampled collapsed stacks to FILE")
+    run.set_defaults(handler=run_cli)
+
+    tokens = commands.add_parser("tokens", help="print the lexeme table")
+    tokens.add_argument("file")
+    tokens.add_argument("--json", action="store_true", help="emit the tokens as JSON")
+    tokens.add_argument("-j", "--jobs", type=int,
+                        help="lex a large file in this many worker processes (sources under 256 KiB stay serial)")
+    tokens.set_defaults(handler=tokens_cli)
+
+    check = commands.add_parser("check", help="lex, parse and analyze without running")
+    check.add_argument("files", nargs="+", metavar="file")
+    add_timing_arguments(check)
+    add_unit_cache_arguments(check)
+    check.set_defaults(handler=check_cli)
+
+    trace = commands.add_parser("trace", help="decode a trace written by run --trace")
+    trace.add_argument("file")
+    trace.add_argument("-n", "--last", type=int, default=20, help="steps to show (default 20, 0 for all)")
+    trace.add_argument("--source", metavar="LOL_FILE", help="program the trace came from, to show each line")
+    trace.set_defaults(handler=trace_cli)
+
+    bench = commands.add_parser("bench", help="time each interpreter phase over files or the benchmark suite")
+    bench.add_argument("files", nargs="*", metavar="file",
+                       help="scripts to time (default: the corpora and workloads under Test_Cases)")
+    bench.add_argument("--suite", action="append", choices=["project", "other", "workloads"],
+                       help="limit the default run to these suites (repeatable)")
+    bench.add_argument("--repeat", type=int, default=5, help="runs per script (default 5)")
+    bench.add_argument("--timeout", type=float, default=10.0, help="seconds per run before giving up (default 10)")
+    bench.add_argument("--input-file", help="GIMMEH values, one per line, for every script")
+    bench.add_argument("--json", metavar="FILE", help="write machine-readable results to FILE")
+    bench.add_argument("--compare", metavar="BASELINE",
+                       help="flag phases slower than a --json file from an earlier run")
+    bench.add_argument("--threshold", type=float, default=0.10,
+                       help="slowdown fraction counted as a regression (default 0.10)")
+    bench.add_argument("--startup", action="store_true",
+                       help="also measure CLI start-up time in a fresh process")
+    bench.add_argument("--api", action="store_true",
+                       help="compare a full pipeline run with a compile-once Interpreter run per script")
+    bench.add_argument("--runs", type=int, default=100, help="runs per batch for --api (default 100)")
+    bench.add_argument("--scaling", action="store_true",
+                       help="time generated programs of growing size instead of files")
+    bench.add_argument("--sizes", default="250,500,1000,2000,4000",
+                       help="comma-separated statement counts for --scaling, --stream and --parallel-lex (default 250,500,1000,2000,4000)")
+    bench.add_argument("--nesting", action="store_true",
+                       help="time programs with ever deeper nested expressions instead of files")
+    bench.add_argument("--depths", default="1000,2500,5000,10000",
+                       help="comma-separated nesting depths for --nesting (default 1000,2500,5000,10000)")
+    bench.add_argument("--stream", action="store_true",
+                       help="lex and parse generated programs (--sizes) as separate passes, fused, and streamed")
+    bench.add_argument("--parallel-lex", action="store_true",
+                       help="lex generated programs (--sizes) serially and in worker processes, checking the results match")
+    bench.add_argument("--lex-jobs", metavar="N,N,...",
+                       help="worker counts for --parallel-lex (default: powers of two up to the CPU count)")
+    add_generator_arguments(bench)
+    bench.set_defaults(handler=bench_cli)
+
+    batch = commands.add_parser("batch", help="run many programs interleaved in one process")
+    batch.add_argument("files", nargs="+", metavar="file")
+    batch.add_argument("--quantum", type=int, default=200, help="statements per time slice (default 200)")
+    batch.add_argument("--cpu-budget", type=float, default=10.0, help="CPU seconds per script (default 10)")
+    batch.add_argument("--input-file", help="GIMMEH values, one per line, given to every script (default: each NAME.in)")
+    batch.add_argument("--output-dir", metavar="DIR", help="write each script's output to DIR/NAME.out")
+    batch.add_argument("--json", metavar="FILE", help="write the aggregate metrics to FILE")
+    batch.set_defaults(handler=batch_cli)
+
+    cpus = os.cpu_count() or 1
+    serve = commands.add_parser("serve", help="run the JSON-lines execution server")
+    serve.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    serve.add_argument("--host", default="127.0.0.1", help="TCP address (default 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=7124, help="TCP port (default 7124)")
+    serve.add_argument("--workers", type=int, default=cpus, help=f"worker processes (default {cpus})")
+    serve.add_argument("--max-jobs", type=int, default=1000, help="jobs per worker before it is replaced")
+    serve.add_argument("--timeout", type=float, default=5.0, help="longest a request may run, in seconds")
+    serve.add_argument("--memory-mb", type=int, default=512, help="address space limit per worker")
+    serve.add_argument("--max-output", type=int, default=1 << 20, help="VISIBLE characters per request")
+    serve.add_argument("--unit-cache", type=int, default=0, metavar="N",
+                       help="keep N front-end results per function and region in each worker (default 0: off)")
+    serve.set_defaults(handler=serve_cli)
+
+    load = commands.add_parser("load", help="measure a server's throughput and p99 latency on one script")
+    load.add_argument("file")
+    load.add_argument("--connect", metavar="ADDRESS",
+                      help="HOST:PORT or socket path of a running server (default: start one here)")
+    load.add_argument("-n", "--requests", type=int, default=1000, help="requests to send (default 1000)")
+    load.add_argument("-c", "--concurrency", type=int, default=8, help="concurrent clients (default 8)")
+    load.add_argument("--workers", type=int, default=cpus, help="workers for the built-in server")
+    load.add_argument("--max-jobs", type=int, default=1000, help="jobs per worker for the built-in server")
+    load.add_argument("--input-file", help="GIMMEH values, one per line, for every request")
+    load.add_argument("--json", metavar="FILE", help="write the results to FILE")
+    load.set_defaults(handler=load_cli)
+
+    golden = commands.add_parser("golden", help="compare scripts' output with stored golden files")
+    golden.add_argument("paths", nargs="*", metavar="path",
+                        help="scripts or directories (default: the two test-case folders)")
+    golden.add_argument("--update", action="store_true", help="rewrite the golden files from this run")
+    golden.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU)")
+    golden.add_argument("--timeout", type=float, default=10.0, help="seconds per script (default 10)")
+    golden.add_argument("--input-file", help="GIMMEH values, one per line, for every script")
+    golden.add_argument("--startup-budget", type=float, default=500, metavar="MS",
+                        help="fail when a headless check starts more than MS slower than a bare "
+                             "interpreter or imports tkinter (default 500; 0 skips the check)")
+    golden.set_defaults(handler=golden_cli)
+
+    generate = commands.add_parser("generate", help="print a random valid program for scaling tests")
+    generate.add_argument("--statements", type=int, default=100, help="main program statements (default 100)")
+    add_generator_arguments(generate)
+    generate.set_defaults(handler=generate_cli)
+
+    return arg_parser
+
+
+def main(argv=None):
     """================ main ================"""
-    choice = input("Run in GUI mode? (y/n): ").strip().lower()
-    if choice == "y":
-        gui.start_gui()
-    else:
-        run_cli()
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+
+    if args.gui:
+        return gui_cli(args)
+    if args.command is None:
+        arg_parser.print_help()
+        return EXIT_ERRORS
+    return args.handler(args)
 
 # ================================================================
 # ======================= SCRIPT EXECUTION =======================
 # ================================================================
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
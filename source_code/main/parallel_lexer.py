@@ -0,0 +1,135 @@
+"""
+LOLCODE Parallel Lexer
+Lexes a large source in a process pool. The text is cut at line boundaries
+into chunks, and a pre-scan that only visits lines containing OBTW or TLDR
+gives the comment state at the start of each chunk, so every chunk can be
+lexed on its own with Lexer.iter_tokens. Tokens, errors and counters are
+joined back in source order, which gives exactly what Lexer().tokenize does:
+
+    lexer = ParallelLexer(jobs=4)
+    tokens = lexer.tokenize(text)       # lexer.errors, lexer.keyword_count, ...
+
+Workers are forked with the source already in memory where the platform
+allows it, so a task is just the offsets of its chunk; only the tokens are
+pickled back. Sources under MIN_PARALLEL_CHARS are lexed serially, because
+starting the pool costs more than lexing them.
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import Lexer
+
+# Lexer attributes summed over the chunks
+COUNTERS = ('keyword_count', 'identifier_count', 'numbr_literal_count', 'numbar_literal_count',
+            'yarn_literal_count', 'troof_literal_count', 'operator_count', 'other_symbol_count')
+
+# Smaller sources are not worth starting a pool for
+MIN_PARALLEL_CHARS = 256 * 1024
+
+# Chunks per worker, so a worker that finishes early picks up more work
+CHUNKS_PER_JOB = 4
+
+COMMENT_MARKER = re.compile(r'OBTW|TLDR')
+
+# The source text in a worker process, set by share_source
+SOURCE = None
+
+
+def share_source(text):
+    """Pool initializer: keep the source in the worker"""
+    global SOURCE
+    SOURCE = text
+
+
+def split_chunks(text, count):
+    """
+    Cut `text` into at most `count` runs of whole lines of about equal size.
+    Returns (start, end, first line number) per chunk; the newline between
+    two chunks belongs to neither, as it would in text.split('\\n').
+    """
+    chunks = []
+    start, first_line = 0, 1
+    step = max(1, len(text) // count)
+    while True:
+        end = text.find('\n', start + step)
+        if end < 0:
+            chunks.append((start, len(text), first_line))
+            return chunks
+        chunks.append((start, end, first_line))
+        first_line += text.count('\n', start, end) + 1
+        start = end + 1
+
+
+def comment_states(text, starts, lexer):
+    """
+    Whether each chunk start offset in `starts` (ascending) is inside an
+    OBTW comment. Only lines containing OBTW or TLDR can change the state,
+    so just those are run through the lexer's own OBTW/TLDR rules.
+    """
+    states = []
+    in_comment = False
+    pending = iter(starts)
+    boundary = next(pending, None)
+    line_end = -1
+    for marker in COMMENT_MARKER.finditer(text):
+        if marker.start() < line_end:
+            continue    # another marker on a line already applied
+        line_start = text.rfind('\n', 0, marker.start()) + 1
+        while boundary is not None and boundary <= line_start:
+            states.append(in_comment)
+            boundary = next(pending, None)
+        line_end = text.find('\n', marker.start())
+        if line_end < 0:
+            line_end = len(text)
+        in_comment = lexer.strip_multiline_comment(text[line_start:line_end], in_comment)[1]
+    while boundary is not None:
+        states.append(in_comment)
+        boundary = next(pending, None)
+    return states
+
+
+def lex_chunk(start, end, first_line, in_comment):
+    """Worker: (tokens, errors, counters) of one chunk of the shared source"""
+    lexer = Lexer()
+    tokens = list(lexer.iter_tokens(SOURCE[start:end], first_line, in_comment))
+    return tokens, lexer.errors, [getattr(lexer, name) for name in COUNTERS]
+
+
+class ParallelLexer(Lexer):
+    """A Lexer whose tokenize() spreads a large source over `jobs` processes (default: one per CPU)"""
+
+    def __init__(self, jobs=None, min_chars=MIN_PARALLEL_CHARS):
+        super().__init__()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.min_chars = min_chars
+
+    def tokenize(self, text):
+        if self.jobs < 2 or len(text) < self.min_chars:
+            return super().tokenize(text)
+
+        chunks = split_chunks(text, self.jobs * CHUNKS_PER_JOB)
+        states = comment_states(text, [start for start, _, _ in chunks], self)
+        with ProcessPoolExecutor(max_workers=self.jobs, mp_context=pool_context(),
+                                 initializer=share_source, initargs=(text,)) as pool:
+            futures = [pool.submit(lex_chunk, start, end, first_line, in_comment)
+                       for (start, end, first_line), in_comment in zip(chunks, states)]
+            return self.merge(future.result() for future in futures)
+
+    def merge(self, results):
+        """Join chunk results, in source order, into one token list; errors and counters go on self"""
+        tokens = []
+        for chunk_tokens, errors, counters in results:
+            tokens.extend(chunk_tokens)
+            self.errors.extend(errors)
+            for name, count in zip(COUNTERS, counters):
+                setattr(self, name, getattr(self, name) + count)
+        return tokens
+
+
+def pool_context():
+    """fork where available, so workers inherit the source instead of unpickling it"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
@@ -6,6 +6,117 @@ Pushdown Automaton (PDA) inspired parser for syntax analysis
 """
 import re
 
+MATH_OPERATORS = ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF']
+BOOLEAN_OPERATORS = ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']
+COMPARISON_OPERATORS = ['BOTH SAEM', 'DIFFRINT', 'BIGGR OF', 'SMALLR OF']
+EXPRESSION_OPERATORS = set(MATH_OPERATORS + BOOLEAN_OPERATORS + COMPARISON_OPERATORS)
+
+# parse_expression's value for an operand whose text is already in its pieces
+PIECES = object()
+
+# Tokens past the current one the grammar ever looks at: peek(2) tells
+# "x R MAEK" from "x R <expression>". StreamParser holds no more than this.
+LOOKAHEAD = 2
+
+# parse() rejects a program with statements before its WAZZUP when this
+# exact token follows them
+MISPLACED_WAZZUP = ('Variable List Delimiter', 'WAZZUP', 'KEYWORD', 5)
+
+
+class MisplacedWazzup(Exception):
+    """Raised by a TokenStream when its watched token arrives"""
+
+
+class TokenRange:
+    """
+    tokens[start:stop] without the copy: a read-only view that indexes,
+    slices (into another view), iterates and measures like the list it
+    stands for. Function bodies are kept as these, so a program's tokens
+    are held once however many functions it has.
+    """
+    __slots__ = ('tokens', 'start', 'stop')
+
+    def __init__(self, tokens, start, stop):
+        self.tokens = tokens
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.stop - self.start)
+            if step != 1:
+                return [self.tokens[self.start + pos] for pos in range(start, stop, step)]
+            return TokenRange(self.tokens, self.start + start, self.start + max(start, stop))
+        if index < 0:
+            index += self.stop - self.start
+        if not 0 <= index < self.stop - self.start:
+            raise IndexError("TokenRange index out of range")
+        return self.tokens[self.start + index]
+
+    def __iter__(self):
+        return map(self.tokens.__getitem__, range(self.start, self.stop))
+
+    def __repr__(self):
+        return f"TokenRange({self.start}:{self.stop} of {len(self.tokens)} tokens)"
+
+
+class TokenStream:
+    """
+    Ring buffer over a token iterator holding the current token and the
+    LOOKAHEAD tokens after it. Tokens are pulled from the iterator only as
+    the window moves forward, so the iterator can be a lexer that is still
+    running and tokens that have been passed are not kept.
+    """
+
+    def __init__(self, tokens, record=None):
+        """================ __init__ ================"""
+        self.source = iter(tokens)
+        self.record = record  # list every pulled token is appended to, or None
+        self.watch = None     # token whose arrival raises MisplacedWazzup
+        self.size = LOOKAHEAD + 1
+        self.ring = [self.pull() for _ in range(self.size)]
+        self.head = 0
+        self.position = 0     # index of the current token in the whole stream
+        self.current = self.ring[0]
+
+    def pull(self):
+        """Next token from the iterator, None past the end"""
+        token = next(self.source, None)
+        if token is not None:
+            if self.record is not None:
+                self.record.append(token)
+            if token == self.watch:
+                raise MisplacedWazzup()
+        return token
+
+    def advance(self):
+        """Move the window one token forward"""
+        self.ring[self.head] = self.pull()
+        self.head = (self.head + 1) % self.size
+        self.position += 1
+        self.current = self.ring[self.head]
+
+    def peek(self, offset):
+        """Token `offset` places after the current one"""
+        if not 0 <= offset <= LOOKAHEAD:
+            raise ValueError(f"peek({offset}) is outside the parser's lookahead of {LOOKAHEAD} tokens")
+        return self.ring[(self.head + offset) % self.size]
+
+    def pull_through_line(self, line):
+        """Pull tokens up to the first one after `line`, leaving the window behind"""
+        while True:
+            token = self.pull()
+            if token is None or token[3] > line:
+                return
+
+    def drain(self):
+        """Pull whatever the parser left, so `record` holds every token"""
+        while self.pull() is not None:
+            pass
+
 class Parser:
     """
     Pushdown Automaton (PDA) inspired parser for LOLCODE
@@ -157,7 +268,8 @@ class Parser:
     def parse(self):
         """================ parse ================"""
 
-        if not self.tokens:
+        first = self.current_token()
+        if first is None:
             self.add_error(0, "No tokens to parse - empty program")
             return False
 
@@ -173,30 +285,17 @@ class Parser:
 
         # if WAZZUP exists but not right after HAI, report error at current token line
         ct = self.current_token()
-        if ct and ct[1] != 'WAZZUP' and ('Variable List Delimiter', 'WAZZUP', 'KEYWORD', 5) in self.tokens:
+        if ct and ct[1] != 'WAZZUP' and self.wazzup_ahead():
             line = ct[3] if len(ct) > 3 else 0
             self.add_error(line, "Variable declaration block should be right after the HAI")
             return False
 
         while self.current_token() and self.current_token()[1] != 'KTHXBYE':
-            token = self.current_token()
-
-            if token[1] == 'WAZZUP':
-                self.parse_variable_list()
-
-            elif token[1] == 'HOW IZ I':
-                self.parse_function()
-
-            elif token[1] == 'I HAS A':
-                line = token[3] if len(token) > 3 else 0
-                self.add_error(line, "I HAS A variable declaration must be inside the WAZZUP block")
+            if not self.parse_top_level():
                 return False
 
-            else:
-                self.parse_statement()
-
         if not self.parse_program_end():
-            first_line = self.tokens[0][3] if self.tokens and len(self.tokens[0]) > 3 else 0
+            first_line = first[3] if len(first) > 3 else 0
             self.add_error(first_line, "Missing closing argument 'KTHXBYE' for opening argument 'HAI'")
             return False
 
@@ -216,6 +315,41 @@ class Parser:
 
         return len(self.errors) == 0
 
+    def parse_top_level(self):
+        """
+        Parse one WAZZUP section, function or statement of the program
+        body. Returns False when the whole parse has to stop.
+        """
+        token = self.current_token()
+
+        if token[1] == 'WAZZUP':
+            self.parse_variable_list()
+
+        elif token[1] == 'HOW IZ I':
+            self.parse_function()
+
+        elif token[1] == 'I HAS A':
+            line = token[3] if len(token) > 3 else 0
+            self.add_error(line, "I HAS A variable declaration must be inside the WAZZUP block")
+            return False
+
+        else:
+            self.parse_statement()
+
+        return True
+
+    def wazzup_ahead(self):
+        """
+        Whether MISPLACED_WAZZUP comes later in the program. Tokens are in
+        line order, so the scan stops after its line.
+        """
+        pos = self.position
+        while pos < len(self.tokens) and self.tokens[pos][3] <= MISPLACED_WAZZUP[3]:
+            if self.tokens[pos] == MISPLACED_WAZZUP:
+                return True
+            pos += 1
+        return False
+
     def parse_program_start(self):
         """================ parse_program_start ================"""
         token = self.consume('HAI')
@@ -302,7 +436,142 @@ class Parser:
         return True
 
     def parse_expression(self, var_token=None):
-        token = self.current_token()
+        """
+        Parse the expression starting here and return (text, data_type), or
+        (None, None) after reporting what is wrong with it. Operators wait
+        for their operands on an explicit stack of frames instead of the
+        Python stack, and their text is written once into `pieces`, so a
+        deeply nested expression costs neither recursion nor recopying the
+        text of every level.
+        """
+        frames = []  # [operator, operator token, first piece, operands so far, first operand's type]
+        pieces = []
+        while True:
+            # ----------------- Descend to the next operand -----------------
+            token = self.current_token()
+            if token and token[1] in EXPRESSION_OPERATORS:
+                self.consume()
+                op = token[1]
+                if op == 'NOT':
+                    opening = "(NOT "
+                elif op in BOOLEAN_OPERATORS:
+                    opening = f"({op} "
+                else:
+                    opening = "("
+                frames.append([op, token, len(pieces), 0, None])
+                pieces.append(opening)
+                continue
+
+            value, data_type = self.parse_operand(token, var_token if not frames else None)
+
+            # ----------------- Hand the operand to the waiting operators -----------------
+            while frames:
+                frame = frames[-1]
+                op, op_token, first_piece, count, left_type = frame
+                ln = op_token[3] if len(op_token) > 3 else 0
+                error = None
+                more = False
+
+                if op in MATH_OPERATORS or op in COMPARISON_OPERATORS:
+                    if count == 0:
+                        self.append_piece(pieces, value)
+                        frame[4] = data_type
+                        if not self.current_token() or self.current_token()[1] != 'AN':
+                            error = f"{op} requires AN keyword and second operand"
+                        else:
+                            self.consume('AN')
+                            if not self.current_token():
+                                error = f"{op} requires second operand after AN"
+                            else:
+                                pieces.append(f" {op} ")
+                                more = True
+                    elif value is None:
+                        error = f"{op} missing second operand"
+                    else:
+                        self.append_piece(pieces, value)
+                        pieces.append(")")
+                        if op in COMPARISON_OPERATORS:
+                            data_type = 'TROOF'
+                        else:
+                            data_type = 'NUMBAR' if (left_type == 'NUMBAR' or data_type == 'NUMBAR') else 'NUMBR'
+
+                elif op == 'NOT':
+                    if value is None:
+                        error = "NOT requires one operand"
+                    else:
+                        self.append_piece(pieces, value)
+                        pieces.append(")")
+                        data_type = 'TROOF'
+
+                elif op in ['ALL OF', 'ANY OF']:
+                    if value is None:
+                        if count == 0:
+                            error = f"{op} requires operands"
+                        elif count == 1:
+                            error = f"{op} requires second operand"
+                        else:
+                            error = f"{op} missing operand after AN"
+                    else:
+                        self.append_piece(pieces, value)
+                        tok = self.current_token()
+                        if count == 0:
+                            # ---- Expect AN before the second operand ----
+                            if not tok or tok[1] != 'AN':
+                                error = f"{op} requires AN between operands"
+                            else:
+                                self.consume('AN')
+                                more = True
+                        elif tok and tok[1] == 'MKAY':
+                            # ---- Keep parsing AN <expr> until MKAY ----
+                            self.consume('MKAY')
+                            pieces.append(")")
+                            data_type = 'TROOF'
+                        elif not tok or tok[1] != 'AN':
+                            error = f"{op} expects AN or MKAY"
+                        else:
+                            self.consume('AN')
+                            more = True
+                        if more:
+                            pieces.append(" ")
+
+                else:
+                    # ---- Binary Boolean Ops: BOTH OF, EITHER OF, WON OF ----
+                    if count == 0:
+                        self.append_piece(pieces, value)
+                        if not self.current_token() or self.current_token()[1] != 'AN':
+                            error = f"{op} requires AN keyword and second operand"
+                        else:
+                            self.consume('AN')
+                            if not self.current_token():
+                                error = f"{op} missing second operand"
+                            else:
+                                pieces.append(" ")
+                                more = True
+                    elif value is None:
+                        error = f"{op} missing second operand"
+                    else:
+                        self.append_piece(pieces, value)
+                        pieces.append(")")
+                        data_type = 'TROOF'
+
+                if more:
+                    frame[3] = count + 1
+                    break
+
+                frames.pop()
+                if error is not None:
+                    self.add_error(ln, error)
+                    del pieces[first_piece:]
+                    value, data_type = None, None
+                else:
+                    value = PIECES
+            else:
+                if value is PIECES:
+                    return ("".join(pieces), data_type)
+                return (value, data_type)
+
+    def parse_operand(self, token, var_token=None):
+        """A literal, variable or SMOOSH operand of parse_expression as (value, data_type)"""
         if not token:
             return (None, None)
 
@@ -335,172 +604,19 @@ class Parser:
             self.consume()
             return (value, data_type)
 
-        elif token[1] == 'IT':
-            value = -1
-            data_type = None
-        # ===== Math Ops =====
-        elif token[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF']:
-            op = token[1]
-            op_token = token
-            self.consume()
-            left, left_type = self.parse_expression()
-
-            if not self.current_token() or self.current_token()[1] != 'AN':
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} requires AN keyword and second operand")
-                return (None, None)
-
-            self.consume('AN')
-
-            if not self.current_token():
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} requires second operand after AN")
-                return (None, None)
-
-            right, right_type = self.parse_expression()
-
-            if right is None:
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} missing second operand")
-                return (None, None)
-
-            result_type = 'NUMBAR' if (left_type == 'NUMBAR' or right_type == 'NUMBAR') else 'NUMBR'
-            return (f"({left} {op} {right})", result_type)
-
-        # ===== Boolean Ops (fixed) =====
-
-        elif token[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
-            op = token[1]
-            op_token = token
-            self.consume()
-
-            #
-            # ==== Special Case: NOT ====
-            #
-            if op == 'NOT':
-                left, _ = self.parse_expression()
-                if left is None:
-                    ln = op_token[3] if len(op_token) > 3 else 0
-                    self.add_error(ln, "NOT requires one operand")
-                    return (None, None)
-                return (f"(NOT {left})", 'TROOF')
-
-            #
-            # ===== Variadic Boolean Ops: ALL OF / ANY OF =====
-            #
-            if op in ['ALL OF', 'ANY OF']:
-                operands = []
-
-                # ---- Parse first operand ----
-                left, _ = self.parse_expression()
-                if left is None:
-                    ln = op_token[3] if len(op_token) > 3 else 0
-                    self.add_error(ln, f"{op} requires operands")
-                    return (None, None)
-                operands.append(left)
-
-                # ---- Expect AN next ----
-                if not self.current_token() or self.current_token()[1] != 'AN':
-                    ln = op_token[3] if len(op_token) > 3 else 0
-                    self.add_error(ln, f"{op} requires AN between operands")
-                    return (None, None)
-                self.consume('AN')
-
-                # ---- Parse second operand ----
-                right, _ = self.parse_expression()
-                if right is None:
-                    ln = op_token[3] if len(op_token) > 3 else 0
-                    self.add_error(ln, f"{op} requires second operand")
-                    return (None, None)
-                operands.append(right)
-
-                # ---- Keep parsing AN <expr> until MKAY ----
-                while True:
-                    tok = self.current_token()
-                    if tok and tok[1] == 'MKAY':
-                        self.consume('MKAY')
-                        break
-
-                    if not tok or tok[1] != 'AN':
-                        ln = op_token[3] if len(op_token) > 3 else 0
-                        self.add_error(ln, f"{op} expects AN or MKAY")
-                        return (None, None)
-
-                    self.consume('AN')
-
-                    nxt, _ = self.parse_expression()
-                    if nxt is None:
-                        ln = op_token[3] if len(op_token) > 3 else 0
-                        self.add_error(ln, f"{op} missing operand after AN")
-                        return (None, None)
-
-                    operands.append(nxt)
-
-                # Build final expression
-                expr = f"({op} " + " ".join(operands) + ")"
-                return (expr, 'TROOF')
-
-            #
-            # ===== Binary Boolean Ops: BOTH OF, EITHER OF, WON OF =====
-            #
-            left, _ = self.parse_expression()
-
-            # require AN
-            if not self.current_token() or self.current_token()[1] != 'AN':
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} requires AN keyword and second operand")
-                return (None, None)
-
-            self.consume('AN')
-
-            if not self.current_token():
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} missing second operand")
-                return (None, None)
-
-            right, _ = self.parse_expression()
-
-            if right is None:
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} missing second operand")
-                return (None, None)
-
-            return (f"({op} {left} {right})", 'TROOF')
-
-        # ===== Comparison Ops =====
-        elif token[1] in ['BOTH SAEM', 'DIFFRINT', 'BIGGR OF', 'SMALLR OF']:
-            op = token[1]
-            op_token = token
-            self.consume()
-            left, _ = self.parse_expression()
-
-            if not self.current_token() or self.current_token()[1] != 'AN':
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} requires AN keyword and second operand")
-                return (None, None)
-
-            self.consume('AN')
-
-            if not self.current_token():
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} requires second operand after AN")
-                return (None, None)
-
-            right, _ = self.parse_expression()
-
-            if right is None:
-                ln = op_token[3] if len(op_token) > 3 else 0
-                self.add_error(ln, f"{op} missing second operand")
-                return (None, None)
-
-            return (f"({left} {op} {right})", 'TROOF')
-
         # ===== SMOOSH =====
-        elif token[1] == 'SMOOSH':
+        if token[1] == 'SMOOSH':
             return self.parse_concat()
 
+        # IT and anything else is not an operand here
         return (None, None)
 
+    @staticmethod
+    def append_piece(pieces, value):
+        """Write an operand into parse_expression's text; operators already wrote theirs"""
+        if value is not PIECES:
+            pieces.append(f"{value}")
+
     def parse_statement(self):
         """================ parse_statement ================"""
         token = self.current_token()
@@ -586,7 +702,11 @@ class Parser:
 
         while self.current_token() and self.current_token()[2] != 'NEWLINE' :
             # Check if there's an expression after '+'
+            start = self.position
             expr, expr_type = self.parse_expression()
+            if self.position == start:
+                # Nothing parseable here; let the end-of-statement check report it
+                break
             expressions.append((expr, expr_type))
 
 
@@ -1140,53 +1260,124 @@ class Parser:
 
     def store_function_bodies(self):
         """
-        Scan through all tokens and store complete function definitions.
-        Stores tokens from 'HOW IZ I' to 'IF U SAY SO' (inclusive) for each function.
+        Record each function definition, from 'HOW IZ I' to 'IF U SAY SO'
+        (inclusive), in self.function_bodies as a TokenRange over
+        self.tokens, so no body is copied.
         Key: function name
-        Value: list of tokens for that function
         """
+        self.function_bodies = {}
         pos = 0
-        
         while pos < len(self.tokens):
-            token = self.tokens[pos]
-            
-            # Check if we found a function definition
-            if token[1] == 'HOW IZ I':
-                # Get function name (next token after HOW IZ I)
-                if pos + 1 < len(self.tokens):
-                    func_name = self.tokens[pos + 1][1]
-                    
-                    # Find the end of this function (IF U SAY SO)
-                    start_pos = pos
-                    end_pos = pos
-                    
-                    # Search for IF U SAY SO
-                    while end_pos < len(self.tokens):
-                        if self.tokens[end_pos][1] == 'IF U SAY SO':
-                            # Include IF U SAY SO in the stored tokens
-                            end_pos += 1
-                            break
-                        end_pos += 1
-                    
-                    # Store the complete function (from HOW IZ I to IF U SAY SO inclusive)
-                    self.function_bodies[func_name] = self.tokens[start_pos:end_pos]
-                    
-                    print(f"Stored function '{func_name}' with {len(self.function_bodies[func_name])} tokens")
-                    
-                    # Move position past this function
-                    pos = end_pos
-                    continue
-            
+            if self.tokens[pos][1] == 'HOW IZ I' and pos + 1 < len(self.tokens):
+                func_name = self.tokens[pos + 1][1]
+                end_pos = pos
+                while end_pos < len(self.tokens):
+                    end_pos += 1
+                    if self.tokens[end_pos - 1][1] == 'IF U SAY SO':
+                        break
+                self.function_bodies[func_name] = TokenRange(self.tokens, pos, end_pos)
+                pos = end_pos
+                continue
             pos += 1
-        
-        print(f"\nTotal functions stored: {len(self.function_bodies)}")
-        print(f"Function names: {list(self.function_bodies.keys())}")
 
 
-def parse_lolcode(tokens):
-    """================ parse_lolcode ================"""
-    parser = Parser(tokens)
-    success = parser.parse()
+class StreamParser(Parser):
+    """
+    Parser over a TokenStream instead of a token list. Only the current
+    token and LOOKAHEAD more are held, so with a lexer generator as the
+    source the parser's memory follows nesting depth and the number of
+    names, not the length of the file.
+    """
+
+    def __init__(self, tokens, record=None):
+        """================ __init__ ================"""
+        self.stream = TokenStream(tokens, record)
+        super().__init__(self.stream)
+        self.checkpoint = None
+
+    @property
+    def position(self):
+        """================ position ================"""
+        return self.stream.position
+
+    @position.setter
+    def position(self, value):
+        if value < self.stream.position:
+            raise ValueError("a token stream cannot move backwards")
+        while self.stream.position < value:
+            self.stream.advance()
+
+    def current_token(self):
+        """================ current_token ================"""
+        return self.stream.current
+
+    def consume(self, expected_token=None):
+        """================ consume ================"""
+        token = self.stream.current
+        if token is None:
+            return None
+
+        if expected_token and token[1] != expected_token:
+            line = token[3] if len(token) > 3 else 0
+            self.add_error(line, f"Expected '{expected_token}', got '{token[1]}'")
+            return None
+
+        self.stream.advance()
+        return token
+
+    def peek(self, offset=1):
+        """================ peek ================"""
+        return self.stream.peek(offset)
+
+    def wazzup_ahead(self):
+        """
+        Tokens past the lookahead have not been lexed yet, so instead of
+        scanning for MISPLACED_WAZZUP the stream watches for it and parse()
+        unwinds to this point when it shows up.
+        """
+        if MISPLACED_WAZZUP in [self.peek(offset) for offset in range(1, LOOKAHEAD + 1)]:
+            return True
+        self.checkpoint = (self.current_token()[3], len(self.errors), list(self.stack))
+        self.stream.watch = MISPLACED_WAZZUP
+        return False
+
+    def parse(self):
+        """================ parse ================"""
+        try:
+            success = super().parse()
+            if self.stream.watch is not None:
+                # Stopped before the watched line: look on as far as the scan would have
+                self.stream.pull_through_line(MISPLACED_WAZZUP[3])
+            return success
+        except MisplacedWazzup:
+            # Only HAI had been parsed at the checkpoint, so nothing had been declared yet
+            line, error_count, stack = self.checkpoint
+            del self.errors[error_count:]
+            self.stack = stack
+            self.variables = {}
+            self.symbol_table = {}
+            self.function_line = []
+            self.scope_stack = [{}]
+            self.current_function_params = []
+            self.function_scopes = {}
+            self.add_error(line, "Variable declaration block should be right after the HAI")
+            return False
+        finally:
+            self.stream.watch = None
+
+
+def parse_lolcode(tokens, record=None):
+    """
+    Parse a token list or any token iterator (such as Lexer.iter_tokens)
+    in one forward pass. Pass a list as `record` to keep the tokens the
+    parser pulled.
+    """
+    parser = StreamParser(tokens, record)
+    return parse_result(parser, parser.parse())
+
+
+def parse_result(parser, success):
+    """parse_lolcode's result for a parser that has run"""
     symbol_table = parser.adjust_dictionary()
     parser_errors = parser.errors
     function_dictionary = {}
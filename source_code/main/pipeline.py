@@ -0,0 +1,96 @@
+"""
+LOLCODE Pipeline
+Runs lexing, parsing, semantic analysis and execution in order, stopping at
+the first stage that reports errors. Shared by the CLI and by embedders.
+Unless the phases are being measured, lexing and parsing run as one pass.
+A unit cache (see unitcache.py) makes the front end incremental.
+"""
+from lexer import Lexer
+from parser import parse_lolcode
+from semantic import analyze_lolcode
+from execute import execute_lolcode
+from instrument import measure, count_statements
+
+
+def run_pipeline(text, stats=None, execute=True, gui_input=False, instruments=(), unit_cache=None):
+    """
+    Run a program's source text. Pass an instrument.PipelineStats as `stats`
+    to record each phase; `instruments` are attached to the executor (see
+    execute_lolcode). With a unitcache.UnitCache as `unit_cache`, the front
+    end only reprocesses the functions and regions the cache does not have.
+    Returns (failed_stage, errors, tokens, symbol_table, function_dictionary)
+    where failed_stage is None on success, or one of "Lexer", "Parser",
+    "Semantic" and "Execution".
+    """
+    if unit_cache is not None:
+        from unitcache import compile_units
+
+        result = compile_units(text, unit_cache, stats)
+        if result[0] is not None or not execute:
+            return result
+        return run_execution(*result[2:], stats, gui_input, instruments)
+
+    if stats is None:
+        # ----------------- Tokenization and parsing, fused -----------------
+        # The parser pulls tokens from the lexer as it goes and `tokens`
+        # keeps them for the later phases
+        lexer = Lexer()
+        tokens = []
+        statements = 0
+        source = lexer.iter_tokens(text)
+        try:
+            success, parser, symbol_table, function_dictionary, parse_errors = parse_lolcode(source, tokens)
+        except Exception:
+            # A lexer error can cut a construct short enough to crash the
+            # parser; lexing on to the end reports it as the lexer stage would
+            tokens.extend(source)
+            if lexer.errors:
+                return "Lexer", lexer.errors, tokens, {}, {}
+            raise
+        tokens.extend(source)
+        if lexer.errors:
+            return "Lexer", lexer.errors, tokens, {}, {}
+    else:
+        # ----------------- Tokenization -----------------
+        # Measured phases run one after the other so each gets its own numbers
+        with measure(stats, "lex") as phase:
+            lexer = Lexer()
+            tokens = lexer.tokenize(text)
+            phase.tokens = len(tokens)
+        # Source statements, shared by the static phases
+        statements = count_statements(tokens)
+        phase.statements = statements
+        if lexer.errors:
+            return "Lexer", lexer.errors, tokens, {}, {}
+
+        # ----------------- Parsing -----------------
+        with measure(stats, "parse") as phase:
+            success, parser, symbol_table, function_dictionary, parse_errors = parse_lolcode(tokens)
+            phase.tokens = len(tokens)
+            phase.statements = statements
+    if not success:
+        return "Parser", parse_errors, tokens, symbol_table, function_dictionary
+
+    # ----------------- Semantic Analysis -----------------
+    with measure(stats, "semantic") as phase:
+        semantic_success, semantic_errors = analyze_lolcode(tokens, symbol_table, function_dictionary)
+        phase.tokens = len(tokens)
+        phase.statements = statements
+    if not semantic_success:
+        return "Semantic", semantic_errors, tokens, symbol_table, function_dictionary
+
+    if not execute:
+        return None, [], tokens, symbol_table, function_dictionary
+
+    return run_execution(tokens, symbol_table, function_dictionary, stats, gui_input, instruments)
+
+
+def run_execution(tokens, symbol_table, function_dictionary, stats, gui_input, instruments):
+    """The execution stage of run_pipeline"""
+    with measure(stats, "execute") as phase:
+        symbol_table, function_dictionary, errors = execute_lolcode(
+            tokens, symbol_table, function_dictionary, gui_input, phase, instruments)
+    if errors:
+        return "Execution", errors, tokens, symbol_table, function_dictionary
+
+    return None, [], tokens, symbol_table, function_dictionary
@@ -0,0 +1,272 @@
+"""
+LOLCODE Profilers
+LineProfiler is deterministic: attach() shadows execute_statement,
+execute_function and execute_loop on one executor instance with timed
+wrappers, so an executor that is not being profiled runs the plain class
+methods and pays nothing. It records per source line, per HOW IZ I function
+and per loop label:
+    count       times entered
+    cumulative  time from entry to exit (outermost activation only, so
+                recursion is not counted twice)
+    self        cumulative time minus the time of nested lines, calls and loops
+
+SamplingProfiler is statistical: a timer periodically reads the executor's
+current_line and call_stack fields, so its cost depends on the sampling rate
+rather than on how many statements run.
+"""
+import signal
+import threading
+import time
+
+
+class ProfileEntry:
+    """Counters for one line, function or loop"""
+
+    def __init__(self):
+        """================ __init__ ================"""
+        self.count = 0
+        self.cumulative = 0.0
+        self.self_time = 0.0
+
+
+class LineProfiler:
+    """Per-line, per-function and per-loop timings for an Execute run"""
+
+    def __init__(self):
+        """================ __init__ ================"""
+        self.lines = {}        # line number -> ProfileEntry
+        self.functions = {}    # function name -> ProfileEntry
+        self.loops = {}        # loop label -> ProfileEntry
+        self.stacks = {}       # (frame, ...) -> self time, for collapsed-stack output
+        self.frames = ["main"]
+        self.child_times = [0.0]
+        self.active = {}       # (table id, key) -> nesting depth, for recursion
+
+    # ----------------- Attaching -----------------
+    def attach(self, executor):
+        """Profile every statement, call and loop run by `executor`"""
+        statement = executor.execute_statement
+        function = executor.execute_function
+        loop = executor.execute_loop
+
+        def execute_statement():
+            token = executor.current_token()
+            if token[2] == 'NEWLINE':
+                return (yield from statement())
+            line = token[3]
+            return (yield from self.timed(self.lines, line, f"line {line}", statement))
+
+        def execute_function():
+            name = self.call_name(executor)
+            return (yield from self.timed(self.functions, name, f"HOW IZ I {name}", function))
+
+        def execute_loop():
+            label = self.loop_label(executor)
+            return (yield from self.timed(self.loops, label, f"IM IN YR {label}", loop))
+
+        executor.execute_statement = execute_statement
+        executor.execute_function = execute_function
+        executor.execute_loop = execute_loop
+
+    def detach(self, executor):
+        """Restore the executor's plain methods"""
+        for name in ('execute_statement', 'execute_function', 'execute_loop'):
+            executor.__dict__.pop(name, None)
+
+    @staticmethod
+    def call_name(executor):
+        """Function name of the I IZ call at the executor's position"""
+        offset = 2 if executor.current_token()[1] == 'I' else 1
+        return executor.peek(offset)[1]
+
+    @staticmethod
+    def loop_label(executor):
+        """Label of the IM IN YR loop at the executor's position"""
+        offset = 1 if executor.current_token()[1] == 'IM IN YR' else 3
+        return executor.peek(offset)[1]
+
+    # ----------------- Recording -----------------
+    def timed(self, table, key, frame, run):
+        """
+        Run the generator method `run` as one activation of table[key]. In a
+        resumable run, time spent paused at GIMMEH counts towards the line.
+        """
+        active_key = (id(table), key)
+        depth = self.active.get(active_key, 0)
+        self.active[active_key] = depth + 1
+        self.frames.append(frame)
+        self.child_times.append(0.0)
+
+        start = time.perf_counter()
+        try:
+            return (yield from run())
+        finally:
+            elapsed = time.perf_counter() - start
+            self_time = elapsed - self.child_times.pop()
+            self.child_times[-1] += elapsed
+
+            stack = tuple(self.frames)
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + self_time
+            self.frames.pop()
+            self.active[active_key] = depth
+
+            entry = table.get(key)
+            if entry is None:
+                entry = table[key] = ProfileEntry()
+            entry.count += 1
+            entry.self_time += self_time
+            if depth == 0:
+                entry.cumulative += elapsed
+
+    # ----------------- Output -----------------
+    def total_time(self):
+        """Profiled time across all top-level frames"""
+        return self.child_times[0]
+
+    def report(self, source=None, limit=20):
+        """
+        Text report: hottest lines by self time, then functions and loops by
+        cumulative time. Pass the program text as `source` to show each line.
+        """
+        source_lines = source.splitlines() if source is not None else []
+        total = self.total_time() or 1.0
+        header = f"{'count':>8} {'cum ms':>10} {'self ms':>10} {'self %':>7}  "
+        out = [f"Total profiled time: {self.total_time() * 1000:.3f} ms", ""]
+
+        out.append(header + "line")
+        ranked = sorted(self.lines.items(), key=lambda item: item[1].self_time, reverse=True)
+        for line, entry in ranked[:limit]:
+            text = source_lines[line - 1].strip() if 0 < line <= len(source_lines) else ""
+            out.append(self.format_entry(entry, total) + f"{line:>5}  {text}")
+
+        for title, table in (("function", self.functions), ("loop", self.loops)):
+            if not table:
+                continue
+            out.append("")
+            out.append(header + title)
+            ranked = sorted(table.items(), key=lambda item: item[1].cumulative, reverse=True)
+            for key, entry in ranked[:limit]:
+                out.append(self.format_entry(entry, total) + str(key))
+        return "\n".join(out)
+
+    @staticmethod
+    def format_entry(entry, total):
+        """================ format_entry ================"""
+        return (f"{entry.count:>8} {entry.cumulative * 1000:>10.3f} {entry.self_time * 1000:>10.3f} "
+                f"{entry.self_time / total * 100:>6.1f}%  ")
+
+    def collapsed_stacks(self):
+        """Lines of 'frame;frame;frame microseconds' as read by flamegraph tools"""
+        out = []
+        for stack, self_time in self.stacks.items():
+            weight = round(self_time * 1_000_000)
+            if weight > 0:
+                out.append(";".join(stack) + f" {weight}")
+        return out
+
+    def write_collapsed(self, path):
+        """================ write_collapsed ================"""
+        with open(path, 'w') as file:
+            for line in self.collapsed_stacks():
+                file.write(line + "\n")
+
+
+class SamplingProfiler:
+    """
+    Samples (call stack, line) of a running executor. Uses a SIGPROF timer
+    (process CPU time) when started from the main thread of a Unix process,
+    otherwise a background thread that samples every `interval` seconds of
+    wall time. The thread can only sample when it gets the GIL, so its
+    effective rate is also bounded by sys.getswitchinterval().
+    """
+
+    def __init__(self, interval=0.001):
+        """================ __init__ ================"""
+        self.interval = interval
+        self.samples = {}      # (function, ..., line) -> sample count
+        self.executor = None
+        self.mode = None       # "signal" or "thread" while running
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.old_handler = None
+
+    # ----------------- Attaching -----------------
+    def attach(self, executor):
+        """Start sampling `executor`"""
+        self.executor = executor
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self.mode = "signal"
+            self.old_handler = signal.signal(signal.SIGPROF, self.on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self.mode = "thread"
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run_thread, daemon=True)
+            self.thread.start()
+
+    def detach(self, executor):
+        """Stop sampling"""
+        if self.mode == "signal":
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.old_handler)
+        elif self.mode == "thread":
+            self.stop_event.set()
+            self.thread.join()
+        self.mode = None
+        self.executor = None
+
+    # ----------------- Sampling -----------------
+    def on_signal(self, signum, frame):
+        """================ on_signal ================"""
+        self.take_sample()
+
+    def run_thread(self):
+        """================ run_thread ================"""
+        while not self.stop_event.wait(self.interval):
+            self.take_sample()
+
+    def take_sample(self):
+        """Record the executor's current (call stack, line)"""
+        executor = self.executor
+        if executor is None:
+            return
+        key = (*executor.call_stack, executor.current_line)
+        self.samples[key] = self.samples.get(key, 0) + 1
+
+    # ----------------- Output -----------------
+    def total_samples(self):
+        """================ total_samples ================"""
+        return sum(self.samples.values())
+
+    def hot_lines(self):
+        """{line: sample count}"""
+        lines = {}
+        for key, count in self.samples.items():
+            lines[key[-1]] = lines.get(key[-1], 0) + count
+        return lines
+
+    def report(self, source=None, limit=20):
+        """Hottest lines by sample count; pass the program text as `source` to show each line"""
+        source_lines = source.splitlines() if source is not None else []
+        total = self.total_samples()
+        out = [f"Samples: {total} ({self.interval * 1000:g} ms interval)", "",
+               f"{'samples':>8} {'%':>7}  line"]
+        ranked = sorted(self.hot_lines().items(), key=lambda item: item[1], reverse=True)
+        for line, count in ranked[:limit]:
+            text = source_lines[line - 1].strip() if 0 < line <= len(source_lines) else ""
+            out.append(f"{count:>8} {count / total * 100:>6.1f}%  {line:>5}  {text}")
+        return "\n".join(out)
+
+    def collapsed_stacks(self):
+        """Lines of 'main;HOW IZ I f;line N samples' as read by flamegraph tools"""
+        out = []
+        for key, count in self.samples.items():
+            frames = ["main"] + [f"HOW IZ I {name}" for name in key[:-1]] + [f"line {key[-1]}"]
+            out.append(";".join(frames) + f" {count}")
+        return out
+
+    def write_collapsed(self, path):
+        """================ write_collapsed ================"""
+        with open(path, 'w') as file:
+            for line in self.collapsed_stacks():
+                file.write(line + "\n")
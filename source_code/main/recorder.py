@@ -0,0 +1,270 @@
+"""
+LOLCODE Execution Trace Recorder
+Records the last N statements of a run in a fixed-size binary ring buffer
+so a failed production run can be inspected without rerunning it.
+
+Each step is one 16-byte record (struct '<IBBHd'):
+    line        source line of the statement
+    kind        statement kind, see STATEMENT_KINDS
+    value type  type of the variable the statement wrote, see VALUE_TYPES
+    slot        that variable's slot in the executor (IT_SLOT for IT,
+                NO_SLOT when nothing was written)
+    value       NUMBR/NUMBAR as a double, TROOF as 1/0, YARN as its length
+
+A YARN's first YARN_PREFIX bytes go to a second ring at the same index as
+its record, so both are overwritten together and memory stays fixed
+however long the strings get.
+
+The recorder attaches to an executor like the profilers and hooks do, by
+shadowing execute_statement on that instance. The trace is written with
+dump() on request, and automatically to `dump_path` when a statement raises.
+Steps are recorded as statements finish, so a loop or block line follows the
+statements of its body.
+"""
+import json
+import struct
+
+from slots import UNDECLARED
+
+RECORD = struct.Struct('<IBBHd')
+RECORD_SIZE = RECORD.size
+HEADER = struct.Struct('<4sHII')
+MAGIC = b'LOLT'
+VERSION = 2
+
+# UTF-8 bytes kept of each YARN value, with their count in front
+YARN_PREFIX = 31
+YARN = struct.Struct(f'<B{YARN_PREFIX}s')
+
+# Default number of steps kept
+TRACE_CAPACITY = 65536
+
+# Slot value for statements that do not write a variable
+NO_SLOT = 0xFFFF
+# Slot value for IT, which has no slot in the executor
+IT_SLOT = 0xFFFE
+
+STATEMENT_KINDS = ['OTHER', 'VISIBLE', 'ASSIGN', 'DECLARE', 'RECAST', 'MAEK', 'GIMMEH',
+                   'O RLY?', 'WTF?', 'LOOP', 'FUNCTION', 'CALL', 'EXPRESSION']
+VALUE_TYPES = ['NONE', 'NOOB', 'NUMBR', 'NUMBAR', 'YARN', 'TROOF']
+
+# Kind codes of keyword-led statements
+KEYWORD_KINDS = {
+    'VISIBLE': 1, 'I HAS A': 3, 'MAEK': 5, 'GIMMEH': 6, 'O RLY?': 7, 'WTF?': 8,
+    'IM IN YR': 9, 'HOW IZ I': 10, 'I IZ': 11,
+    'SUM OF': 12, 'DIFF OF': 12, 'PRODUKT OF': 12, 'QUOSHUNT OF': 12, 'MOD OF': 12,
+    'BIGGR OF': 12, 'SMALLR OF': 12, 'BOTH OF': 12, 'EITHER OF': 12, 'WON OF': 12,
+    'NOT': 12, 'ALL OF': 12, 'ANY OF': 12, 'BOTH SAEM': 12, 'DIFFRINT': 12, 'SMOOSH': 12,
+}
+
+
+class TraceRecorder:
+    """Ring buffer of the most recent statements run by one executor"""
+
+    def __init__(self, capacity=TRACE_CAPACITY, dump_path=None):
+        """================ __init__ ================"""
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * RECORD.size)
+        self.yarns = bytearray(capacity * YARN.size)
+        self.count = 0           # records written so far (may exceed capacity)
+        self.slots = {}          # the executor's variable name -> slot
+        self.dump_path = dump_path
+        self.failed = False
+        self.plans = {}          # id(statement token) -> (kind, target, slot)
+
+    # ----------------- Attaching -----------------
+    def attach(self, executor):
+        """Record every statement run by `executor`"""
+        statement = executor.execute_statement
+        self.slots = executor.slots
+
+        plans = self.plans
+
+        def execute_statement():
+            token = executor.tokens[executor.position]
+            if token[2] == 'NEWLINE':
+                return (yield from statement())
+            # Statements are classified once; tokens live as long as the run
+            plan = plans.get(id(token))
+            if plan is None:
+                plan = plans[id(token)] = self.plan(executor, token)
+            try:
+                return (yield from statement())
+            except Exception:
+                if not self.failed:
+                    self.failed = True
+                    self.record(token[3], plan, executor)
+                    if self.dump_path:
+                        self.dump(self.dump_path)
+                raise
+            finally:
+                if not self.failed:
+                    self.record(token[3], plan, executor)
+
+        executor.execute_statement = execute_statement
+
+    def detach(self, executor):
+        """================ detach ================"""
+        executor.__dict__.pop('execute_statement', None)
+
+    def plan(self, executor, token):
+        """(kind code, target variable or None, its slot) for a statement token"""
+        kind, target = self.classify(executor, token)
+        if target is None:
+            return kind, None, NO_SLOT
+        if target == 'IT':
+            return kind, target, IT_SLOT
+        slot = executor.slots.get(target)
+        # Slots past the 16-bit field are not recorded
+        return kind, target, slot if slot is not None and slot < IT_SLOT else NO_SLOT
+
+    @staticmethod
+    def classify(executor, token):
+        """(kind code, name of the variable the statement writes or None)"""
+        kind = KEYWORD_KINDS.get(token[1])
+        if kind is not None:
+            if kind == 3 or kind == 6:
+                return kind, executor.peek()[1]
+            if kind == 12:
+                return kind, 'IT'
+            return kind, None
+        if token[2] == 'IDENTIFIER':
+            following = executor.peek()
+            following = following[1] if following else None
+            if following == 'R':
+                after = executor.peek(2)
+                return (5 if after and after[1] == 'MAEK' else 2), token[1]
+            if following == 'IS NOW A':
+                return 4, token[1]
+            return 12, 'IT'
+        return 0, None
+
+    # ----------------- Recording -----------------
+    def record(self, line, plan, executor):
+        """Append one step, overwriting the oldest when the buffer is full"""
+        kind, target, slot = plan
+        index = self.count % self.capacity
+        value_type = 0
+        value = 0.0
+        if slot == IT_SLOT:
+            value_type, value = self.encode(*self.it_value(executor), index)
+        elif slot != NO_SLOT:
+            value = executor.values[slot]
+            dtype = executor.dtypes[slot]
+            if dtype == 'NUMBR' and type(value) is int:
+                value_type = 2
+            else:
+                value_type, value = self.encode(None if value is UNDECLARED else value, dtype, index)
+
+        RECORD.pack_into(self.buffer, index * RECORD_SIZE, line, kind, value_type, slot, value)
+        self.count += 1
+
+    @staticmethod
+    def it_value(executor):
+        """(value, type) of IT after the statement ran"""
+        it_var = executor.it_var
+        if isinstance(it_var, list):
+            return (it_var[-1][0], it_var[-1][3]) if it_var else (None, None)
+        return it_var, None
+
+    def encode(self, value, dtype, index):
+        """(type code, double) for a value; a YARN's prefix is stored for record `index`"""
+        if dtype in ('NUMBR', 'NUMBAR'):
+            try:
+                return VALUE_TYPES.index(dtype), float(value)
+            except (TypeError, ValueError):
+                return VALUE_TYPES.index(dtype), float('nan')
+        if dtype == 'TROOF':
+            return 5, 1.0 if value == 'WIN' else 0.0
+        if dtype != 'YARN' and (value is None or dtype == 'NOOB'):
+            return 1, 0.0
+        # A YARN, or an untyped result
+        text = str(value)
+        prefix = text[:YARN_PREFIX].encode('utf-8')[:YARN_PREFIX]
+        YARN.pack_into(self.yarns, index * YARN.size, len(prefix), prefix)
+        return 4, float(len(text))
+
+    # ----------------- Dumping -----------------
+    def records(self, buffer=None, size=RECORD_SIZE):
+        """Raw records (or the entries of another ring such as `yarns`), oldest first"""
+        if buffer is None:
+            buffer = self.buffer
+        if self.count <= self.capacity:
+            return bytes(buffer[:self.count * size])
+        start = (self.count % self.capacity) * size
+        return bytes(buffer[start:] + buffer[:start])
+
+    def dump(self, path):
+        """Write the trace: header, records and YARN prefixes oldest first, then slot names as JSON"""
+        data = self.records()
+        yarns = self.records(self.yarns, YARN.size)
+        names = [None] * len(self.slots)
+        for name, slot in self.slots.items():
+            names[slot] = name
+        tables = json.dumps({"slots": names}).encode('utf-8')
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.count, len(data) // RECORD.size))
+            file.write(data)
+            file.write(yarns)
+            file.write(tables)
+
+
+# ================================================================
+# ======================= DECODER ================================
+# ================================================================
+def load_trace(path):
+    """Read a dump. Returns (total steps recorded, [(line, kind, slot name, type, value)])"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, total, kept = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a LOLCODE trace (version {VERSION})")
+
+    start = HEADER.size
+    end = start + kept * RECORD.size
+    yarns_end = end + kept * YARN.size
+    names = json.loads(data[yarns_end:].decode('utf-8'))["slots"]
+
+    steps = []
+    records = RECORD.iter_unpack(data[start:end])
+    for (line, kind, value_type, slot, value), (used, prefix) in zip(records, YARN.iter_unpack(data[end:yarns_end])):
+        if slot == IT_SLOT:
+            name = 'IT'
+        else:
+            name = names[slot] if slot != NO_SLOT else None
+        steps.append((line, STATEMENT_KINDS[kind], name, VALUE_TYPES[value_type],
+                      decode_value(value_type, value, prefix[:used])))
+    return total, steps
+
+
+def decode_value(value_type, value, prefix):
+    """Readable value of a record; `prefix` is the start of a YARN as stored"""
+    type_name = VALUE_TYPES[value_type]
+    if type_name == 'NUMBR':
+        return int(value) if value == value else 'NaN'
+    if type_name == 'NUMBAR':
+        return value
+    if type_name == 'TROOF':
+        return 'WIN' if value else 'FAIL'
+    if type_name == 'YARN':
+        # A multi-byte character cut at the end of the prefix is dropped
+        text = prefix.decode('utf-8', 'ignore')
+        length = int(value)
+        return repr(text) if len(text) == length else f"{text!r}... ({length} chars)"
+    if type_name == 'NOOB':
+        return 'NOOB'
+    return None
+
+
+def format_trace(path, last=20, source=None):
+    """Readable listing of the last `last` steps of a dump"""
+    total, steps = load_trace(path)
+    source_lines = source.splitlines() if source is not None else []
+    shown = steps[-last:] if last else steps
+    out = [f"{total} steps recorded, {len(steps)} kept, showing the last {len(shown)}"]
+    first = total - len(shown)
+    for number, (line, kind, name, type_name, value) in enumerate(shown, first + 1):
+        text = source_lines[line - 1].strip() if 0 < line <= len(source_lines) else ""
+        change = f"{name} = {value} ({type_name})" if name is not None else ""
+        out.append(f"{number:>8}  line {line:>5}  {kind:<11} {change:<32} {text}")
+    return "\n".join(out)
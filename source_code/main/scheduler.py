@@ -0,0 +1,266 @@
+"""
+LOLCODE Round-Robin Scheduler
+Interleaves many programs in one thread. Every script is a resumable
+interpreter.Session with a Quantum instrument that pauses it after
+`quantum` statements (loop and function bodies included), so one busy
+script cannot hold the scheduler.
+
+    scheduler = Scheduler(quantum=200, cpu_budget=1.0)
+    scheduler.add("a", program_a, stdin=["5"])
+    scheduler.add("b", program_b)             # no stdin: waits for feed()
+    scheduler.run()
+    print(scheduler.tasks["a"].stdout.getvalue(), scheduler.metrics())
+
+Each task gets its own stdout buffer and stdin queue; nothing touches
+sys.stdout or sys.stdin. A task whose stdin is a list gets EOF when the
+values run out; one created without stdin is blocked at GIMMEH until a value
+is fed in. CPU time is charged per slice with time.thread_time(), and a task
+that goes over its budget is stopped at the end of that slice. Switching is
+cooperative: a single statement that never finishes still holds the thread.
+"""
+import io
+import time
+from collections import deque
+
+from interpreter import compile_program
+
+DEFAULT_QUANTUM = 200       # statements per slice
+DEFAULT_CPU_BUDGET = 10.0   # CPU seconds per task
+
+# Task states
+READY, BLOCKED, DONE = "ready", "blocked", "done"
+
+
+class Quantum:
+    """Instrument that makes a resumable executor yield ('preempt', None) every `size` statements"""
+
+    def __init__(self, size):
+        """================ __init__ ================"""
+        self.size = size
+        self.remaining = size
+        self.statements = 0
+
+    def attach(self, executor):
+        """================ attach ================"""
+        statement = executor.execute_statement
+
+        def execute_statement():
+            if executor.tokens[executor.position][2] != 'NEWLINE':
+                self.statements += 1
+                self.remaining -= 1
+                if self.remaining < 0:
+                    yield ('preempt', None)
+            return (yield from statement())
+
+        executor.execute_statement = execute_statement
+
+    def detach(self, executor):
+        """================ detach ================"""
+        executor.__dict__.pop('execute_statement', None)
+
+
+class Task:
+    """One scheduled script with its own stdio and accounting"""
+
+    def __init__(self, name, program, stdin=None, cpu_budget=DEFAULT_CPU_BUDGET, quantum=DEFAULT_QUANTUM):
+        """================ __init__ ================"""
+        self.name = name
+        self.quantum = Quantum(quantum)
+        self.compiled = program.ok
+        self.session = program.start(instruments=[self.quantum])
+        self.stdout = io.StringIO()
+        self.stdin = deque(stdin or ())
+        self.stdin_closed = stdin is not None
+        self.cpu_budget = cpu_budget
+
+        self.state = READY
+        self.status = None        # "ok", "execution errors", "compile errors", "input exhausted", ...
+        self.result = None        # interpreter.RunResult once finished cleanly
+        self.errors = []
+        self.cpu = 0.0
+        self.slices = 0
+        self.max_gap = 0.0         # longest wall time spent ready but not running
+        self.ready_since = time.perf_counter()
+        self.finished_at = None
+
+    @property
+    def executor(self):
+        """The underlying Execute (tokens, position, symbol_table)"""
+        return self.session.executor
+
+    @property
+    def statements(self):
+        """================ statements ================"""
+        return self.quantum.statements
+
+    def feed(self, value):
+        """Queue a line of stdin; wakes the task if it is blocked on GIMMEH"""
+        self.stdin.append(str(value))
+        if self.state == BLOCKED:
+            self.state = READY
+            self.ready_since = time.perf_counter()
+
+    def close_stdin(self):
+        """Further GIMMEH without queued input ends the task with "input exhausted" """
+        self.stdin_closed = True
+        if self.state == BLOCKED:
+            self.state = READY
+            self.ready_since = time.perf_counter()
+
+
+class Scheduler:
+    """Runs Tasks round-robin, one quantum at a time"""
+
+    def __init__(self, quantum=DEFAULT_QUANTUM, cpu_budget=DEFAULT_CPU_BUDGET):
+        """================ __init__ ================"""
+        self.quantum = quantum
+        self.cpu_budget = cpu_budget
+        self.tasks = {}
+        self.run_queue = deque()
+        self.switches = 0
+        self.wall = 0.0
+        self.contended_cpu = None  # {name: CPU seconds} when the first preempted task finished
+
+    def add(self, name, program, stdin=None, cpu_budget=None):
+        """Schedule a CompiledProgram (or source text) under `name`; returns its Task"""
+        if isinstance(program, str):
+            program = compile_program(program)
+        task = Task(name, program, stdin, cpu_budget if cpu_budget is not None else self.cpu_budget,
+                    self.quantum)
+        self.tasks[name] = task
+        self.run_queue.append(task)
+        return task
+
+    # ----------------- Running -----------------
+    def run(self):
+        """
+        Run slices until every task is done or waiting for stdin. Returns
+        the number of tasks still not done; feed() them and run() again.
+        """
+        start = time.perf_counter()
+        while True:
+            if not self.run_queue:
+                self.run_queue.extend(task for task in self.tasks.values() if task.state == READY)
+                if not self.run_queue:
+                    break
+            task = self.run_queue.popleft()
+            if task.state != READY:
+                continue
+            self.run_slice(task)
+            if task.state == READY:
+                self.run_queue.append(task)
+        self.wall += time.perf_counter() - start
+        return sum(1 for task in self.tasks.values() if task.state != DONE)
+
+    def run_slice(self, task):
+        """Run `task` until its quantum ends, it blocks on input or it finishes"""
+        now = time.perf_counter()
+        task.max_gap = max(task.max_gap, now - task.ready_since)
+        task.slices += 1
+        task.quantum.remaining = task.quantum.size
+        self.switches += 1
+
+        cpu_start = time.thread_time()
+        try:
+            self.step(task)
+        finally:
+            task.cpu += time.thread_time() - cpu_start
+            task.ready_since = time.perf_counter()
+
+        if task.state == READY and task.cpu > task.cpu_budget:
+            self.finish(task, "cpu budget exceeded")
+            task.session.close()
+
+    def step(self, task):
+        """================ step ================"""
+        session = task.session
+        value = None
+        while True:
+            if session.waiting is not None:  # paused at GIMMEH
+                if task.stdin:
+                    value = task.stdin.popleft()
+                elif task.stdin_closed:
+                    session.close()
+                    self.finish(task, "input exhausted")
+                    return
+                else:
+                    task.state = BLOCKED
+                    return
+            try:
+                kind, payload = session.advance(value)
+            except Exception as error:
+                self.finish(task, f"crash: {type(error).__name__}", [str(error)])
+                return
+            value = None
+            if kind == 'output':
+                task.stdout.write(payload)
+            elif kind == 'preempt':
+                return
+            elif kind == 'done':
+                task.result = payload
+                if not task.compiled:
+                    status = "compile errors"
+                else:
+                    status = "execution errors" if payload.errors else "ok"
+                self.finish(task, status, payload.errors)
+                return
+
+    def finish(self, task, status, errors=()):
+        """================ finish ================"""
+        task.state = DONE
+        task.status = status
+        task.errors = list(errors)
+        task.finished_at = time.perf_counter()
+        # Fairness is judged once a task that had to share the CPU is done
+        if self.contended_cpu is None and task.slices > 1:
+            self.contended_cpu = {name: other.cpu for name, other in self.tasks.items()
+                                  if other.slices > 1 or other is task}
+
+    # ----------------- Metrics -----------------
+    def metrics(self):
+        """Aggregate throughput and fairness for everything run so far"""
+        tasks = list(self.tasks.values())
+        statements = sum(task.statements for task in tasks)
+        cpu = sum(task.cpu for task in tasks)
+        done = sum(1 for task in tasks if task.state == DONE)
+        return {
+            "tasks": len(tasks),
+            "done": done,
+            "statements": statements,
+            "wall_s": self.wall,
+            "cpu_s": cpu,
+            "statements_per_s": statements / self.wall if self.wall else 0.0,
+            "scripts_per_s": done / self.wall if self.wall else 0.0,
+            "switches": self.switches,
+            "fairness": self.fairness(),
+            "max_gap_ms": max((task.max_gap for task in tasks), default=0.0) * 1000,
+        }
+
+    def fairness(self):
+        """
+        Jain's index (1.0 = perfectly even) of the CPU each competing task had
+        received when the first preempted one finished
+        """
+        shares = list((self.contended_cpu or {task.name: task.cpu for task in self.tasks.values()}).values())
+        if not shares or not any(shares):
+            return 1.0
+        return sum(shares) ** 2 / (len(shares) * sum(share * share for share in shares))
+
+
+def format_task(task):
+    """================ format_task ================"""
+    return (f"{task.name:<34} {task.status or task.state:<20} {task.statements:>9} "
+            f"{task.cpu * 1000:>9.1f} {task.slices:>7} {task.max_gap * 1000:>9.1f}")
+
+
+def format_task_header():
+    """================ format_task_header ================"""
+    return f"{'script':<34} {'status':<20} {'stmts':>9} {'cpu ms':>9} {'slices':>7} {'gap ms':>9}"
+
+
+def format_metrics(metrics):
+    """================ format_metrics ================"""
+    return (f"{metrics['done']}/{metrics['tasks']} done in {metrics['wall_s']:.2f} s "
+            f"({metrics['cpu_s']:.2f} s CPU): {metrics['statements_per_s']:.0f} statements/s, "
+            f"{metrics['scripts_per_s']:.1f} scripts/s, {metrics['switches']} switches, "
+            f"fairness {metrics['fairness']:.3f}, longest wait {metrics['max_gap_ms']:.1f} ms")
@@ -1,5 +1,5 @@
-import re
 from parser import Parser
+from casts import NUMERIC_SOURCES, reads_as_number
 
 class SemanticAnalyzer(Parser):
     def __init__(self, tokens, symbol_table, function_dictionary):
@@ -214,145 +214,118 @@ class SemanticAnalyzer(Parser):
         return False
           
     def analyze_arithmetic_expr(self):
-        """Check arithmetic expression operands for type compatibility"""
-        operand_token = self.consume()
+        """
+        Check arithmetic expression operands for type compatibility. Nested
+        operators get a frame on `pending` instead of a recursive call; a
+        frame that finds a bad operand stops there and its parent carries on.
+        """
+        pending = [[self.consume(), 0]]  # [operator token, operands checked]
         op_type = "arithmetic"
-        
-        # Check first operand
-        if self.current_token()[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']:
-            self.analyze_arithmetic_expr()
-        else:
-            if self.current_token()[1] == '"':
-                self.consume('"')
-            
-            if not self.is_valid_operand(op_type, self.current_token(), operand_token):
-                return
-            
-            self.consume()
-            
-            if self.current_token()[1] == '"':
-                self.consume('"')
-        
-        self.consume('AN')
-        
-        # Check second operand
-        if self.current_token()[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']:
-            self.analyze_arithmetic_expr()
-        else:
-            if self.current_token()[1] == '"':
-                self.consume('"')
-            
-            if not self.is_valid_operand(op_type, self.current_token(), operand_token):
-                return
-            
-            self.consume()
-            
-            if self.current_token()[1] == '"':
-                self.consume('"')
-
-    
-    def analyze_boolean_expr(self):
-        boolean_token = self.consume()
-        op = boolean_token[1]
-        op_type = 'boolean'
-
-        if op == 'NOT':
-            if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
-                self.analyze_boolean_expr()
-                return
 
-            if self.current_token()[1] == '"':
-                self.consume('"')
-
-            if not self.is_valid_operand(op_type, self.current_token(), boolean_token):
-                return
-            
-            self.consume()
-
-            if self.current_token()[1] == '"':
-                self.consume('"')
-
-            return
+        while pending:
+            frame = pending[-1]
+            operand_token, index = frame
+            if index == 2:
+                pending.pop()
+                continue
+            if index == 1:
+                self.consume('AN')
+            frame[1] = index + 1
 
-        if op in ['ALL OF', 'ANY OF']:
+            # Check the operand
+            if self.current_token()[1] in ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']:
+                pending.append([self.consume(), 0])
+            elif not self.check_operand(op_type, operand_token):
+                pending.pop()
 
-            if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
-                self.analyze_boolean_expr()
-            else:
-                if self.current_token()[1] == '"':
-                    self.consume('"')
+    def analyze_boolean_expr(self):
+        """Check boolean expression operands; nested operators are frames on `pending` as in analyze_arithmetic_expr"""
+        pending = [[self.consume(), 0]]  # [operator token, operands checked]
+        op_type = 'boolean'
 
-                if not self.is_valid_operand(op_type, self.current_token(), boolean_token):
-                    return
-                
-                self.consume()
+        while pending:
+            frame = pending[-1]
+            boolean_token, index = frame
+            op = boolean_token[1]
 
-                if self.current_token()[1] == '"':
-                    self.consume('"')
+            if index == 1:
+                if op == 'NOT':
+                    pending.pop()
+                    continue
 
-            while self.current_token() and self.current_token()[1] == 'AN':
-                self.consume('AN')
+                if op in ['ALL OF', 'ANY OF']:
+                    if not self.current_token() or self.current_token()[1] != 'AN':
+                        pending.pop()
+                        if not self.current_token() or self.current_token()[1] != 'MKAY':
+                            self.errors.append(f"Line {boolean_token[3]}: {op} requires MKAY at the end")
+                            continue
 
-                if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
-                    self.analyze_boolean_expr()
+                        self.consume('MKAY')
+                        continue
+                    self.consume('AN')
                 else:
-                    if self.current_token()[1] == '"':
-                        self.consume('"')
+                    self.consume('AN')
+                    frame[1] = 2
+            elif index == 2:
+                pending.pop()
+                continue
+            else:
+                frame[1] = 1
 
-                    if not self.is_valid_operand(op_type, self.current_token(), boolean_token):
-                        return
+            # Check the operand
+            if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
+                pending.append([self.consume(), 0])
+            elif not self.check_operand(op_type, boolean_token):
+                pending.pop()
 
-                    self.consume()
+    def check_operand(self, op_type, operation_token):
+        """Check and consume one simple operand (with any quotes around it); False if it is invalid"""
+        if self.current_token()[1] == '"':
+            self.consume('"')
 
-                    if self.current_token()[1] == '"':
-                        self.consume('"')
+        if not self.is_valid_operand(op_type, self.current_token(), operation_token):
+            return False
 
-            if not self.current_token() or self.current_token()[1] != 'MKAY':
-                self.errors.append(f"Line {boolean_token[3]}: {op} requires MKAY at the end")
-                return
-            
-            self.consume('MKAY')
-            return
+        self.consume()
 
-        if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
-            self.analyze_boolean_expr()
-        else:
-            if self.current_token()[1] == '"':
-                self.consume('"')
+        if self.current_token()[1] == '"':
+            self.consume('"')
+        return True
 
-            if not self.is_valid_operand(op_type, self.current_token(), boolean_token):
-                return
-            
-            self.consume()
+    def analyze_comparison_expr(self):
+        """
+        Check a comparison's first operand. A nested operator there is
+        checked the same way in turn, so this loops rather than recursing;
+        the rest of the expression is left to analyze_statement.
+        """
+        while True:
+            operand_token = self.consume()
 
             if self.current_token()[1] == '"':
                 self.consume('"')
 
-        self.consume('AN')
-
-        if self.current_token()[1] in ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT', 'ALL OF', 'ANY OF']:
-            self.analyze_boolean_expr()
-        else:
-            if self.current_token()[1] == '"':
-                self.consume('"')
+            # Check first operand
+            if self.current_token()[2] == 'IDENTIFIER':
+                if self.current_token()[1] not in self.symbol_table:
+                    return True
 
-            if not self.is_valid_operand(op_type, self.current_token(), boolean_token):
-                return
+                var_type = self.symbol_table[self.current_token()[1]][3]
+                if var_type not in ['NUMBR', 'NUMBAR', 'NOOB']:  # Allow NOOB for runtime assignment
+                    self.errors.append(
+                        f"Line {self.current_token()[3]}: Variable '{self.current_token()[1]}' of type '{var_type}' "
+                        f"cannot be used in '{operand_token[1]}' operation (expected NUMBR or NUMBAR)"
+                    )
+                    return
 
-            self.consume()
+            if self.current_token()[1] not in ['BOTH SAEM', 'DIFFRINT', 'BIGGR OF', 'SMALLR OF', 'SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF']:
+                break
 
-            if self.current_token()[1] == '"':
-                self.consume('"')
-    
-    def analyze_comparison_expr(self):
-        operand_token = self.consume()
-        
         if self.current_token()[1] == '"':
             self.consume('"')
 
-        # Check first operand
+        # Check second operand
         if self.current_token()[2] == 'IDENTIFIER':
-            if self.current_token()[1] not in self.symbol_table:
+            if self.current_token()[1] not in self.symbol_table and self.current_token()[3] not in self.function_line:
                 return True
 
             var_type = self.symbol_table[self.current_token()[1]][3]
@@ -362,36 +335,17 @@ class SemanticAnalyzer(Parser):
                     f"cannot be used in '{operand_token[1]}' operation (expected NUMBR or NUMBAR)"
                 )
                 return
+        elif self.current_token()[2] not in ['NUMBR', 'NUMBAR']:
+            self.errors.append(
+                f"Line {self.current_token()[3]}: Invalid operand type '{self.current_token()[2]}' "
+                f"for '{operand_token[1]}' operation (expected NUMBR or NUMBAR)"
+            )
+            return
 
-        if self.current_token()[1] in ['BOTH SAEM', 'DIFFRINT', 'BIGGR OF', 'SMALLR OF', 'SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF']:
-            self.analyze_comparison_expr()
-        else:
-            if self.current_token()[1] == '"':
-                self.consume('"')
+        self.consume()
 
-            # Check second operand
-            if self.current_token()[2] == 'IDENTIFIER':
-                if self.current_token()[1] not in self.symbol_table and self.current_token()[3] not in self.function_line:
-                    return True
-                
-                var_type = self.symbol_table[self.current_token()[1]][3]
-                if var_type not in ['NUMBR', 'NUMBAR', 'NOOB']:  # Allow NOOB for runtime assignment
-                    self.errors.append(
-                        f"Line {self.current_token()[3]}: Variable '{self.current_token()[1]}' of type '{var_type}' "
-                        f"cannot be used in '{operand_token[1]}' operation (expected NUMBR or NUMBAR)"
-                    )
-                    return
-            elif self.current_token()[2] not in ['NUMBR', 'NUMBAR']:
-                self.errors.append(
-                    f"Line {self.current_token()[3]}: Invalid operand type '{self.current_token()[2]}' "
-                    f"for '{operand_token[1]}' operation (expected NUMBR or NUMBAR)"
-                )
-                return
-            
-            self.consume()
-            
-            if self.current_token()[1] == '"':
-                self.consume('"')
+        if self.current_token()[1] == '"':
+            self.consume('"')
 
     def extract_function_params(self):
         params = []
@@ -409,12 +363,8 @@ class SemanticAnalyzer(Parser):
         
         if token[2] == 'YARN':
             if type == 'arithmetic':
-                is_numbr = re.match(r'^-?[0-9]+$', token[1])
-                is_numbar = re.match(r'^-?[0-9]+\.[0-9]+$', token[1])
-                # Allow WIN/FAIL in arithmetic operations
-                is_troof = token[1] in ['WIN', 'FAIL']
-
-                if is_numbr or is_numbar or is_troof:
+                # Numbers and WIN/FAIL read as numbers (casts.yarn_number)
+                if reads_as_number(token[1]):
                     return True
                 else:
                     self.errors.append(
@@ -446,12 +396,8 @@ class SemanticAnalyzer(Parser):
 
             if self.symbol_table[token[1]][3] == 'YARN':
                 if type == 'arithmetic':
-                    is_numbr = re.match(r'^-?[0-9]+$', self.symbol_table[token[1]][0])
-                    is_numbar = re.match(r'^-?[0-9]+\.[0-9]+$', self.symbol_table[token[1]][0])
-                    # Allow WIN/FAIL in arithmetic operations
-                    is_troof = self.symbol_table[token[1]][0] in ['WIN', 'FAIL']
-
-                    if is_numbr or is_numbar or is_troof:
+                    # Numbers and WIN/FAIL read as numbers (casts.yarn_number)
+                    if reads_as_number(self.symbol_table[token[1]][0]):
                         return True
                     else:
                         self.errors.append(
@@ -473,7 +419,7 @@ class SemanticAnalyzer(Parser):
 
             # Allow TROOF type in arithmetic operations (WIN=1, FAIL=0)
             if type == 'arithmetic':
-                if self.symbol_table[token[1]][3] in ['NUMBR', 'NUMBAR', 'TROOF']:
+                if self.symbol_table[token[1]][3] in NUMERIC_SOURCES:
                     return True
                 else:
                     self.errors.append(
@@ -503,7 +449,7 @@ class SemanticAnalyzer(Parser):
         else:
             if type == 'arithmetic':
                 # Allow TROOF literals (WIN/FAIL) in arithmetic operations
-                if token[2] in ['NUMBR', 'NUMBAR', 'TROOF']:
+                if token[2] in NUMERIC_SOURCES:
                     return True
                 else:
                     self.errors.append(f"Error: Invalid data type '{token[2]}' for {operation_token[1]} operation on line {token[3]}. Expected NUMBR, NUMBAR, or TROOF.")
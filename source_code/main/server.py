@@ -0,0 +1,398 @@
+"""
+LOLCODE Execution Server
+A local service that runs LOLCODE for other programs. Clients connect over a
+Unix socket or localhost TCP and exchange one JSON object per line.
+
+Request:
+    {"id": 7, "source": "HAI ...", "inputs": ["5"], "timeout": 2.0}
+    {"id": 8, "script_id": "<script_id from an earlier response>", "inputs": []}
+Response (in completion order; match them by "id"):
+    {"id": 7, "script_id": "...", "status": "ok", "stdout": "...",
+     "symbols": {name: [value, type]}, "it": ..., "errors": [...],
+     "cached": true, "worker": 1234,
+     "timings": {"compile_ms": ..., "run_ms": ..., "queue_ms": ..., "total_ms": ...}}
+
+With a per-worker unit cache (serve --unit-cache N), a source the worker
+has not seen is compiled a function or region at a time, and the response
+lists the units that had to be rebuilt in "rebuilt_units".
+
+status is "ok", "<stage> errors", "timeout", "output limit", "memory limit",
+"input exhausted", "crash: <Exception>" or "error: <reason>" for a bad
+request.
+
+The asyncio front end never blocks and never starts threads: it hands jobs
+to a pool of worker processes forked at start-up over pipes and waits for
+the pipe to become readable. Each worker keeps its own interpreter.Interpreter
+so a script compiles once per worker, enforces the per-request timeout with
+SIGALRM, caps address space (RLIMIT_AS) and captured output, and is replaced
+after `max_jobs` jobs so slow leaks cannot build up. A worker that misses the
+timeout by more than WORKER_GRACE seconds is killed and replaced.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # not on Windows; workers then run without a memory cap
+    resource = None
+
+from benchmark import BenchmarkTimeout, time_limit
+from golden import plain_value
+from interpreter import Interpreter, source_hash
+from unitcache import UnitCache
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_MAX_JOBS = 1000          # jobs per worker before it is replaced
+DEFAULT_TIMEOUT = 5.0            # seconds per request unless it asks for less
+DEFAULT_MEMORY_MB = 512          # address space per worker
+DEFAULT_MAX_OUTPUT = 1 << 20     # characters of VISIBLE output per request
+
+# Seconds past a request's timeout before its worker is killed outright
+WORKER_GRACE = 1.0
+
+# Sources remembered by the front end so clients can send "script_id"
+SCRIPT_CACHE_SIZE = 256
+
+# Longest request line accepted, in bytes
+MAX_REQUEST_BYTES = 16 << 20
+
+
+class OutputLimitExceeded(BaseException):
+    """Raised by LimitedOutput; BaseException so the interpreter cannot swallow it"""
+
+
+class LimitedOutput:
+    """File-like VISIBLE target that stops a script after `limit` characters"""
+
+    def __init__(self, limit):
+        """================ __init__ ================"""
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+
+    def write(self, text):
+        """================ write ================"""
+        self.size += len(text)
+        if self.size > self.limit:
+            raise OutputLimitExceeded()
+        self.parts.append(text)
+        return len(text)
+
+    def flush(self):
+        """================ flush ================"""
+
+    def getvalue(self):
+        """================ getvalue ================"""
+        return "".join(self.parts)
+
+
+# ================================================================
+# ======================= WORKER PROCESS =========================
+# ================================================================
+def worker_main(conn, memory_mb, cache_size, unit_cache_size=0):
+    """Worker loop: answer jobs from `conn` until it closes or sends None"""
+    if resource is not None and memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    interpreter = Interpreter(cache_size, UnitCache(unit_cache_size) if unit_cache_size else None)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        conn.send(run_job(interpreter, job))
+
+
+def run_job(interpreter, job):
+    """Compile (or reuse) and run one job; returns the response fields"""
+    start = time.perf_counter()
+    hits = interpreter.hits
+    cached, compiled = False, None
+    output = LimitedOutput(job["max_output"])
+    symbol_table, errors = {}, []
+    try:
+        # A front-end crash is reported like a run-time one, not raised
+        # into the worker
+        program = interpreter.compile(job["source"])
+        cached = interpreter.hits > hits
+        compiled = time.perf_counter()
+        errors = list(program.errors)
+        with time_limit(job["timeout"]):
+            result = program.run(inputs=job["inputs"], output=output)
+        symbol_table, errors = result.symbol_table, result.errors
+        if not program.ok:
+            status = f"{program.failed_stage.lower()} errors"
+        else:
+            status = "execution errors" if errors else "ok"
+    except BenchmarkTimeout:
+        status = "timeout"
+    except OutputLimitExceeded:
+        status = "output limit"
+    except MemoryError:
+        status = "memory limit"
+    except EOFError:
+        status = "input exhausted"
+    except Exception as error:
+        status = f"crash: {type(error).__name__}"
+        errors = [str(error)]
+    finished = time.perf_counter()
+    if compiled is None:
+        compiled = finished
+
+    response = {
+        "status": status,
+        "stdout": output.getvalue(),
+        "symbols": {name: [plain_value(entry[0]), entry[3]] for name, entry in symbol_table.items()
+                    if name != 'IT' and isinstance(entry, tuple)},
+        "it": plain_value(symbol_table.get('IT')),
+        "errors": [str(error) for error in errors],
+        "cached": cached,
+        "worker": os.getpid(),
+        "timings": {"compile_ms": (compiled - start) * 1000, "run_ms": (finished - compiled) * 1000},
+    }
+    if interpreter.unit_cache is not None and not cached:
+        response["rebuilt_units"] = [f"{unit.label()} {unit.first_line}-{unit.last_line}"
+                                     for unit in interpreter.unit_cache.rebuilt]
+    return response
+
+
+class WorkerTimeout(Exception):
+    """A worker did not answer within its deadline"""
+
+
+class Worker:
+    """Front-end handle on one worker process"""
+
+    def __init__(self, context, memory_mb, cache_size, unit_cache_size=0):
+        """================ __init__ ================"""
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main,
+                                       args=(child_conn, memory_mb, cache_size, unit_cache_size),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    async def call(self, job, deadline):
+        """Send a job and wait, without blocking the loop, for the answer"""
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            self.conn.send(job)
+            await asyncio.wait_for(readable, deadline)
+        except asyncio.TimeoutError:
+            raise WorkerTimeout() from None
+        finally:
+            loop.remove_reader(fd)
+        self.jobs += 1
+        return self.conn.recv()
+
+    def stop(self, wait=True):
+        """
+        Ask the worker to exit. With `wait`, kill it if it has not exited
+        within WORKER_GRACE; without, leave it to finish on its own (the next
+        process start reaps it) so the event loop never blocks.
+        """
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        if wait:
+            self.process.join(WORKER_GRACE)
+            self.kill()
+        else:
+            self.conn.close()
+
+    def kill(self):
+        """================ kill ================"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class WorkerPool:
+    """Pre-forked workers handed out to one job at a time"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_jobs=DEFAULT_MAX_JOBS, memory_mb=DEFAULT_MEMORY_MB,
+                 cache_size=128, unit_cache_size=0):
+        """================ __init__ ================"""
+        self.size = max(1, workers)
+        self.max_jobs = max_jobs
+        self.memory_mb = memory_mb
+        self.cache_size = cache_size
+        self.unit_cache_size = unit_cache_size  # per-worker unitcache.UnitCache entries, 0 for none
+        # fork: workers start with the interpreter modules already imported
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        self.idle = None
+        self.workers = set()
+        self.recycled = 0
+
+    def spawn(self):
+        """================ spawn ================"""
+        worker = Worker(self.context, self.memory_mb, self.cache_size, self.unit_cache_size)
+        self.workers.add(worker)
+        return worker
+
+    def retire(self, worker, kill=False):
+        """================ retire ================"""
+        self.workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop(wait=False)
+        self.recycled += 1
+
+    async def start(self):
+        """================ start ================"""
+        self.idle = asyncio.Queue()
+        for _ in range(self.size):
+            self.idle.put_nowait(self.spawn())
+
+    async def submit(self, job):
+        """Run a job on the next free worker; returns the worker's response"""
+        worker = await self.idle.get()
+        try:
+            response = await worker.call(job, job["timeout"] + WORKER_GRACE)
+        except WorkerTimeout:
+            self.retire(worker, kill=True)
+            worker = self.spawn()
+            response = {"status": "timeout", "errors": ["worker did not answer in time and was replaced"]}
+        except (EOFError, OSError) as error:
+            self.retire(worker, kill=True)
+            worker = self.spawn()
+            response = {"status": f"crash: {type(error).__name__}", "errors": ["worker process died"]}
+        else:
+            if worker.jobs >= self.max_jobs or response["status"] == "memory limit":
+                self.retire(worker)
+                worker = self.spawn()
+        self.idle.put_nowait(worker)
+        return response
+
+    def close(self):
+        """================ close ================"""
+        for worker in list(self.workers):
+            worker.stop()
+        self.workers.clear()
+
+
+# ================================================================
+# ======================= FRONT END ==============================
+# ================================================================
+class ExecutionServer:
+    """JSON-lines front end that forwards requests to a WorkerPool"""
+
+    def __init__(self, pool, max_timeout=DEFAULT_TIMEOUT, max_output=DEFAULT_MAX_OUTPUT):
+        """================ __init__ ================"""
+        self.pool = pool
+        self.max_timeout = max_timeout
+        self.max_output = max_output
+        self.sources = OrderedDict()  # script_id -> source, most recently used last
+        self.requests = 0
+
+    async def start(self, socket_path=None, host='127.0.0.1', port=0):
+        """Start the pool and listen; returns the asyncio server"""
+        await self.pool.start()
+        if socket_path:
+            return await asyncio.start_unix_server(self.handle_client, socket_path, limit=MAX_REQUEST_BYTES)
+        return await asyncio.start_server(self.handle_client, host, port, limit=MAX_REQUEST_BYTES)
+
+    async def handle_client(self, reader, writer):
+        """Answer each request line as soon as its job is done"""
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(self.respond(line, writer))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line, writer):
+        """================ respond ================"""
+        received = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            job = self.make_job(request)
+        except (ValueError, AttributeError, TypeError) as error:
+            response = {"status": f"error: {error}"}
+        else:
+            response = await self.pool.submit(job)
+            response["script_id"] = job["script_id"]
+        self.requests += 1
+
+        total_ms = (time.perf_counter() - received) * 1000
+        timings = response.setdefault("timings", {})
+        timings["queue_ms"] = total_ms - timings.get("compile_ms", 0.0) - timings.get("run_ms", 0.0)
+        timings["total_ms"] = total_ms
+        response["id"] = request_id
+        writer.write(json.dumps(response).encode('utf-8') + b"\n")
+        await writer.drain()
+
+    def make_job(self, request):
+        """Validate a request and resolve its script; raises ValueError when it is unusable"""
+        if "source" in request:
+            source = request["source"]
+            if not isinstance(source, str):
+                raise ValueError("source must be a string")
+            script_id = source_hash(source)
+            self.sources[script_id] = source
+            if len(self.sources) > SCRIPT_CACHE_SIZE:
+                self.sources.popitem(last=False)
+        elif "script_id" in request:
+            script_id = request["script_id"]
+            source = self.sources.get(script_id)
+            if source is None:
+                raise ValueError(f"unknown script_id {script_id!r}; send the source again")
+        else:
+            raise ValueError("request needs 'source' or 'script_id'")
+        self.sources.move_to_end(script_id)
+
+        timeout = float(request.get("timeout", self.max_timeout))
+        return {
+            "source": source,
+            "script_id": script_id,
+            "inputs": [str(value) for value in request.get("inputs", [])],
+            "timeout": min(max(timeout, 0.001), self.max_timeout),
+            "max_output": self.max_output,
+        }
+
+
+async def serve(socket_path=None, host='127.0.0.1', port=0, ready=None, timeout=DEFAULT_TIMEOUT,
+                max_output=DEFAULT_MAX_OUTPUT, **pool_options):
+    """
+    Run a server until cancelled; `ready(address)` is called once it listens.
+    `pool_options` go to WorkerPool (workers, max_jobs, memory_mb, cache_size,
+    unit_cache_size).
+    """
+    pool = WorkerPool(**pool_options)
+    server = ExecutionServer(pool, timeout, max_output)
+    listener = await server.start(socket_path, host, port)
+    address = socket_path or "%s:%d" % listener.sockets[0].getsockname()[:2]
+    if ready is not None:
+        ready(address)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        pool.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,106 @@
+"""
+LOLCODE Variable Slots
+Execute holds variables in flat lists instead of a dict of
+(value, kind, line, type) tuples. Every name a program can touch (its
+WAZZUP globals, function parameters, every other identifier, and the names
+inline bodies bind) is given an integer slot before it runs, and a frame
+is three lists indexed by slot:
+
+    values[slot]    the value, or UNDECLARED while the name is not a variable
+    dtypes[slot]    its type
+    decls[slot]     the (kind, line) it was declared with
+
+An assignment stores two list items instead of building a tuple, and a
+function call copies the lists instead of the symbol table. SymbolView
+shows the current frame as the {name: (value, kind, line, type)} mapping
+the GUI, the recorder and execute_lolcode's callers read.
+"""
+from collections.abc import MutableMapping
+
+# values[slot] of a name that is not a variable in the frame
+UNDECLARED = object()
+
+# decls[slot] of a function parameter, which is bound as (value, None, None, 'NOOB')
+PARAMETER = (None, None)
+
+
+def resolve_slots(slots, names):
+    """Give each name in `names` without a slot the next one; returns how many were added"""
+    count = len(slots)
+    for name in names:
+        if name not in slots:
+            slots[name] = len(slots)
+    return len(slots) - count
+
+
+def program_names(tokens, inline_bodies):
+    """Every identifier in `tokens`, then the names inline bodies bind their parameters to"""
+    for token in tokens:
+        if token[2] == 'IDENTIFIER':
+            yield token[1]
+    for names, _, _ in inline_bodies.values():
+        yield from names
+
+
+def lay_out(symbol_table, slots):
+    """(values, dtypes, decls) of a {name: entry} table; `slots` must have every name in it"""
+    values = [UNDECLARED] * len(slots)
+    dtypes = [None] * len(slots)
+    decls = [None] * len(slots)
+    for name, (value, kind, line, dtype) in symbol_table.items():
+        slot = slots[name]
+        values[slot] = value
+        dtypes[slot] = dtype
+        decls[slot] = (kind, line)
+    return values, dtypes, decls
+
+
+class SymbolView(MutableMapping):
+    """
+    An executor's current frame as {name: (value, kind, line, type)}, in
+    slot order. Writes go to the frame; a name without a slot is given one.
+    """
+    __slots__ = ('executor',)
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def __getitem__(self, name):
+        executor = self.executor
+        slot = executor.slots[name]
+        value = executor.values[slot]
+        if value is UNDECLARED:
+            raise KeyError(name)
+        kind, line = executor.decls[slot]
+        return value, kind, line, executor.dtypes[slot]
+
+    def __setitem__(self, name, entry):
+        executor = self.executor
+        slot = executor.slot_for(name)
+        value, kind, line, dtype = entry
+        executor.values[slot] = value
+        executor.dtypes[slot] = dtype
+        executor.decls[slot] = (kind, line)
+
+    def __delitem__(self, name):
+        executor = self.executor
+        slot = executor.slots[name]
+        if executor.values[slot] is UNDECLARED:
+            raise KeyError(name)
+        executor.values[slot] = UNDECLARED
+        executor.dtypes[slot] = None
+        executor.decls[slot] = None
+
+    def __contains__(self, name):
+        slot = self.executor.slots.get(name)
+        return slot is not None and self.executor.values[slot] is not UNDECLARED
+
+    def __iter__(self):
+        values = self.executor.values
+        return (name for name, slot in list(self.executor.slots.items()) if values[slot] is not UNDECLARED)
+
+    def __len__(self):
+        return len(self.executor.values) - self.executor.values.count(UNDECLARED)
+
+    def __repr__(self):
+        return f"SymbolView({dict(self)!r})"
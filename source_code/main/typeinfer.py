@@ -0,0 +1,572 @@
+"""
+LOLCODE Type Inference
+A flow-sensitive pass over a checked program that works out, for every
+expression operand, the type the executor will find there:
+
+    identifier   the type tag its variable holds at that point
+    literal      the type get_value coerces it to (a YARN "5" is a NUMBR)
+
+Anything that depends on run-time values (function parameters, globals
+read inside a function, variables whose branches disagree) is DYNAMIC.
+
+    types, function_returns = infer_types(tokens, symbol_table)
+
+`types` runs parallel to `tokens`: None for tokens that are not operands.
+The walk follows Execute's own statement dispatch, so a position is
+annotated with the state it really has when the executor gets there.
+Branches join (equal types stay, different ones become DYNAMIC) and loop
+bodies are walked until the types at the loop condition stop changing.
+
+Function bodies are specialised per call site. A body runs on a copy of its
+caller's variables, so the argument types and the caller's types for the
+globals the body uses decide its annotations. Each distinct signature gets
+its own annotation list for the body, cached by signature, and `types`
+holds that list at the call's I IZ token. The body's own slice of `types`
+is the generic version (everything DYNAMIC on entry) used everywhere else.
+"""
+from parser import Parser
+from casts import yarn_number
+
+DYNAMIC = 'DYNAMIC'  # type only known at run time
+# A parameter: Execute binds it tagged NOOB, but its value is a real
+# argument, so arithmetic converts it with int() like a NUMBR
+PARAM = 'PARAM'
+
+# Signatures specialised per function before calls fall back to the generic body
+MAX_SPECIALIZATIONS = 8
+
+VALUE_TYPES = ('NUMBR', 'NUMBAR', 'YARN', 'TROOF', 'NOOB')
+CAST_TARGETS = ('NUMBR', 'NUMBAR', 'YARN', 'TROOF')
+# What perform_operation makes of a variable's type (casts.variable_number)
+ARITHMETIC_OPERAND_TYPES = {'TROOF': 'NUMBAR', 'YARN': 'NUMBAR'}
+
+ARITHMETIC_OPS = ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'QUOSHUNT OF', 'MOD OF', 'BIGGR OF', 'SMALLR OF']
+BOOLEAN_OPS = ['BOTH OF', 'EITHER OF', 'WON OF', 'NOT']
+INFINITE_OPS = ['ALL OF', 'ANY OF']
+COMPARISON_OPS = ['BOTH SAEM', 'DIFFRINT']
+# Operators evaluate_expression (function arguments, FOUND YR) accepts
+CALL_ARGUMENT_OPS = ['SUM OF', 'DIFF OF', 'PRODUKT OF', 'BOTH SAEM']
+
+
+END = ('End', '', 'EOF', 0)
+
+
+def join(left, right):
+    """================ join ================"""
+    return left if left == right else DYNAMIC
+
+
+def join_env(left, right):
+    """Variables typed the same on both paths keep their type"""
+    return {name: join(left.get(name, DYNAMIC), right.get(name, DYNAMIC))
+            for name in left.keys() | right.keys()}
+
+
+def literal_type(token):
+    """The type Execute.get_value gives a literal in arithmetic"""
+    if token[2] == 'YARN':
+        return yarn_number(token[1])[1]
+    if token[2] == 'TROOF':
+        return 'NUMBAR'
+    return token[2]
+
+
+class TypeInference(Parser):
+    def __init__(self, tokens, symbol_table, program=None):
+        super().__init__(tokens)
+        self.initial = {name: entry[3] if entry[3] in VALUE_TYPES else DYNAMIC
+                        for name, entry in symbol_table.items()}
+        self.types = [None] * len(tokens)
+        self.function_returns = {}
+        self.call_signatures = []  # (line, function, argument types) for every call site
+
+        if program is None:
+            self.program_tokens = tokens
+            self.functions = self.scan_functions()
+            self.specializations = {}  # (function, entry types) -> annotations for its body
+        else:
+            # Walking one specialised body: share the program's tables
+            self.program_tokens = program.program_tokens
+            self.functions = program.functions
+            self.specializations = program.specializations
+            self.call_signatures = program.call_signatures
+
+    def scan_functions(self):
+        """
+        {name: (start, end, params, globals)} for each HOW IZ I, where
+        start:end is the TokenRange Parser.store_function_bodies records
+        """
+        functions = {}
+        pos = 0
+        while pos < len(self.tokens):
+            if self.tokens[pos][1] == 'HOW IZ I' and pos + 1 < len(self.tokens):
+                end = pos
+                while end < len(self.tokens):
+                    end += 1
+                    if self.tokens[end - 1][1] == 'IF U SAY SO':
+                        break
+                params = []
+                header = pos + 2
+                while header < end and self.tokens[header][2] != 'NEWLINE':
+                    if self.tokens[header][2] == 'IDENTIFIER' and self.tokens[header - 1][1] == 'YR':
+                        params.append(self.tokens[header][1])
+                    header += 1
+                names = {token[1] for token in self.tokens[header:end] if token[2] == 'IDENTIFIER'}
+                functions[self.tokens[pos + 1][1]] = (pos, end, params, sorted(names - set(params)))
+                pos = end
+                continue
+            pos += 1
+        return functions
+
+    def current_token(self):
+        """Like Parser.current_token, but an EOF token instead of None so walks cannot fall off the end"""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return END
+
+    def infer(self):
+        """Walk the main program, and each function body on its own"""
+        env = dict(self.initial)
+        while self.current_token()[1] not in ('KTHXBYE', ''):
+            env = self.infer_statement(env)
+        return env
+
+    # ----------------- Statements -----------------
+    def infer_statement(self, env):
+        """Mirror of Execute.execute_statement; returns the variable types after it"""
+        token = self.current_token()
+        if token[1] == 'VISIBLE':
+            self.infer_output(env)
+        elif token[2] == 'IDENTIFIER' and self.peek() and self.peek()[1] == 'R' and \
+                not (self.peek(2) and self.peek(2)[1] == 'MAEK'):
+            env = self.infer_reassignment(env)
+        elif token[1] == 'I HAS A':
+            env = self.infer_declaration(env)
+        elif token[2] == 'IDENTIFIER' and self.peek() and self.peek()[1] == 'IS NOW A':
+            self.consume()
+            self.consume()
+            env = dict(env)
+            env[token[1]] = self.cast_type(env.get(token[1], DYNAMIC), self.consume()[1], env.get(token[1], DYNAMIC))
+        elif token[2] == 'IDENTIFIER' and self.peek() and self.peek()[1] == 'R':
+            # <var> R MAEK <source> <type>
+            self.consume()
+            self.consume()
+            self.consume()
+            source = self.consume()
+            env = dict(env)
+            env[token[1]] = self.cast_type(env.get(source[1], DYNAMIC), self.consume()[1], env.get(token[1], DYNAMIC))
+        elif token[1] == 'GIMMEH':
+            self.consume()
+            env = dict(env)
+            env[self.consume()[1]] = 'YARN'
+        elif token[1] == 'O RLY?':
+            env = self.infer_conditional(env)
+        elif token[1] == 'WTF?':
+            env = self.infer_switch(env)
+        elif token[1] == 'IM IN YR':
+            env = self.infer_loop(env)
+        elif token[1] == 'HOW IZ I':
+            self.infer_function()
+        elif token[1] == 'I IZ':
+            self.infer_call(env)
+        elif self.infer_expression(env) is None:
+            self.consume()
+
+        if self.current_token()[2] == 'NEWLINE':
+            self.consume()
+        return env
+
+    def infer_block(self, env, stops):
+        """Statements up to (not including) one of `stops`"""
+        while self.current_token()[1] not in stops and self.current_token()[2] != 'EOF':
+            env = self.infer_statement(env)
+        return env
+
+    def skip_newlines(self):
+        """================ skip_newlines ================"""
+        while self.current_token()[2] == 'NEWLINE':
+            self.consume()
+
+    def infer_output(self, env):
+        """VISIBLE arguments, as Execute reads them"""
+        self.consume()
+        while self.current_token()[2] not in ('NEWLINE', 'EOF'):
+            if self.infer_expression(env) is None:
+                self.infer_operand(env)
+            if self.current_token()[1] == '+':
+                self.consume()
+            elif self.current_token()[1] == '!':
+                self.consume()
+
+    def infer_reassignment(self, env):
+        """================ infer_reassignment ================"""
+        var_name = self.consume()[1]
+        self.consume()  # R
+        current = self.current_token()
+        dtype = self.infer_expression(env)
+        if dtype is None:
+            if current[2] == 'IDENTIFIER' or current[2] in CAST_TARGETS:
+                dtype = self.infer_operand(env, stored=True)
+            else:
+                self.consume()
+                return env
+        env = dict(env)
+        env[var_name] = dtype
+        return env
+
+    def infer_declaration(self, env):
+        """I HAS A: an expression initialiser runs here, anything else keeps the parser's entry"""
+        self.consume()
+        var_name = self.consume()[1]
+        self.consume()  # ITZ (or the newline when there is none)
+        dtype = self.infer_expression(env)
+        env = dict(env)
+        env[var_name] = dtype if dtype is not None else self.initial.get(var_name, DYNAMIC)
+        return env
+
+    def cast_type(self, source, target, unchanged):
+        """Type after a cast of a `source` value to `target`; a failed cast leaves `unchanged`"""
+        if target not in CAST_TARGETS:
+            return unchanged
+        if source in ('NUMBR', 'NUMBAR', 'TROOF', 'NOOB', PARAM) or (source == 'YARN' and target in ('YARN', 'TROOF')):
+            return target
+        return join(target, unchanged)
+
+    def infer_conditional(self, env):
+        """O RLY?: each branch starts from the state before it; the result joins them all"""
+        self.consume()
+        self.skip_newlines()
+        self.consume()  # YA RLY
+        self.skip_newlines()
+        result = self.infer_block(env, ('MEBBE', 'NO WAI', 'OIC'))
+        has_else = False
+        while self.current_token()[1] == 'MEBBE':
+            self.consume()
+            self.infer_comparison(env)
+            self.skip_newlines()
+            result = join_env(result, self.infer_block(env, ('MEBBE', 'NO WAI', 'OIC')))
+        if self.current_token()[1] == 'NO WAI':
+            has_else = True
+            self.consume()
+            self.skip_newlines()
+            result = join_env(result, self.infer_block(env, ('OIC',)))
+        if not has_else:
+            result = join_env(result, env)
+        if self.current_token()[1] == 'OIC':
+            self.consume()
+        return result
+
+    def infer_switch(self, env):
+        """WTF?: a case is entered directly or by falling through from the one before it"""
+        self.consume()
+        self.skip_newlines()
+        result = env
+        falling = None
+        while self.current_token()[1] in ('OMG', 'OMGWTF'):
+            if self.consume()[1] == 'OMG':
+                self.consume()  # case literal
+            self.skip_newlines()
+            case_env = env if falling is None else join_env(env, falling)
+            falling = case_env
+            while self.current_token()[1] not in ('OMG', 'OMGWTF', 'OIC') and self.current_token()[2] != 'EOF':
+                if self.current_token()[1] == 'GTFO':
+                    self.consume()
+                    self.skip_newlines()
+                    result = join_env(result, case_env)
+                    falling = None
+                    continue
+                case_env = self.infer_statement(case_env)
+                if falling is not None:
+                    falling = case_env
+            result = join_env(result, case_env)
+        if self.current_token()[1] == 'OIC':
+            self.consume()
+        return result
+
+    def infer_loop(self, env):
+        """
+        IM IN YR: the condition and body are walked again until the types
+        they start from are stable, so the annotations left behind hold for
+        every iteration. GTFO can leave after any top-level statement.
+        """
+        self.consume()
+        self.consume()  # label
+        self.consume()  # UPPIN / NERFIN
+        if self.current_token()[1] == 'YR':
+            self.consume()
+        self.consume()  # loop variable; UPPIN/NERFIN keep its type
+        self.consume()  # TIL / WILE
+        condition_pos = self.position
+
+        entry = env
+        while True:
+            self.position = condition_pos
+            self.infer_loop_condition(entry)
+            self.position = condition_pos
+            depth = 0
+            while self.current_token()[2] != 'EOF':
+                if self.current_token()[1] in INFINITE_OPS:
+                    depth += 1
+                elif self.current_token()[1] == 'MKAY' and depth > 0:
+                    depth -= 1
+                if self.current_token()[2] == 'NEWLINE' and depth == 0:
+                    break
+                self.consume()
+            self.skip_newlines()
+
+            body = entry
+            exits = entry
+            while not self.at_loop_end():
+                if self.current_token()[1] == 'GTFO':
+                    self.consume()
+                    continue
+                body = self.infer_statement(body)
+                exits = join_env(exits, body)
+            following = join_env(entry, body)
+            if following == entry:
+                break
+            entry = following
+
+        if self.consume()[1] == 'IM':
+            self.consume()
+            self.consume()
+        self.consume()  # label
+        return exits
+
+    def at_loop_end(self):
+        """================ at_loop_end ================"""
+        token = self.current_token()
+        return token[2] == 'EOF' or token[1] == 'IM OUTTA YR' or (token[1] == 'IM' and self.peek()[1] == 'OUTTA')
+
+    def infer_loop_condition(self, env):
+        """Mirror of Execute.evaluate_loop_condition"""
+        current = self.current_token()
+        if current[1] in COMPARISON_OPS:
+            self.infer_comparison(env)
+        elif current[1] in BOOLEAN_OPS:
+            self.infer_boolean(env)
+        elif current[1] in INFINITE_OPS:
+            self.infer_infinite(env)
+        elif current[2] == 'IDENTIFIER':
+            self.infer_operand(env)
+
+    # ----------------- Functions -----------------
+    def infer_function(self, entry=None):
+        """
+        A HOW IZ I body. Walked in place it is the generic version, where
+        nothing is known on entry; `entry` gives a specialisation's
+        parameter and global types. Records the type of what the generic
+        body returns in function_returns.
+        """
+        self.consume()
+        func_name = self.consume()[1]
+        while self.current_token()[2] not in ('NEWLINE', 'EOF'):
+            self.consume()
+        self.skip_newlines()
+
+        env = dict(entry) if entry is not None else {}
+        returned = None
+        while self.current_token()[1] != 'IF U SAY SO' and self.current_token()[2] != 'EOF':
+            if self.current_token()[1] == 'FOUND YR':
+                self.consume()
+                dtype = self.infer_argument(env)
+                returned = dtype if returned is None else returned
+            elif self.current_token()[1] == 'GTFO':
+                self.consume()
+                returned = 'NOOB' if returned is None else returned
+            else:
+                env = self.infer_statement(env)
+        if entry is None:
+            self.function_returns[func_name] = returned if returned is not None else 'NOOB'
+
+    def infer_call(self, env):
+        """
+        I IZ: arguments are evaluated in the caller; the callee cannot
+        change its variables. Annotates the I IZ token with the body
+        specialised for this call's signature.
+        """
+        call_pos = self.position
+        line = self.consume()[3]
+        func_name = self.consume()[1]
+        arguments = []
+        while self.current_token()[1] in ('YR', 'AN'):
+            if self.consume()[1] == 'AN' and self.current_token()[1] == 'YR':
+                self.consume()
+            arguments.append(self.infer_argument(env))
+        if self.current_token()[1] == 'MKAY':
+            self.consume()
+
+        self.call_signatures.append((line, func_name, tuple(arguments)))
+        function = self.functions.get(func_name)
+        if function is None or len(function[2]) != len(arguments):
+            return  # Execute raises at this call
+        _, _, params, names = function
+        entry = {name: env.get(name, DYNAMIC) for name in names}
+        for param, dtype in zip(params, arguments):
+            # A YARN or NOOB argument may be the string 'NOOB', which only
+            # get_value's path reads as 0
+            entry[param] = PARAM if dtype in ('NUMBR', 'NUMBAR', 'TROOF') else DYNAMIC
+        self.types[call_pos] = self.specialize(func_name, entry)
+
+    def specialize(self, func_name, entry):
+        """
+        Annotations for `func_name`'s body entered with `entry` types, from
+        the cache when this signature was seen before. A recursive call gets
+        the list that is still being filled, which is complete by the time
+        anything runs. None once a function has too many signatures.
+        """
+        key = (func_name, tuple(sorted(entry.items())))
+        types = self.specializations.get(key)
+        if types is not None:
+            return types
+        if sum(1 for name, _ in self.specializations if name == func_name) >= MAX_SPECIALIZATIONS:
+            return None
+
+        start, end, _, _ = self.functions[func_name]
+        body = TypeInference(self.program_tokens[start:end], {}, program=self)
+        self.specializations[key] = body.types
+        body.infer_function(entry)
+        return body.types
+
+    def infer_argument(self, env):
+        """Mirror of Execute.evaluate_expression"""
+        current = self.current_token()
+        if current[1] in CALL_ARGUMENT_OPS:
+            return self.infer_arithmetic(env)
+        if current[2] in ('NUMBR', 'NUMBAR', 'YARN', 'TROOF'):
+            self.consume()
+            return current[2]
+        if current[2] == 'IDENTIFIER':
+            return self.infer_operand(env, stored=True)
+        return 'NOOB'
+
+    # ----------------- Expressions -----------------
+    def infer_expression(self, env):
+        """Type of the expression starting here, or None when no operator starts here"""
+        current = self.current_token()[1]
+        if current in ARITHMETIC_OPS:
+            return self.infer_arithmetic(env)
+        if current in BOOLEAN_OPS:
+            return self.infer_boolean(env)
+        if current in INFINITE_OPS:
+            return self.infer_infinite(env)
+        if current in COMPARISON_OPS:
+            return self.infer_comparison(env)
+        if current == 'SMOOSH':
+            return self.infer_concat(env)
+        return None
+
+    def infer_operand(self, env, stored=False):
+        """
+        Annotate and consume one operand. Returns the type get_value sees
+        (a parameter reads as a NUMBR, a literal as what it coerces to), or
+        with `stored` the type an assignment of it would store.
+        """
+        position = self.position
+        token = self.consume()
+        if token[2] == 'IDENTIFIER':
+            stored_type = env.get(token[1], DYNAMIC)
+            dtype = 'NUMBR' if stored_type == PARAM else stored_type
+        elif token[2] in VALUE_TYPES:
+            stored_type = token[2]
+            dtype = literal_type(token)
+        else:
+            stored_type = dtype = DYNAMIC
+        self.types[position] = dtype
+        return stored_type if stored else dtype
+
+    def infer_arithmetic(self, env):
+        """
+        Mirror of Execute.execute_arithmetic_expr. Operand types follow
+        casts.variable_number and perform_operation: a YARN or TROOF
+        variable is a NUMBAR and a nested result is truncated like a NUMBR.
+        """
+        return self.infer_prefix(env, 'arithmetic')
+
+    def infer_boolean(self, env):
+        """Mirror of Execute.execute_boolean_expr"""
+        return self.infer_prefix(env, 'boolean')
+
+    def infer_comparison(self, env):
+        """Mirror of Execute.execute_comparison_expr"""
+        return self.infer_prefix(env, 'comparison')
+
+    def infer_prefix(self, env, kind):
+        """Mirror of Execute.execute_prefix_expr, with the same explicit stack of nested operators"""
+        pending = [[kind, self.consume()[1], []]]  # [kind, operator, operand types]
+        while True:
+            kind, operator, operands = pending[-1]
+            if len(operands) == (1 if kind == 'boolean' and operator == 'NOT' else 2):
+                pending.pop()
+                if not pending:
+                    break
+                pending[-1][2].append('NUMBR')
+                continue
+
+            if operands and self.current_token()[1] == 'AN':
+                self.consume()
+            current = self.current_token()[1]
+            if kind == 'boolean':
+                if current in BOOLEAN_OPS:
+                    pending.append(['boolean', self.consume()[1], []])
+                else:
+                    operands.append(self.infer_operand(env))
+            elif kind == 'comparison' and current in COMPARISON_OPS:
+                pending.append(['comparison', self.consume()[1], []])
+            elif current in ARITHMETIC_OPS:
+                pending.append(['arithmetic', self.consume()[1], []])
+            else:
+                dtype = self.infer_operand(env)
+                operands.append(ARITHMETIC_OPERAND_TYPES.get(dtype, dtype))
+
+        if kind != 'arithmetic' or operator in COMPARISON_OPS:
+            return 'TROOF'
+        if operator == 'QUOSHUNT OF' or 'NUMBAR' in operands:
+            return 'NUMBAR'
+        return DYNAMIC if DYNAMIC in operands else 'NUMBR'
+
+    def infer_infinite(self, env):
+        """Mirror of Execute.execute_infinite_arity_expr"""
+        self.consume()
+        depth = 1
+        while depth:
+            if self.current_token()[2] == 'EOF':
+                break
+            if self.current_token()[1] == 'MKAY':
+                self.consume()
+                depth -= 1
+            elif self.current_token()[1] == 'AN':
+                self.consume()
+            elif self.current_token()[1] in BOOLEAN_OPS:
+                self.infer_boolean(env)
+            elif self.current_token()[1] in INFINITE_OPS:
+                self.consume()
+                depth += 1
+            else:
+                self.infer_operand(env)
+        return 'TROOF'
+
+    def infer_concat(self, env):
+        """Mirror of Execute.execute_concat_expr"""
+        self.consume()
+        while True:
+            current = self.current_token()
+            if current[2] in ('NEWLINE', 'EOF') or current[1] in ('VISIBLE', 'KTHXBYE', '+'):
+                break
+            if current[1] == 'AN':
+                self.consume()
+            elif self.infer_expression(env) is None:
+                self.infer_operand(env)
+        return 'YARN'
+
+
+def infer_types(tokens, symbol_table):
+    """
+    Entry point for type inference over a program that passed semantic
+    analysis. Returns (types, function_returns): the per-token operand
+    types and the type each HOW IZ I function returns (DYNAMIC for
+    operands and returns only known at run time).
+    """
+    inference = TypeInference(tokens, symbol_table)
+    inference.infer()
+    return inference.types, inference.function_returns
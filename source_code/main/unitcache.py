@@ -0,0 +1,449 @@
+"""
+LOLCODE Incremental Compilation
+Runs the front end (lexing, parsing, semantic analysis) one compilation
+unit at a time against a UnitCache. After an edit, only the units that
+changed are processed again, together with the units that depend on what
+changed. A unit is one of:
+
+    function   a HOW IZ I ... IF U SAY SO block
+    wazzup     the WAZZUP ... BUHBYE section
+    region     up to REGION_LINES other top-level lines, ending outside any block
+
+Each stage keys its cached result by a hash of its input for the unit and
+of the context it reads for the unit:
+
+    lex        the unit's text, and whether it starts inside OBTW
+    parse      the unit's tokens, the parser's stack, and the symbol-table
+               entry and function signature of every name the unit mentions
+    semantic   the same tokens and names, against the checker's state
+
+So a changed HOW IZ I signature or WAZZUP declaration rebuilds the units
+that use it, and nothing else. Line numbers are shifted when a unit only
+moved. A result that carries error messages is only reused at the line it
+was made at, because the messages embed line numbers.
+
+    cache = UnitCache()
+    outcome = compile_units(source, cache)   # same as run_pipeline(source, execute=False)
+    cache.rebuilt                            # the units the last compile processed again
+
+The outcome matches a full run exactly. Parsing and checking still walk
+the whole token list with the real Parser and SemanticAnalyzer. They only
+skip a unit, replaying its recorded effect, when they reach the unit's
+first token in a state the key matches. A unit whose statements read past
+its last token is never cached.
+"""
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+from instrument import count_statements, measure
+from lexer import Lexer
+from parser import Parser, parse_result
+from semantic import SemanticAnalyzer
+
+# Cached stage results kept before the least recently used goes
+DEFAULT_CACHE_ENTRIES = 4096
+
+# Longest top-level region, in lines, before a new unit is started
+REGION_LINES = 64
+
+# Lines that start a block inside a region, and lines that close one
+REGION_OPENERS = ('O RLY?', 'WTF?', 'IM IN YR')
+REGION_CLOSERS = ('OIC', 'IM OUTTA YR')
+
+
+class Unit:
+    """One compilation unit of the current source"""
+    __slots__ = ('kind', 'name', 'first_line', 'last_line', 'text', 'in_comment',
+                 'start', 'end', 'digest', 'names', 'rebuilt')
+
+    def __init__(self, kind, name, first_line, last_line, text, in_comment):
+        """================ __init__ ================"""
+        self.kind = kind
+        self.name = name                # function name, None for other kinds
+        self.first_line = first_line
+        self.last_line = last_line
+        self.text = text
+        self.in_comment = in_comment    # OBTW state at the unit's first line
+        self.start = 0                  # token range in the whole program
+        self.end = 0
+        self.digest = None              # hash of the tokens, with lines relative to first_line
+        self.names = ()                 # every distinct token value
+        self.rebuilt = []               # stages that ran for this unit in the last compile
+
+    def label(self):
+        """================ label ================"""
+        if self.kind == 'function' and self.name:
+            return f"function {self.name}"
+        return self.kind
+
+
+class LexEntry:
+    """A unit's tokens and lexer errors, lexed at first_line"""
+
+    def __init__(self, first_line, tokens, errors):
+        """================ __init__ ================"""
+        self.first_line = first_line
+        self.tokens = tokens
+        self.errors = errors
+        relative = [(desc, value, kind, line - first_line) for desc, value, kind, line in tokens]
+        self.digest = hashlib.sha256(repr(relative).encode('utf-8')).digest()
+        self.names = tuple(sorted({token[1] for token in tokens}))
+
+    def tokens_at(self, first_line):
+        """The tokens renumbered for a unit starting at first_line"""
+        delta = first_line - self.first_line
+        if delta:
+            self.tokens = [(desc, value, kind, line + delta) for desc, value, kind, line in self.tokens]
+            self.first_line = first_line
+        return self.tokens
+
+
+class StepEntry:
+    """
+    The effect of parsing or checking one unit: the errors it added and,
+    per state dict, the (key, value) pairs it wrote, in order
+    """
+
+    def __init__(self, first_line, errors, writes):
+        """================ __init__ ================"""
+        self.first_line = first_line
+        self.errors = errors
+        self.writes = writes
+
+
+class UnitCache:
+    """
+    Stage results for compilation units, least recently used first. One
+    cache can serve any number of sources and compiles; save() and load()
+    keep it between runs of the CLI.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        """================ __init__ ================"""
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.units = []     # units of the last compile
+        self.rebuilt = []   # those of them that any stage processed again
+
+    def get(self, key):
+        """================ get ================"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        """================ put ================"""
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """================ clear ================"""
+        self.entries.clear()
+
+    def save(self, path):
+        """Write the cached results to `path`"""
+        with open(path, 'wb') as file:
+            pickle.dump(self.entries, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, max_entries=DEFAULT_CACHE_ENTRIES):
+        """A cache with the results saved at `path`; empty when there are none or they cannot be read"""
+        cache = cls(max_entries)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as file:
+                    cache.entries = OrderedDict(pickle.load(file))
+            except (OSError, EOFError, ValueError, TypeError, AttributeError, pickle.UnpicklingError):
+                cache.entries = OrderedDict()
+        return cache
+
+
+# ================================================================
+# ======================= UNITS ==================================
+# ================================================================
+def split_units(text, lexer):
+    """
+    Cut the source into units at line boundaries. Only the first word of
+    each line is looked at, so a unit may not match the parse exactly; that
+    only costs reuse, since parsing never trusts a unit it did not see end
+    cleanly. The OBTW state at each unit's start comes from the lexer's own
+    OBTW/TLDR rules.
+    """
+    lines = text.split('\n')
+    units = []
+    start, start_state = 0, False
+    kind, name, depth = 'region', None, 0
+    in_comment = False
+
+    def close(end):
+        units.append(Unit(kind, name, start + 1, end, '\n'.join(lines[start:end]), start_state))
+
+    for index, line in enumerate(lines):
+        head = '' if in_comment else line.lstrip()
+
+        if kind == 'region' and index > start:
+            if (head.startswith(('HOW IZ I', 'WAZZUP', 'KTHXBYE'))
+                    or (depth == 0 and index - start >= REGION_LINES)):
+                close(index)
+                start, start_state, depth = index, in_comment, 0
+
+        if index == start:
+            if head.startswith('HOW IZ I'):
+                kind, name = 'function', (head.split()[3:4] or [None])[0]
+            elif head.startswith('WAZZUP'):
+                kind = 'wazzup'
+
+        in_comment = lexer.strip_multiline_comment(line, in_comment)[1]
+
+        if kind == 'region':
+            if head.startswith(REGION_OPENERS):
+                depth += 1
+            elif head.startswith(REGION_CLOSERS) and depth > 0:
+                depth -= 1
+        elif ((kind == 'function' and 'IF U SAY SO' in line)
+                or (kind == 'wazzup' and 'BUHBYE' in line)):
+            close(index + 1)
+            start, start_state = index + 1, in_comment
+            kind, name, depth = 'region', None, 0
+
+    if start < len(lines):
+        close(len(lines))
+    return units
+
+
+def lex_units(units, cache, lexer):
+    """The whole token list and lexer errors, lexing only units the cache does not have"""
+    tokens = []
+    errors = []
+    for unit in units:
+        key = ('lex', hashlib.sha256(unit.text.encode('utf-8')).digest(), unit.in_comment)
+        entry = cache.get(key)
+        if entry is None or (entry.errors and entry.first_line != unit.first_line):
+            lexer.errors = []
+            entry = LexEntry(unit.first_line,
+                             list(lexer.iter_tokens(unit.text, unit.first_line, unit.in_comment)),
+                             lexer.errors)
+            cache.put(key, entry)
+            unit.rebuilt.append('lex')
+
+        unit.start = len(tokens)
+        tokens.extend(entry.tokens_at(unit.first_line))
+        unit.end = len(tokens)
+        unit.digest = entry.digest
+        unit.names = entry.names
+        errors.extend(entry.errors)
+    return tokens, errors
+
+
+def fresh(value):
+    """A copy of a dict or list value, so cached writes and live tables never share one"""
+    if isinstance(value, (dict, list)):
+        return type(value)(value)
+    return value
+
+
+class UnitSteps:
+    """
+    Mixin for Parser subclasses that go through the program one top-level
+    statement at a time. At the first token of a unit, step_unit either
+    replays the unit's cached effect or runs the unit's statements and
+    records their effect. Subclasses name the state dicts a unit can write
+    (TABLES) and define frame() and context(name), the state a unit reads.
+    """
+    stage = None
+    TABLES = ()
+
+    def setup_units(self, units, cache):
+        """================ setup_units ================"""
+        self.units_at = {unit.start: unit for unit in units if unit.end > unit.start}
+        self.cache = cache
+        self.reach = 0
+
+    # Every token a unit's statements look at is tracked, so a unit that
+    # depended on the unit after it is not cached
+    def current_token(self):
+        """================ current_token ================"""
+        if self.position > self.reach:
+            self.reach = self.position
+        return super().current_token()
+
+    def peek(self, offset=1):
+        """================ peek ================"""
+        if self.position + offset > self.reach:
+            self.reach = self.position + offset
+        return super().peek(offset)
+
+    def step_unit(self, step):
+        """
+        Run `step` (one top-level statement, returning False to stop) here,
+        or over a whole unit when one starts here.
+        """
+        unit = self.units_at.get(self.position)
+        if unit is None:
+            return step()
+
+        frame = self.frame()
+        key = (self.stage, unit.digest, frame, tuple(self.context(name) for name in unit.names))
+        entry = self.cache.get(key)
+        if entry is not None and (not entry.errors or entry.first_line == unit.first_line):
+            self.replay(entry, unit.first_line - entry.first_line)
+            self.position = unit.end
+            return True
+
+        unit.rebuilt.append(self.stage)
+        error_mark = len(self.errors)
+        before = {name: dict(getattr(self, name)) for name in self.TABLES}
+        self.reach = self.position
+        while self.position < unit.end:
+            token = self.current_token()
+            if token is None or token[1] == 'KTHXBYE':
+                break
+            if not step():
+                return False
+
+        if self.position == unit.end and self.reach < unit.end and self.frame() == frame:
+            self.cache.put(key, self.record(unit.first_line, self.errors[error_mark:], before))
+        return True
+
+    def record(self, first_line, errors, before):
+        """The StepEntry for a unit from the tables as they were `before` it"""
+        missing = object()
+        writes = {}
+        for name in self.TABLES:
+            old = before[name]
+            writes[name] = [(key, fresh(value)) for key, value in getattr(self, name).items()
+                            if old.get(key, missing) is not value]
+        return StepEntry(first_line, list(errors), writes)
+
+    def replay(self, entry, delta):
+        """Apply a cached unit's effect, `delta` lines below where it was recorded"""
+        self.errors.extend(entry.errors)
+        for name, writes in entry.writes.items():
+            table = getattr(self, name)
+            for key, value in writes:
+                key, value = self.shift(name, key, fresh(value), delta)
+                table[key] = value
+
+    def shift(self, name, key, value, delta):
+        """A recorded write moved down `delta` lines"""
+        return key, value
+
+
+class UnitParser(UnitSteps, Parser):
+    """Parser that replays the units the cache already has"""
+    stage = 'parse'
+    TABLES = ('variables', 'symbol_table', 'function_scopes')
+
+    def parse_top_level(self):
+        """================ parse_top_level ================"""
+        return self.step_unit(super().parse_top_level)
+
+    def frame(self):
+        """================ frame ================"""
+        return tuple(self.stack), len(self.scope_stack)
+
+    def context(self, name):
+        """What parsing a unit can read about `name`: its symbol-table entry and parameters"""
+        scope = self.function_scopes.get(name)
+        return name, self.symbol_table.get(name), tuple(scope['params']) if scope else None
+
+    def shift(self, name, key, value, delta):
+        """Variables are keyed by their declaring token and function scopes record their lines"""
+        if delta and name == 'variables':
+            key = key[:3] + (key[3] + delta,)
+        elif delta and name == 'function_scopes':
+            value['start_line'] += delta
+            value['end_line'] += delta
+        return key, value
+
+
+class UnitAnalyzer(UnitSteps, SemanticAnalyzer):
+    """SemanticAnalyzer that replays the units the cache already has"""
+    stage = 'semantic'
+    TABLES = ('symbol_table', 'function_dictionary', 'function_scopes')
+
+    def analyze(self):
+        """================ analyze ================"""
+        while self.current_token()[1] != 'KTHXBYE':
+            self.step_unit(self.analyze_step)
+
+    def analyze_step(self):
+        """================ analyze_step ================"""
+        self.analyze_statement()
+        return True
+
+    def frame(self):
+        """================ frame ================"""
+        return self.inside_function, len(self.scope_stack)
+
+    def context(self, name):
+        """What checking a unit can read about `name`: its symbol-table entry and argument types"""
+        params = self.function_dictionary.get(name)
+        return name, self.symbol_table.get(name), tuple(params) if params is not None else None
+
+
+# ================================================================
+# ======================= FRONT END ==============================
+# ================================================================
+def compile_units(text, cache, stats=None):
+    """
+    run_pipeline(text, stats, execute=False) through `cache`: returns
+    (failed_stage, errors, tokens, symbol_table, function_dictionary).
+    cache.units and cache.rebuilt tell what was processed again.
+    """
+    lexer = Lexer()
+    units = split_units(text, lexer)
+    cache.units = units
+    cache.rebuilt = []
+
+    try:
+        with measure(stats, "lex") as phase:
+            tokens, lex_errors = lex_units(units, cache, lexer)
+            phase.tokens = len(tokens)
+        statements = count_statements(tokens) if stats is not None else 0
+        phase.statements = statements
+        if lex_errors:
+            return "Lexer", lex_errors, tokens, {}, {}
+
+        with measure(stats, "parse") as phase:
+            parser = UnitParser(tokens)
+            parser.setup_units(units, cache)
+            success, _, symbol_table, function_dictionary, parse_errors = parse_result(parser, parser.parse())
+            phase.tokens = len(tokens)
+            phase.statements = statements
+        if not success:
+            return "Parser", parse_errors, tokens, symbol_table, function_dictionary
+
+        with measure(stats, "semantic") as phase:
+            analyzer = UnitAnalyzer(tokens, symbol_table, function_dictionary)
+            analyzer.setup_units(units, cache)
+            analyzer.analyze()
+            phase.tokens = len(tokens)
+            phase.statements = statements
+        if analyzer.errors:
+            return "Semantic", analyzer.errors, tokens, symbol_table, function_dictionary
+
+        return None, [], tokens, symbol_table, function_dictionary
+    finally:
+        cache.rebuilt = [unit for unit in units if unit.rebuilt]
+
+
+def format_rebuilt(cache):
+    """Which units the last compile processed again, one line each"""
+    lines = [f"{len(cache.rebuilt)}/{len(cache.units)} units rebuilt"]
+    for unit in cache.rebuilt:
+        span = f"lines {unit.first_line}-{unit.last_line}"
+        lines.append(f"  {unit.label():<24} {span:<18} {' '.join(unit.rebuilt)}")
+    return '\n'.join(lines)